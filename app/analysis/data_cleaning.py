@@ -81,6 +81,24 @@ class DataCleaner:
         
         return clean_q_scores, clean_age, clean_total
 
+    @staticmethod
+    def clean_input_arrays(q_scores, age, total_score):
+        """
+        clean_inputs() over whole columns at once.
+        q_scores is (n, k) with NaN for unanswered questions, which stay NaN;
+        age and total_score are length-n. Non-numeric values count as missing.
+        Returns float arrays (q_scores, age, total_score).
+        """
+        q_scores = pd.DataFrame(q_scores).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        age = pd.to_numeric(pd.Series(age), errors='coerce').to_numpy(dtype=float)
+        total_score = pd.to_numeric(pd.Series(total_score), errors='coerce').to_numpy(dtype=float)
+
+        # Same rules as clean_age / clean_score: truncate, then clip
+        clean_age = np.where(np.isnan(age), 25, np.clip(np.trunc(age), 5, 120))
+        clean_total = np.where(np.isnan(total_score), 0, np.clip(np.trunc(total_score), 0, 125))
+        clean_q_scores = np.clip(np.trunc(q_scores), 0, 5)
+        return clean_q_scores, clean_age, clean_total
+
     @staticmethod
     def clean_dataframe(df):
         """
@@ -119,6 +137,42 @@ class DataCleaner:
         logger.info("Dataframe cleaning complete")
         return df
 
+    @staticmethod
+    def clean_exam_batch(sessions_df, responses_df, max_response=4):
+        """
+        Vectorized validation for bulk-imported exams.
+
+        sessions_df has one row per exam (index = session key) with 'username'
+        and 'age'; responses_df has 'session', 'question_id', 'response_value'.
+        Applies the clean_age / clean_score rules column-wise, drops unusable
+        responses (last answer per question wins) and adds 'total_score' and
+        'reject_reason' (None for exams that can be stored).
+        """
+        responses_df = responses_df.copy()
+        responses_df['question_id'] = pd.to_numeric(responses_df['question_id'], errors='coerce')
+        responses_df['response_value'] = pd.to_numeric(responses_df['response_value'], errors='coerce')
+        responses_df = responses_df.dropna(subset=['question_id', 'response_value'])
+        responses_df['response_value'] = responses_df['response_value'].clip(lower=0, upper=max_response)
+        responses_df = responses_df.astype({'question_id': int, 'response_value': int})
+        responses_df = responses_df.drop_duplicates(subset=['session', 'question_id'], keep='last')
+
+        sessions_df = sessions_df.copy()
+        # Unparseable ages become NaN (unknown); the rest are truncated and clipped like clean_age
+        sessions_df['age'] = np.trunc(pd.to_numeric(sessions_df['age'], errors='coerce').clip(lower=5, upper=120))
+        sessions_df['username'] = sessions_df['username'].fillna('').astype(str).str.strip()
+        sessions_df['total_score'] = (
+            responses_df.groupby('session')['response_value'].sum()
+            .reindex(sessions_df.index, fill_value=0)
+            .astype(int)
+        )
+        answered = responses_df.groupby('session').size().reindex(sessions_df.index, fill_value=0)
+
+        sessions_df['reject_reason'] = None
+        sessions_df.loc[answered == 0, 'reject_reason'] = "no valid responses"
+        sessions_df.loc[sessions_df['username'] == '', 'reject_reason'] = "missing username"
+
+        return sessions_df, responses_df
+
 if __name__ == "__main__":
     # Self-test
     print("Testing DataCleaner...")
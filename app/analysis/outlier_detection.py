@@ -6,6 +6,8 @@ from typing import List, Dict, Tuple, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from app.models import Score, User
+from app.utils import to_epoch_ms
+from app.services.users import user_filter
 from sqlalchemy import func
 
 logger = logging.getLogger(__name__)
@@ -173,7 +175,7 @@ class OutlierDetector:
         """User-level outlier detection."""
         try:
             scores_query = session.query(Score).filter(
-                Score.username == username
+                user_filter(Score, username)
             ).order_by(Score.timestamp).all()
             
             if not scores_query:
@@ -346,12 +348,14 @@ class OutlierDetector:
                                      time_window_days: int = 30) -> Dict:
         """Detect scoring inconsistency over time window."""
         try:
-            cutoff_date = datetime.utcnow() - timedelta(days=time_window_days)
+            cutoff_ms = to_epoch_ms(datetime.utcnow() - timedelta(days=time_window_days))
             
+            # Integer range scan on (user_id, timestamp_ms)
             scores_query = session.query(Score).filter(
-                Score.username == username,
-                Score.timestamp >= cutoff_date.isoformat()
-            ).order_by(Score.timestamp).all()
+                user_filter(Score, username)
+            ).filter(
+                Score.timestamp_ms >= cutoff_ms
+            ).order_by(Score.timestamp_ms).all()
             
             if len(scores_query) < 2:
                 return {
@@ -0,0 +1,74 @@
+"""Score Stats - O(1) per-user score summaries read from the user_score_stats table."""
+
+import logging
+import math
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.db import get_session, safe_db_context
+from app.models import UserScoreStats, rebuild_user_score_stats
+
+logger = logging.getLogger(__name__)
+
+
+def summarize(row: UserScoreStats) -> Dict:
+    """Derive mean / variance style figures from one aggregate row."""
+    count = row.attempt_count or 0
+    mean = row.score_sum / count if count else 0.0
+    # Population variance from running sums; clamp float noise below zero
+    variance = max(row.score_sum_sq / count - mean * mean, 0.0) if count else 0.0
+    sample_variance = variance * count / (count - 1) if count > 1 else 0.0
+
+    return {
+        "username": row.username,
+        "user_id": row.user_id,
+        "count": count,
+        "sum": row.score_sum,
+        "sum_sq": row.score_sum_sq,
+        "mean": mean,
+        "std_dev": math.sqrt(variance),
+        "sample_std_dev": math.sqrt(sample_variance),
+        "min": row.min_score,
+        "max": row.max_score,
+        "first_score": row.first_score,
+        "first_timestamp": row.first_timestamp,
+        "last_score": row.last_score,
+        "last_timestamp": row.last_timestamp,
+        "average_change": row.abs_change_sum / (count - 1) if count > 1 else 0.0,
+    }
+
+
+def get_user_score_stats(username: str, session: Optional[Session] = None) -> Optional[Dict]:
+    """Summary of a user's scores, or None if they have never finished an exam."""
+    own_session = session is None
+    session = session or get_session()
+    try:
+        row = session.get(UserScoreStats, username)
+        return summarize(row) if row is not None else None
+    finally:
+        if own_session:
+            session.close()
+
+
+def get_returning_users(min_attempts: int = 2, session: Optional[Session] = None) -> List[Dict]:
+    """Summaries for every user with at least `min_attempts` scores."""
+    own_session = session is None
+    session = session or get_session()
+    try:
+        rows = session.query(UserScoreStats).filter(
+            UserScoreStats.attempt_count >= min_attempts
+        ).all()
+        return [summarize(row) for row in rows]
+    finally:
+        if own_session:
+            session.close()
+
+
+def rebuild_all_user_score_stats() -> int:
+    """Recompute the aggregates from `scores`; returns the number of users."""
+    with safe_db_context() as session:
+        rebuild_user_score_stats(session.connection())
+        count = session.query(UserScoreStats).count()
+    logger.info(f"Rebuilt score stats for {count} users")
+    return count
@@ -18,12 +18,19 @@ from collections import defaultdict
 from statistics import mean, stdev
 from typing import Dict, List, Tuple, Optional
 
-from sqlalchemy import func
+from sqlalchemy import func, case
 from app.db import safe_db_context
-from app.models import User, Score, Response, JournalEntry
+from app.models import User, Score, Response, ExamSession, JournalEntry, UserScoreStats
+from app.utils import to_epoch_ms
+from app.analysis.score_stats import get_returning_users
+from app.services.exam_sessions import load_responses
+from app.services.users import resolve_user_id, user_filter
 
 logger = logging.getLogger(__name__)
 
+DAY_MS = 86_400_000
+EPOCH_DATE = datetime(1970, 1, 1)
+
 
 class TimeBasedAnalyzer:
     """Analyzer for temporal patterns in user responses and emotional intelligence scores."""
@@ -44,14 +51,19 @@ class TimeBasedAnalyzer:
         """
         try:
             with safe_db_context() as session:
+                user_id = resolve_user_id(username)
                 # Get all scores for the user
-                scores = session.query(Score).filter_by(username=username).order_by(Score.timestamp).all()
+                scores = session.query(Score).filter(
+                    user_filter(Score, username, user_id)
+                ).order_by(Score.timestamp).all()
                 
-                # Get all responses for the user
-                responses = session.query(Response).filter_by(username=username).order_by(Response.timestamp).all()
+                # Get all responses for the user (packed sessions and legacy rows)
+                responses = list(load_responses(username, user_id=user_id).itertuples(index=False))
                 
                 # Get all journal entries
-                journals = session.query(JournalEntry).filter_by(username=username).order_by(JournalEntry.entry_date).all()
+                journals = session.query(JournalEntry).filter(
+                    user_filter(JournalEntry, username, user_id)
+                ).order_by(JournalEntry.entry_date).all()
                 
                 timeline_data = {
                     "username": username,
@@ -102,7 +114,7 @@ class TimeBasedAnalyzer:
         """
         try:
             with safe_db_context() as session:
-                scores = session.query(Score).filter_by(username=username).order_by(Score.timestamp).all()
+                scores = session.query(Score).filter(user_filter(Score, username)).order_by(Score.timestamp).all()
                 
                 if not scores:
                     return {"error": "No score data available"}
@@ -163,7 +175,7 @@ class TimeBasedAnalyzer:
             self.logger.error(f"Error analyzing score trends for {username}: {e}")
             return {}
 
-    def analyze_response_patterns_over_time(self, username: str) -> Dict:
+    def analyze_response_patterns_over_time(self, username: str, include_archived: bool = False) -> Dict:
         """
         Analyze how response patterns change over time.
         
@@ -172,55 +184,55 @@ class TimeBasedAnalyzer:
         
         Args:
             username: Username to analyze
+            include_archived: Also read responses moved to the archive databases
             
         Returns:
             Dictionary containing response pattern analysis
         """
         try:
-            with safe_db_context() as session:
-                responses = session.query(Response).filter_by(username=username).order_by(Response.timestamp).all()
-                
-                if not responses:
-                    return {"error": "No response data available"}
-                
-                # Group responses by question_id and track changes
-                question_responses = defaultdict(list)
-                for resp in responses:
-                    question_responses[resp.question_id].append({
-                        "response_value": resp.response_value,
-                        "timestamp": resp.timestamp,
-                    })
-                
-                pattern_analysis = {
-                    "username": username,
-                    "total_responses": len(responses),
-                    "unique_questions_answered": len(question_responses),
-                    "question_patterns": {},
-                }
-                
-                # Analyze pattern for each question
-                for question_id, resp_history in question_responses.items():
-                    if len(resp_history) >= 2:
-                        values = [r["response_value"] for r in resp_history]
-                        first_response = values[0]
-                        last_response = values[-1]
-                        
-                        pattern_analysis["question_patterns"][question_id] = {
-                            "times_answered": len(values),
-                            "first_response": first_response,
-                            "last_response": last_response,
-                            "response_change": last_response - first_response,
-                            "average_response": mean(values),
-                            "response_history": values,
-                        }
-                
-                # Calculate overall response consistency
-                all_values = [r["response_value"] for r in responses]
-                if len(all_values) > 1:
-                    pattern_analysis["overall_response_std_dev"] = stdev(all_values)
-                    pattern_analysis["overall_average_response"] = mean(all_values)
-                
-                return pattern_analysis
+            responses = list(load_responses(username, include_archived=include_archived).itertuples(index=False))
+            
+            if not responses:
+                return {"error": "No response data available"}
+            
+            # Group responses by question_id and track changes
+            question_responses = defaultdict(list)
+            for resp in responses:
+                question_responses[resp.question_id].append({
+                    "response_value": resp.response_value,
+                    "timestamp": resp.timestamp,
+                })
+            
+            pattern_analysis = {
+                "username": username,
+                "total_responses": len(responses),
+                "unique_questions_answered": len(question_responses),
+                "question_patterns": {},
+            }
+            
+            # Analyze pattern for each question
+            for question_id, resp_history in question_responses.items():
+                if len(resp_history) >= 2:
+                    values = [r["response_value"] for r in resp_history]
+                    first_response = values[0]
+                    last_response = values[-1]
+                    
+                    pattern_analysis["question_patterns"][question_id] = {
+                        "times_answered": len(values),
+                        "first_response": first_response,
+                        "last_response": last_response,
+                        "response_change": last_response - first_response,
+                        "average_response": mean(values),
+                        "response_history": values,
+                    }
+            
+            # Calculate overall response consistency
+            all_values = [r.response_value for r in responses]
+            if len(all_values) > 1:
+                pattern_analysis["overall_response_std_dev"] = stdev(all_values)
+                pattern_analysis["overall_average_response"] = mean(all_values)
+            
+            return pattern_analysis
         except Exception as e:
             self.logger.error(f"Error analyzing response patterns for {username}: {e}")
             return {}
@@ -229,6 +241,10 @@ class TimeBasedAnalyzer:
         """
         Get statistics grouped by time period (daily, weekly, monthly).
         
+        Bucketing and aggregation run in SQL on the integer ``timestamp_ms``
+        column, so this is a range scan on (username, timestamp_ms) rather
+        than parsing every timestamp string in Python.
+        
         Args:
             username: Username to analyze
             period: Time period ('daily', 'weekly', 'monthly')
@@ -238,50 +254,42 @@ class TimeBasedAnalyzer:
         """
         try:
             with safe_db_context() as session:
-                scores = session.query(Score).filter_by(username=username).order_by(Score.timestamp).all()
-                
-                if not scores:
+                day = Score.timestamp_ms // DAY_MS
+                if period == "weekly":
+                    # Day 0 (1970-01-01) was a Thursday; shift to the Monday starting the ISO week
+                    bucket = day - (day + 3) % 7
+                elif period == "monthly":
+                    bucket = func.strftime("%Y-%m", Score.timestamp_ms // 1000, "unixepoch")
+                else:
+                    bucket = day
+                
+                rows = session.query(
+                    bucket.label("bucket"),
+                    func.avg(Score.total_score),
+                    func.min(Score.total_score),
+                    func.max(Score.total_score),
+                    func.count(Score.id),
+                ).filter(
+                    user_filter(Score, username)
+                ).filter(
+                    Score.timestamp_ms.isnot(None),
+                ).group_by(bucket).order_by(bucket).all()
+                
+                if not rows:
                     return {"error": "No score data available"}
                 
-                # Group scores by period
-                period_stats = defaultdict(list)
-                
-                for score in scores:
-                    try:
-                        score_time = datetime.fromisoformat(score.timestamp)
-                    except (ValueError, TypeError):
-                        # Try alternative parsing
-                        try:
-                            score_time = datetime.strptime(score.timestamp, "%Y-%m-%d %H:%M:%S")
-                        except:
-                            continue
-                    
-                    if period == "daily":
-                        period_key = score_time.strftime("%Y-%m-%d")
-                    elif period == "weekly":
-                        # Get ISO week
-                        period_key = f"{score_time.isocalendar()[0]}-W{score_time.isocalendar()[1]}"
-                    elif period == "monthly":
-                        period_key = score_time.strftime("%Y-%m")
-                    else:
-                        period_key = score_time.strftime("%Y-%m-%d")
-                    
-                    period_stats[period_key].append(score.total_score)
-                
-                # Calculate statistics for each period
                 result = {
                     "username": username,
                     "period": period,
                     "period_statistics": {},
                 }
                 
-                for period_key in sorted(period_stats.keys()):
-                    scores_in_period = period_stats[period_key]
-                    result["period_statistics"][period_key] = {
-                        "average_score": mean(scores_in_period),
-                        "min_score": min(scores_in_period),
-                        "max_score": max(scores_in_period),
-                        "attempts_count": len(scores_in_period),
+                for bucket_value, avg_score, min_score, max_score, count in rows:
+                    result["period_statistics"][self._period_label(bucket_value, period)] = {
+                        "average_score": avg_score,
+                        "min_score": min_score,
+                        "max_score": max_score,
+                        "attempts_count": count,
                     }
                 
                 return result
@@ -289,6 +297,17 @@ class TimeBasedAnalyzer:
             self.logger.error(f"Error analyzing period stats for {username}: {e}")
             return {}
 
+    @staticmethod
+    def _period_label(bucket_value, period: str) -> str:
+        """Format a SQL period bucket the same way the UI has always shown it."""
+        if period == "monthly":
+            return bucket_value
+        bucket_date = EPOCH_DATE + timedelta(days=int(bucket_value))
+        if period == "weekly":
+            iso_year, iso_week, _ = bucket_date.isocalendar()
+            return f"{iso_year}-W{iso_week}"
+        return bucket_date.strftime("%Y-%m-%d")
+
     def identify_returning_users(self, min_attempts: int = 2) -> List[Dict]:
         """
         Identify all returning users (those with multiple attempts).
@@ -301,26 +320,16 @@ class TimeBasedAnalyzer:
         """
         try:
             with safe_db_context() as session:
-                # Get users with multiple scores
-                user_scores = session.query(
-                    Score.username,
-                    func.count(Score.id).label("attempt_count"),
-                    func.min(Score.timestamp).label("first_attempt"),
-                    func.max(Score.timestamp).label("last_attempt"),
-                    func.avg(Score.total_score).label("avg_score"),
-                ).group_by(Score.username).filter(
-                    func.count(Score.id) >= min_attempts
-                ).all()
-                
+                # Per-user aggregates are maintained on write; no scan of scores
                 returning_users = [
                     {
-                        "username": user[0],
-                        "total_attempts": user[1],
-                        "first_attempt_date": user[2],
-                        "last_attempt_date": user[3],
-                        "average_score": user[4],
+                        "username": stats["username"],
+                        "total_attempts": stats["count"],
+                        "first_attempt_date": stats["first_timestamp"],
+                        "last_attempt_date": stats["last_timestamp"],
+                        "average_score": stats["mean"],
                     }
-                    for user in user_scores
+                    for stats in get_returning_users(min_attempts, session=session)
                 ]
                 
                 return sorted(returning_users, key=lambda x: x["total_attempts"], reverse=True)
@@ -341,56 +350,50 @@ class TimeBasedAnalyzer:
         """
         try:
             with safe_db_context() as session:
-                all_scores = session.query(Score).filter_by(username=username).order_by(Score.timestamp).all()
-                
-                if not all_scores:
+                cutoff_ms = to_epoch_ms(datetime.utcnow() - timedelta(days=lookback_days))
+                is_recent = case((Score.timestamp_ms >= cutoff_ms, 1), else_=0)
+                
+                # Split into historical/recent windows with one indexed aggregate query
+                rows = session.query(
+                    is_recent,
+                    func.avg(Score.total_score),
+                    func.count(Score.id),
+                    func.max(Score.total_score),
+                    func.min(Score.total_score),
+                ).filter(
+                    user_filter(Score, username)
+                ).filter(
+                    Score.timestamp_ms.isnot(None),
+                ).group_by(is_recent).all()
+                
+                if not rows:
                     return {"error": "No score data available"}
                 
-                # Separate historical and recent scores
-                cutoff_date = datetime.utcnow() - timedelta(days=lookback_days)
-                
-                historical_scores = []
-                recent_scores = []
-                
-                for score in all_scores:
-                    try:
-                        score_time = datetime.fromisoformat(score.timestamp)
-                    except (ValueError, TypeError):
-                        try:
-                            score_time = datetime.strptime(score.timestamp, "%Y-%m-%d %H:%M:%S")
-                        except:
-                            continue
-                    
-                    if score_time < cutoff_date:
-                        historical_scores.append(score.total_score)
-                    else:
-                        recent_scores.append(score.total_score)
+                windows = {
+                    "recent" if recent else "historical": {
+                        "average_score": avg_score,
+                        "attempts": count,
+                        "max_score": max_score,
+                        "min_score": min_score,
+                    }
+                    for recent, avg_score, count, max_score, min_score in rows
+                }
                 
                 comparative = {
                     "username": username,
                     "lookback_days": lookback_days,
                 }
                 
-                if historical_scores:
-                    comparative["historical"] = {
-                        "average_score": mean(historical_scores),
-                        "attempts": len(historical_scores),
-                        "max_score": max(historical_scores),
-                        "min_score": min(historical_scores),
-                    }
+                if "historical" in windows:
+                    comparative["historical"] = windows["historical"]
                 
-                if recent_scores:
-                    comparative["recent"] = {
-                        "average_score": mean(recent_scores),
-                        "attempts": len(recent_scores),
-                        "max_score": max(recent_scores),
-                        "min_score": min(recent_scores),
-                    }
+                if "recent" in windows:
+                    comparative["recent"] = windows["recent"]
                     
                     # Calculate difference
-                    if historical_scores:
-                        hist_avg = mean(historical_scores)
-                        recent_avg = mean(recent_scores)
+                    if "historical" in windows:
+                        hist_avg = windows["historical"]["average_score"]
+                        recent_avg = windows["recent"]["average_score"]
                         comparative["performance_change"] = recent_avg - hist_avg
                         comparative["performance_change_percentage"] = (recent_avg - hist_avg) / hist_avg * 100 if hist_avg != 0 else 0
                 
@@ -416,9 +419,19 @@ class TimeBasedAnalyzer:
                 if not user:
                     return {"error": "User not found"}
                 
-                scores_count = session.query(func.count(Score.id)).filter_by(username=username).scalar()
-                responses_count = session.query(func.count(Response.id)).filter_by(username=username).scalar()
-                journal_count = session.query(func.count(JournalEntry.id)).filter_by(username=username).scalar()
+                # The user row is already loaded; no separate id lookup needed
+                scores_count = session.query(func.sum(UserScoreStats.attempt_count)).filter(
+                    user_filter(UserScoreStats, username, user.id)
+                ).scalar()
+                responses_count = (
+                    (session.query(func.count(Response.id)).filter(
+                        user_filter(Response, username, user.id)).scalar() or 0)
+                    + (session.query(func.sum(ExamSession.answer_count)).filter(
+                        user_filter(ExamSession, username, user.id)).scalar() or 0)
+                )
+                journal_count = session.query(func.count(JournalEntry.id)).filter(
+                    user_filter(JournalEntry, username, user.id)
+                ).scalar()
                 
                 summary = {
                     "username": username,
@@ -2,6 +2,7 @@ import bcrypt
 from datetime import datetime
 from app.db import get_session
 from app.models import User
+from app.services.users import link_user_rows
 import logging
 
 class AuthManager:
@@ -40,6 +41,9 @@ class AuthManager:
                 created_at=datetime.utcnow().isoformat()
             )
             session.add(new_user)
+            session.flush()
+            # Earlier exams taken under this name become this user's rows
+            link_user_rows(session, new_user.id, username)
             session.commit()
             return True, "Registration successful"
         
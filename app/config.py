@@ -11,7 +11,38 @@ CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
 DEFAULT_CONFIG = {
     "database": {
         "filename": "soulsense.db",
-        "path": "db"
+        "path": "db",
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_timeout": 30,
+        "instrumentation": True,
+        "slow_query_ms": 200,
+        "shared_question_cache": False,
+        "archive": {
+            "horizon_days": 365,
+            "period": "year",
+            "chunk_size": 5000
+        },
+        "maintenance": {
+            "enabled": True,
+            "interval_seconds": 60,
+            "wal_passive_mb": 4,
+            "wal_truncate_mb": 64,
+            "analyze_after_writes": 5000,
+            "vacuum_freelist_pages": 1000,
+            "vacuum_pages_per_run": 1000,
+            "busy_backoff_seconds": 30
+        },
+        "pragmas": {
+            "auto_vacuum": "INCREMENTAL",
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            "cache_size": -2000,
+            "temp_store": "MEMORY",
+            "mmap_size": 268435456,
+            "foreign_keys": "ON"
+        }
     },
     "ui": {
         "theme": "light",
@@ -20,6 +51,10 @@ DEFAULT_CONFIG = {
     "features": {
         "enable_journal": True,
         "enable_analytics": True
+    },
+    "ml": {
+        "prediction_cache_size": 4096,
+        "prediction_cache_sentiment_step": 1.0
     }
 }
 
@@ -34,7 +69,7 @@ def load_config():
             config = json.load(f)
             # Use deepcopy to avoid mutating the global DEFAULT_CONFIG
             merged = copy.deepcopy(DEFAULT_CONFIG)
-            for section in ["database", "ui", "features"]:
+            for section in ["database", "ui", "features", "ml"]:
                 if section in config:
                     merged[section].update(config[section])
             return merged
@@ -64,6 +99,25 @@ _config = load_config()
 DB_DIR_NAME = _config["database"]["path"]
 DB_FILENAME = _config["database"]["filename"]
 
+# Connection pool and per-connection SQLite PRAGMA profile
+DB_POOL_SIZE = int(_config["database"]["pool_size"])
+DB_MAX_OVERFLOW = int(_config["database"]["max_overflow"])
+DB_POOL_TIMEOUT = float(_config["database"]["pool_timeout"])
+# Merge key-by-key so a partial "pragmas" block in config.json keeps the other defaults
+DB_PRAGMAS = {**DEFAULT_CONFIG["database"]["pragmas"], **_config["database"].get("pragmas", {})}
+
+# Per-statement latency counters and the slow-query log threshold (ms)
+DB_INSTRUMENTATION = bool(_config["database"]["instrumentation"])
+DB_SLOW_QUERY_MS = float(_config["database"]["slow_query_ms"])
+
+# One question set in shared memory for every instance on this machine (POSIX)
+SHARED_QUESTION_CACHE = bool(_config["database"]["shared_question_cache"])
+
+# Memoized predictions (app.ml.prediction_cache): LRU entries, 0 disables it;
+# sentiment is bucketed to this step before lookup
+PREDICTION_CACHE_SIZE = int(_config["ml"]["prediction_cache_size"])
+PREDICTION_CACHE_SENTIMENT_STEP = float(_config["ml"]["prediction_cache_sentiment_step"])
+
 # Directory Definitions
 DATA_DIR = os.path.join(BASE_DIR, "data")
 LOG_DIR = os.path.join(BASE_DIR, "logs")
@@ -89,6 +143,24 @@ else:
 
 DATABASE_URL = f"sqlite:///{DB_PATH}"
 
+# Hot/cold archival: rows older than the horizon move to per-period files here
+_archive = {**DEFAULT_CONFIG["database"]["archive"], **_config["database"].get("archive", {})}
+ARCHIVE_DIR = os.path.join(os.path.dirname(DB_PATH), "archive")
+ARCHIVE_HORIZON_DAYS = int(_archive["horizon_days"])
+ARCHIVE_PERIOD = _archive["period"]
+ARCHIVE_CHUNK_SIZE = int(_archive["chunk_size"])
+
+# Background maintenance: WAL checkpoints, ANALYZE and incremental vacuum
+_maintenance = {**DEFAULT_CONFIG["database"]["maintenance"], **_config["database"].get("maintenance", {})}
+MAINTENANCE_ENABLED = bool(_maintenance["enabled"])
+MAINTENANCE_INTERVAL_SECONDS = float(_maintenance["interval_seconds"])
+MAINTENANCE_WAL_PASSIVE_BYTES = int(float(_maintenance["wal_passive_mb"]) * 1024 * 1024)
+MAINTENANCE_WAL_TRUNCATE_BYTES = int(float(_maintenance["wal_truncate_mb"]) * 1024 * 1024)
+MAINTENANCE_ANALYZE_AFTER_WRITES = int(_maintenance["analyze_after_writes"])
+MAINTENANCE_VACUUM_FREELIST_PAGES = int(_maintenance["vacuum_freelist_pages"])
+MAINTENANCE_VACUUM_PAGES_PER_RUN = int(_maintenance["vacuum_pages_per_run"])
+MAINTENANCE_BUSY_BACKOFF_SECONDS = float(_maintenance["busy_backoff_seconds"])
+
 
 
 # Ensure DB Directory Exists
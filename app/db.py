@@ -1,32 +1,233 @@
 # app/db.py - SIMPLIFIED VERSION
 import os
 import sqlite3
+import hashlib
 import logging
+import threading
+import weakref
 from contextlib import contextmanager
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import create_engine, text, event
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.config import DATABASE_URL, DB_PATH
+from app.config import (
+    DATABASE_URL, DB_PATH, DB_PRAGMAS,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT
+)
 from app.exceptions import DatabaseError
+from app import query_metrics
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# ==================== CONNECTION FACTORY ====================
+
+def pragma_statements(pragmas=None):
+    """Return the PRAGMA statements for a profile (defaults to config.json)"""
+    profile = DB_PRAGMAS if pragmas is None else pragmas
+    return [f"PRAGMA {name} = {value}" for name, value in profile.items()]
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas=None):
+    """Apply the configured PRAGMA profile to a raw sqlite3 connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for statement in pragma_statements(pragmas):
+            try:
+                cursor.execute(statement)
+            except sqlite3.Error as e:
+                # e.g. journal_mode cannot change while another connection holds a lock
+                logger.warning(f"Could not apply '{statement}': {e}")
+    finally:
+        cursor.close()
+
+# Pool counters (the pool itself only reports its current occupancy)
+_pool_counters = {"connects": 0, "checkouts": 0, "checkins": 0}
+_pool_counters_lock = threading.Lock()
+
+def _count(name):
+    with _pool_counters_lock:
+        _pool_counters[name] += 1
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    _count("checkouts")
+
+def _on_checkin(dbapi_connection, connection_record):
+    _count("checkins")
+
+# Engines from create_db_engine, which set PRAGMAs in their connect hook
+_profiled_engines = weakref.WeakSet()
+
+def create_db_engine(url=DATABASE_URL, pragmas=None, **kwargs):
+    """
+    Create a pooled engine whose connections all carry the PRAGMA profile.
+    Both the ORM (SessionLocal) and the raw get_connection() path draw from it.
+    """
+    options = {
+        "echo": False,
+        "poolclass": QueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        # Connections are handed between the Tk thread and background loaders;
+        # the factory (if enabled) records per-statement latency
+        "connect_args": {"check_same_thread": False, **query_metrics.connect_args()},
+    }
+    options.update(kwargs)
+    new_engine = create_engine(url, **options)
+
+    def _on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+        _count("connects")
+
+    event.listen(new_engine, "connect", _on_connect)
+    event.listen(new_engine, "checkout", _on_checkout)
+    event.listen(new_engine, "checkin", _on_checkin)
+    _profiled_engines.add(new_engine)
+    return new_engine
+
+def applies_pragma_profile(target_engine):
+    """True if the engine already applies its PRAGMA profile on connect"""
+    return target_engine in _profiled_engines
+
 # Create engine and session
-engine = create_engine(DATABASE_URL, echo=False)
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def get_pool_stats(target_engine=None):
+    """Snapshot of pool occupancy and lifetime counters for diagnostics"""
+    pool = (target_engine or engine).pool
+    stats = {
+        "pool_class": type(pool).__name__,
+        "size": pool.size() if hasattr(pool, "size") else None,
+        "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+        "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+        "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+    }
+    with _pool_counters_lock:
+        stats.update(_pool_counters)
+    return stats
+
 def get_engine():
     return engine
 
+# ==================== LAZY BOOTSTRAP ====================
+
+# Engines whose schema has been verified in this process
+_bootstrapped_engines = weakref.WeakSet()
+_bootstrap_lock = threading.Lock()
+_fingerprint = None
+
+def schema_fingerprint():
+    """
+    Hash of the DDL the models would emit. Stored in schema_info after a
+    successful create_all so later processes can skip it.
+    """
+    global _fingerprint
+    if _fingerprint is None:
+        from app.models import Base, SCHEMA_REVISION
+        from sqlalchemy.dialects import sqlite
+        from sqlalchemy.schema import CreateTable, CreateIndex
+
+        dialect = sqlite.dialect()
+        parts = [f"revision:{SCHEMA_REVISION}"]
+        for table in Base.metadata.sorted_tables:
+            parts.append(str(CreateTable(table).compile(dialect=dialect)))
+            for index in sorted(table.indexes, key=lambda ix: ix.name or ""):
+                parts.append(str(CreateIndex(index).compile(dialect=dialect)))
+        _fingerprint = hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+    return _fingerprint
+
+def _stored_fingerprint(target_engine):
+    try:
+        with target_engine.connect() as conn:
+            return conn.execute(
+                text("SELECT value FROM schema_info WHERE key = 'fingerprint'")
+            ).scalar()
+    except SQLAlchemyError:
+        # Fresh or pre-fingerprint database
+        return None
+
+def _store_fingerprint(target_engine, fingerprint):
+    with target_engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO schema_info (key, value) VALUES ('fingerprint', :value)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        """), {"value": fingerprint})
+
+def _missing_columns(target_engine, metadata):
+    """'table.column' names the models declare but existing tables lack"""
+    from sqlalchemy import inspect
+
+    inspector = inspect(target_engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing.extend(f"{table.name}.{column.name}" for column in table.columns
+                       if column.name not in existing)
+    return missing
+
+def init_db(target_engine=None, force=False):
+    """
+    Make sure the schema exists, at most once per engine per process.
+    When the stored fingerprint matches the models, create_all and table
+    inspection are skipped entirely. create_all never alters existing
+    tables, so it only runs (and the fingerprint is only stored) when their
+    columns match the models. Raises DatabaseError if the schema cannot be created or needs
+    the Alembic migrations; the engine is then retried on the next call.
+    """
+    target = target_engine or engine
+    if target in _bootstrapped_engines and not force:
+        return True
+
+    with _bootstrap_lock:
+        if target in _bootstrapped_engines and not force:
+            return True
+
+        try:
+            # Import models after everything is set up
+            from app.models import Base
+
+            fingerprint = schema_fingerprint()
+            if force or _stored_fingerprint(target) != fingerprint:
+                logger.info("Schema fingerprint changed, creating/verifying tables...")
+                # Checked before any DDL: the schema hooks read these columns
+                missing = _missing_columns(target, Base.metadata)
+                if missing:
+                    raise DatabaseError(
+                        f"Database schema is older than the models (missing columns: "
+                        f"{', '.join(missing)}). Run 'python -m alembic upgrade head' first."
+                    )
+                Base.metadata.create_all(bind=target)
+                _store_fingerprint(target, fingerprint)
+                logger.info("Database tables created/verified successfully.")
+        except ImportError as e:
+            logger.error(f"Failed to import models: {e}")
+            # Create tables using direct SQLite
+            create_tables_directly()
+        except DatabaseError as e:
+            logger.error(str(e))
+            raise
+        except Exception as e:
+            # Not marked as bootstrapped: the next call tries again
+            logger.error(f"Error checking database state: {e}", exc_info=True)
+            raise DatabaseError("Failed to initialize database", original_exception=e)
+
+        _bootstrapped_engines.add(target)
+    return True
+
 def get_session() -> Session:
     """Get a new database session"""
+    init_db()
     return SessionLocal()
 
 @contextmanager
 def safe_db_context():
     """Context manager for safe database operations"""
+    init_db()
     session = SessionLocal()
     try:
         yield session
@@ -43,43 +244,15 @@ def safe_db_context():
         session.close()
 
 def check_db_state():
-    """Check and create database tables if needed"""
+    """Force a full create/verify of the schema (ignores the fingerprint)"""
     logger.info("Checking database state...")
-    
-    try:
-        # Import models after everything is set up
-        from app.models import Base
-        
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created/verified successfully.")
-        
-        # Check for existing data
-        inspector = inspect(engine)
-        tables = inspector.get_table_names()
-        
-        if "scores" in tables:
-            with engine.connect() as conn:
-                result = conn.execute(text("SELECT COUNT(*) FROM scores"))
-                count = result.scalar()
-                logger.info(f"Found {count} scores in database")
-        
-        return True
-        
-    except ImportError as e:
-        logger.error(f"Failed to import models: {e}")
-        # Create tables using direct SQLite
-        create_tables_directly()
-        return True
-    except Exception as e:
-        logger.error(f"Error checking database state: {e}")
-        create_tables_directly()
-        return True
+    return init_db(force=True)
 
 def create_tables_directly():
     """Create tables using direct SQLite"""
     try:
         conn = sqlite3.connect(DB_PATH)
+        apply_sqlite_pragmas(conn)
         cursor = conn.cursor()
         
         # Create scores table (Updated with sentiment columns)
@@ -93,7 +266,8 @@ def create_tables_directly():
                 reflection_text TEXT,
                 timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
                 detailed_age_group TEXT,
-                user_id INTEGER
+                user_id INTEGER,
+                timestamp_ms INTEGER
             )
         """)
         
@@ -105,7 +279,9 @@ def create_tables_directly():
                 entry_date TEXT DEFAULT CURRENT_TIMESTAMP,
                 content TEXT,
                 sentiment_score REAL,
-                emotional_patterns TEXT
+                emotional_patterns TEXT,
+                entry_date_ms INTEGER,
+                user_id INTEGER
             )
         """)
         
@@ -128,13 +304,23 @@ def create_tables_directly():
         logger.error(f"Failed to create tables: {e}")
         raise DatabaseError("Failed to initialize database", original_exception=e)
 
-# Initialize database
-check_db_state()
-
 # Backward compatibility
 def get_connection(db_path=None):
+    """
+    Raw DB-API connection for legacy sqlite3-style callers.
+
+    Connections for the main database are checked out of the shared engine
+    pool, so they carry the same PRAGMAs as ORM sessions and close() returns
+    them to the pool. An explicit db_path to another file gets a standalone
+    connection with the same PRAGMA profile applied.
+    """
     try:
-        return sqlite3.connect(db_path or DB_PATH)
-    except sqlite3.Error as e:
+        if db_path is None or os.path.abspath(db_path) == os.path.abspath(DB_PATH):
+            init_db()
+            return engine.raw_connection()
+        conn = sqlite3.connect(db_path, **query_metrics.connect_args())
+        apply_sqlite_pragmas(conn)
+        return conn
+    except (sqlite3.Error, SQLAlchemyError) as e:
         logger.error(f"Failed to connect to SQLite DB: {e}", exc_info=True)
-        raise DatabaseError("Failed to connect to raw database.", original_exception=e)
\ No newline at end of file
+        raise DatabaseError("Failed to connect to raw database.", original_exception=e)
@@ -25,7 +25,7 @@ except Exception:
     SentimentIntensityAnalyzer = None
 import traceback # Keep this, it was in the original and not explicitly removed
 
-from app.db import get_session, get_connection
+from app.db import get_session, init_db
 from app.config import APP_CONFIG
 from app.constants import BENCHMARK_DATA
 from app.models import User, Score, Response, Question
@@ -34,6 +34,9 @@ from app.logger import setup_logging
 from app.analysis.data_cleaning import DataCleaner
 from app.utils import load_settings, save_settings, compute_age_group
 from app.questions import load_questions
+from app.services.response_buffer import recover_pending_sessions
+from app.services.maintenance import start_maintenance, stop_maintenance
+from app.query_metrics import save_query_stats_at_exit
 
 # Try importing optional features
 try:
@@ -43,10 +46,10 @@ except ImportError:
     JournalFeature = None
 
 try:
-    from app.ml.predictor import SoulSenseMLPredictor
+    from app.ml.loader import load_predictor
 except ImportError:
-    logging.warning("Could not import SoulSenseMLPredictor")
-    SoulSenseMLPredictor = None
+    logging.warning("Could not import the ML predictor loader")
+    load_predictor = None
 
 try:
     from app.ui.dashboard import AnalyticsDashboard
@@ -124,20 +127,19 @@ logging.basicConfig(
 logging.info("Application started")
 
 # ---------------- DB INIT ----------------
-conn = get_connection()
-cursor = conn.cursor()
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS scores (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT,
-    total_score INTEGER,
-    age INTEGER,
-    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-)
-""")
+# Creates the schema only when the stored fingerprint is stale
+init_db()
 
-conn.commit()
+# Replay exam sessions that were buffered but never flushed (e.g. after a crash)
+try:
+    recovered_sessions = recover_pending_sessions()
+    if recovered_sessions:
+        logging.info("Recovered %s unflushed exam session(s)", recovered_sessions)
+except Exception:
+    logging.error("Failed to recover pending exam sessions", exc_info=True)
+
+# WAL checkpoints, ANALYZE and incremental vacuum between exam writes
+start_maintenance()
 
 # ---------------- LOAD QUESTIONS FROM DB ----------------
 try:
@@ -168,14 +170,8 @@ class SoulSenseApp:
         self.results = ResultsManager(self)
         self.settings_manager = SettingsManager(self)
         
-        # Initialize ML Predictor
-
-        try:
-            self.ml_predictor = SoulSenseMLPredictor()
-            logging.info("ML Predictor initialized successfully")
-        except Exception as e:
-            logging.error(f"Failed to initialize ML Predictor: {e}")
-            self.ml_predictor = None
+        # Initialize ML Predictor: loads on a background thread, check ready() before use
+        self.ml_predictor = load_predictor() if load_predictor else None
 
         # Initialize Journal Feature
         self.journal_feature = JournalFeature(self.root)
@@ -520,10 +516,7 @@ class SoulSenseApp:
         self.results.reset_test()
 
     def force_exit(self):
-        try:
-            conn.close()
-        except Exception:
-            pass
+        stop_maintenance()
         self.root.destroy()
         sys.exit(0)
 
@@ -557,6 +550,9 @@ class SplashScreen:
         self.root.after(delay, callback)
 
 if __name__ == "__main__":
+    # Merge this run's SQL statement counters into logs/query_stats.json on exit
+    save_query_stats_at_exit()
+
     splash_root = tk.Tk()
     splash = SplashScreen(splash_root)
 
@@ -1,5 +1,23 @@
-from .predictor import SoulSenseMLPredictor
-from .bias_checker import SimpleBiasChecker
-from .versioning import ModelVersioningManager
-from .clustering import EmotionalProfileClusterer
-from .score_analyzer import ScoreAnalyzer
+# Submodules are imported on first use: they pull in sklearn, matplotlib and
+# seaborn, which app startup should not pay for (see app.ml.loader)
+import importlib
+
+_EXPORTS = {
+    "SoulSenseMLPredictor": ".predictor",
+    "SimpleBiasChecker": ".bias_checker",
+    "ModelVersioningManager": ".versioning",
+    "EmotionalProfileClusterer": ".clustering",
+    "ScoreAnalyzer": ".score_analyzer",
+    "PredictorHandle": ".loader",
+    "load_predictor": ".loader",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -8,41 +8,100 @@ import json
 import os
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
+
+from app.db import get_connection
+from app.services import stats
+from app.services.exam_sessions import read_responses
+
+AGE_BIAS_SQL = """
+    SELECT 
+        CASE 
+            WHEN age < 18 THEN 'Under 18'
+            WHEN age BETWEEN 18 AND 25 THEN '18-25'
+            WHEN age BETWEEN 26 AND 35 THEN '26-35'
+            WHEN age BETWEEN 36 AND 50 THEN '36-50'
+            WHEN age BETWEEN 51 AND 65 THEN '51-65'
+            WHEN age > 65 THEN '65+'
+            ELSE 'Unknown'
+        END as age_group,
+        COUNT(*) as count,
+        AVG(total_score) as avg_score,
+        MIN(total_score) as min_score,
+        MAX(total_score) as max_score
+    FROM scores 
+    WHERE age IS NOT NULL
+    GROUP BY age_group
+    HAVING count >= 5  -- Only show groups with enough data
+    ORDER BY avg_score DESC
+"""
+
+# Attempts with a known age, joined to their answers in Python (see
+# question_fairness_rows); decoding the packed answers through the
+# all_responses view is far slower than np.frombuffer
+SCORED_SESSIONS_SQL = """
+    SELECT session_id, age
+    FROM scores
+    WHERE age IS NOT NULL AND session_id IS NOT NULL
+"""
+
+def question_fairness_rows(responses, sessions):
+    """
+    [question_id, age_category, avg_response, count] per question for
+    Younger (< 35) and Older respondents, groups of at least 3 answers.
+    responses: load_responses()-style frame; sessions: (session_id, age) rows.
+    """
+    ages = pd.DataFrame(sessions, columns=["session_id", "age"]).astype({"session_id": "int64"})
+    answers = responses[["session_id", "question_id", "response_value"]].dropna(subset=["session_id"])
+    answers = answers.astype({"session_id": "int64", "question_id": "int64", "response_value": "float64"})
+    merged = answers.merge(ages, on="session_id")
+    merged["age_category"] = np.where(merged["age"] < 35, "Younger", "Older")
+    grouped = (merged.groupby(["question_id", "age_category"])["response_value"]
+               .agg(["mean", "count"]).reset_index())
+    grouped = grouped[grouped["count"] >= 3]
+    return [[int(qid), category, float(avg), int(count)]
+            for qid, category, avg, count in grouped.itertuples(index=False, name=None)]
+
 class SimpleBiasChecker:
-    def __init__(self, db_path="db/soulsense.db"):
+    def __init__(self, db_path=None):
+        # None means the application database, whose summaries are cached
         self.db_path = db_path
     
+    def _connect(self):
+        return get_connection() if self.db_path is None else sqlite3.connect(self.db_path)
+    
+    def _fetch_rows(self, sql):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql)
+            return [list(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    def _fetch_question_fairness(self):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            responses = read_responses(cursor)
+            cursor.execute(SCORED_SESSIONS_SQL)
+            sessions = cursor.fetchall()
+        finally:
+            conn.close()
+        return question_fairness_rows(responses, sessions)
+    
+    def _summary_rows(self, name, fetch, depends_on):
+        """Grouped rows from `fetch()`, cached until the source tables change"""
+        if self.db_path is not None:
+            return fetch()
+        return stats.get_or_compute(name, fetch, depends_on=depends_on)
+    
     def check_age_bias(self):
         """Simple check: Are scores different across age groups?"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Get average scores by age group
-            cursor.execute("""
-                SELECT 
-                    CASE 
-                        WHEN age < 18 THEN 'Under 18'
-                        WHEN age BETWEEN 18 AND 25 THEN '18-25'
-                        WHEN age BETWEEN 26 AND 35 THEN '26-35'
-                        WHEN age BETWEEN 36 AND 50 THEN '36-50'
-                        WHEN age BETWEEN 51 AND 65 THEN '51-65'
-                        WHEN age > 65 THEN '65+'
-                        ELSE 'Unknown'
-                    END as age_group,
-                    COUNT(*) as count,
-                    AVG(total_score) as avg_score,
-                    MIN(total_score) as min_score,
-                    MAX(total_score) as max_score
-                FROM scores 
-                WHERE age IS NOT NULL
-                GROUP BY age_group
-                HAVING count >= 5  -- Only show groups with enough data
-                ORDER BY avg_score DESC
-            """)
-            
-            results = cursor.fetchall()
-            conn.close()
+            results = self._summary_rows("bias_age_groups", lambda: self._fetch_rows(AGE_BIAS_SQL), ["scores"])
             
             if len(results) < 2:
                 return {"status": "insufficient_data", "message": "Need more data from different age groups"}
@@ -84,31 +143,9 @@ class SimpleBiasChecker:
     def check_question_fairness(self):
         """Check if questions have similar average responses across ages"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT 
-                    question_id,
-                    CASE 
-                        WHEN age < 35 THEN 'Younger'
-                        WHEN age >= 35 THEN 'Older'
-                        ELSE 'Unknown'
-                    END as age_category,
-                    AVG(response_value) as avg_response,
-                    COUNT(*) as count
-                FROM responses r
-                JOIN scores s ON r.username = s.username 
-                    AND DATE(r.timestamp) = DATE(s.timestamp)
-                WHERE age IS NOT NULL 
-                    AND age_category IN ('Younger', 'Older')
-                GROUP BY question_id, age_category
-                HAVING count >= 3
-                ORDER BY question_id, age_category
-            """)
-            
-            results = cursor.fetchall()
-            conn.close()
+            results = self._summary_rows(
+                "bias_question_fairness", self._fetch_question_fairness, ["scores", "responses", "exam_sessions"]
+            )
             
             # Group by question
             question_data = {}
@@ -25,6 +25,8 @@ except ImportError:
 # Database imports
 from app.db import get_session, safe_db_context
 from app.models import Score, Response, User
+from app.services.exam_sessions import load_responses
+from app.services.users import resolve_user_id, user_filter
 
 logger = logging.getLogger(__name__)
 
@@ -133,14 +135,17 @@ class EmotionalFeatureExtractor:
         """Extract emotional features for a single user."""
         try:
             with safe_db_context() as session:
+                user_id = resolve_user_id(username)
                 # Get all scores for the user
-                scores = session.query(Score).filter_by(username=username).order_by(Score.timestamp).all()
+                scores = session.query(Score).filter(
+                    user_filter(Score, username, user_id)
+                ).order_by(Score.timestamp).all()
                 
                 if not scores or len(scores) < 1:
                     return None
                 
-                # Get all responses for the user
-                responses = session.query(Response).filter_by(username=username).all()
+                # Get all responses for the user (packed sessions and legacy rows)
+                responses = list(load_responses(username, user_id=user_id).itertuples(index=False))
                 
                 # Extract score-based features
                 score_values = [s.total_score for s in scores if s.total_score is not None]
@@ -0,0 +1,331 @@
+"""
+Flat-array inference for tree-ensemble classifiers.
+
+compile_forest() packs a fitted RandomForest/ExtraTrees classifier (and its
+StandardScaler) into a handful of NumPy arrays spanning all trees:
+
+    feature       intp    split feature per node (0 for leaves)
+    threshold     float64 split threshold (+inf for leaves)
+    children      intp    [right, left] pair per node, so the next node is
+                          children[2 * node + go_left]; leaves point at themselves
+    missing_left  bool    NaN goes left (sklearn >= 1.3 trees)
+    leaf_proba    float64 class probabilities per node, as the tree's
+                          predict_proba returns them for that leaf
+    roots         intp    first node of each tree
+
+CompiledForest evaluates every tree for every row at once, one vectorized
+step per tree level, with no sklearn input validation (for a handful of
+rows it decides every split first and then only follows children). It
+reproduces sklearn bit for bit: rows are compared as float32 like
+sklearn's tree input, scaling is the same in-place subtract/divide, and
+tree probabilities are accumulated strictly in estimator order (a
+cumulative sum, not a pairwise one) before dividing by the number of trees.
+
+contributions() attributes each prediction to the features: every
+split on a row's path moves the class probabilities, and that change is
+credited to the split feature (path-based decision contributions). The
+per-node path sums are computed once per forest and cached, so a batch of
+rows costs one traversal plus a gather.
+
+save() writes one .npy file per array plus meta.json into a temp
+directory and renames it into place, so load() is a set of
+np.load(mmap_mode="r") calls instead of an unpickle and never sees a half
+written forest. meta.json records the hash of the model it was compiled
+from; load() refuses a forest compiled from another model. The model
+registry keeps this next to model.pkl (see ModelRegistry.get_model(compiled=True)).
+
+Only StandardScaler scaling is compiled; a model with any other scaler is
+left to sklearn.
+"""
+
+import json
+import os
+import shutil
+import uuid
+from typing import Optional
+
+import numpy as np
+import sklearn
+from sklearn.preprocessing import StandardScaler
+
+FORMAT_VERSION = 1
+# Rows evaluated together; keeps the (trees, rows, classes) work array in cache
+BATCH_ROWS = 128
+# Up to this many rows every node's split is decided up front (fewer numpy
+# calls than walking the trees level by level)
+DENSE_ROWS = 8
+# Before 1.4 tree leaves held weighted counts that predict_proba normalized
+_NORMALIZED_VALUES = tuple(int(part) for part in sklearn.__version__.split(".")[:2]) >= (1, 4)
+
+_ARRAYS = ("feature", "threshold", "children", "missing_left", "leaf_proba",
+           "roots", "classes", "feature_importances", "mean", "scale")
+
+
+def _leaf_proba(tree, n_classes: int) -> np.ndarray:
+    proba = np.array(tree.tree_.value[:, 0, :n_classes], dtype=np.float64)
+    if not _NORMALIZED_VALUES:
+        normalizer = proba.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        proba /= normalizer
+    return proba
+
+
+def compile_forest(model, scaler=None) -> "CompiledForest":
+    """
+    Pack a fitted single-output tree-ensemble classifier (and optional
+    StandardScaler) into a CompiledForest. TypeError if it is not one, or
+    the scaler is not a StandardScaler.
+    """
+    if isinstance(model, CompiledForest):
+        return model
+    if scaler is not None and not isinstance(scaler, StandardScaler):
+        raise TypeError(f"Cannot compile {type(scaler).__name__}: only StandardScaler scaling is compiled")
+    estimators = getattr(model, "estimators_", None)
+    if not estimators or not all(hasattr(e, "tree_") for e in estimators) \
+            or getattr(model, "n_outputs_", 1) != 1 or not hasattr(model, "classes_"):
+        raise TypeError(f"Cannot compile {type(model).__name__}: not a fitted tree-ensemble classifier")
+
+    n_classes = len(model.classes_)
+    feature, threshold, children, missing_left, leaf_proba, roots = [], [], [], [], [], []
+    offset = 0
+    depth = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        nodes = np.arange(tree.node_count)
+        leaf = tree.children_left == -1
+        left = np.where(leaf, nodes, tree.children_left) + offset
+        right = np.where(leaf, nodes, tree.children_right) + offset
+
+        feature.append(np.where(leaf, 0, tree.feature).astype(np.intp))
+        threshold.append(np.where(leaf, np.inf, tree.threshold))
+        children.append(np.column_stack([right, left]).astype(np.intp).ravel())
+        missing = getattr(tree, "missing_go_to_left", None)
+        missing_left.append(np.zeros(tree.node_count, dtype=bool) if missing is None
+                            else np.asarray(missing, dtype=bool) & ~leaf)
+        leaf_proba.append(_leaf_proba(estimator, n_classes))
+        roots.append(offset)
+        offset += tree.node_count
+        depth = max(depth, tree.max_depth)
+
+    if scaler is not None:
+        mean = getattr(scaler, "mean_", None) if getattr(scaler, "with_mean", True) else None
+        scale = getattr(scaler, "scale_", None) if getattr(scaler, "with_std", True) else None
+    else:
+        mean = scale = None
+
+    return CompiledForest(
+        feature=np.concatenate(feature),
+        threshold=np.concatenate(threshold),
+        children=np.concatenate(children),
+        missing_left=np.concatenate(missing_left),
+        leaf_proba=np.concatenate(leaf_proba),
+        roots=np.asarray(roots, dtype=np.intp),
+        classes=np.asarray(model.classes_),
+        feature_importances=np.asarray(model.feature_importances_, dtype=np.float64),
+        mean=np.empty(0) if mean is None else np.asarray(mean, dtype=np.float64),
+        scale=np.empty(0) if scale is None else np.asarray(scale, dtype=np.float64),
+        depth=depth,
+        n_features=int(model.n_features_in_),
+    )
+
+
+def try_compile(model, scaler=None) -> Optional["CompiledForest"]:
+    """compile_forest(), or None for models it does not handle"""
+    try:
+        return compile_forest(model, scaler)
+    except TypeError:
+        return None
+
+
+class CompiledForest:
+    """
+    A compiled tree ensemble; a drop-in for the fitted classifier's
+    predict / predict_proba / classes_ / feature_importances_ and the
+    scaler's transform.
+    """
+
+    def __init__(self, feature, threshold, children, missing_left, leaf_proba, roots,
+                 classes, feature_importances, mean, scale, depth: int, n_features: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.missing_left = missing_left
+        self.leaf_proba = leaf_proba
+        self.roots = roots
+        self.classes = classes
+        self.feature_importances = feature_importances
+        self.mean = mean
+        self.scale = scale
+        self.depth = depth
+        self.n_features = n_features
+        self.has_missing = bool(missing_left.any())
+        self._root_column = np.ascontiguousarray(roots[:, np.newaxis])
+        self._paths = None
+
+    # sklearn attribute names, for code written against the estimator
+    @property
+    def classes_(self):
+        return self.classes
+
+    @property
+    def feature_importances_(self):
+        return self.feature_importances
+
+    @property
+    def n_features_in_(self):
+        return self.n_features
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def transform(self, X) -> np.ndarray:
+        """StandardScaler.transform: subtract mean_, divide by scale_"""
+        X = np.array(X, dtype=np.float64, ndmin=2)
+        if self.mean.size:
+            X -= self.mean
+        if self.scale.size:
+            X /= self.scale
+        return X
+
+    def _decisions(self, X: np.ndarray) -> np.ndarray:
+        """(rows * nodes) go-left decision of every node for every row"""
+        values = X.ravel().take(self.feature) if len(X) == 1 else X.take(self.feature, axis=1)
+        go_left = values <= self.threshold
+        if self.has_missing:
+            go_left |= np.isnan(values) & self.missing_left
+        return go_left.ravel()
+
+    def apply(self, X) -> np.ndarray:
+        """Leaf reached in every tree: (trees, rows) global node indices"""
+        # sklearn compares float32 inputs; widening once keeps the comparisons exact and uncast
+        X = np.asarray(X, dtype=np.float32).reshape(-1, self.n_features).astype(np.float64)
+        n = len(X)
+        if n == 1:
+            # One row (interactive scoring): decide every node up front, then only follow children
+            go_left = self._decisions(X).view(np.int8)
+            node = self.roots
+            for _ in range(self.depth):
+                node = self.children.take(2 * node + go_left.take(node))
+            return node[:, np.newaxis]
+
+        node = np.repeat(self._root_column, n, axis=1)
+        if n <= DENSE_ROWS:
+            go_left = self._decisions(X).view(np.int8)
+            row_base = np.arange(0, n * len(self.feature), len(self.feature))
+            for _ in range(self.depth):
+                node = self.children.take(2 * node + go_left.take(node + row_base))
+            return node
+
+        flat = X.ravel()
+        offsets = np.arange(0, X.size, self.n_features)
+        for _ in range(self.depth):
+            values = flat.take(self.feature.take(node) + offsets)
+            go_left = values <= self.threshold.take(node)
+            if self.has_missing:
+                go_left |= np.isnan(values) & self.missing_left.take(node)
+            node = self.children.take(2 * node + go_left)
+        return node
+
+    def _proba(self, leaves: np.ndarray) -> np.ndarray:
+        proba = self.leaf_proba.take(leaves, axis=0)
+        # Sum trees in estimator order, exactly as sklearn accumulates them
+        proba = np.cumsum(proba, axis=0)[-1]
+        proba /= len(self.roots)
+        return proba
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = np.asarray(X).reshape(-1, self.n_features)
+        if len(X) > BATCH_ROWS:
+            return np.concatenate([self.predict_proba(X[start:start + BATCH_ROWS])
+                                   for start in range(0, len(X), BATCH_ROWS)])
+        return self._proba(self.apply(X))
+
+    def _path_contributions(self) -> np.ndarray:
+        """
+        (nodes, features, classes): for every node, the probability change
+        each feature's splits made on the way down from the root. Built once
+        per forest, level by level across all trees.
+        """
+        if self._paths is None:
+            value = self.leaf_proba
+            paths = np.zeros((len(self.feature), self.n_features, value.shape[1]))
+            right, left = self.children[0::2], self.children[1::2]
+            frontier = self.roots
+            while frontier.size:
+                parents = frontier[right.take(frontier) != frontier]
+                kids = np.concatenate([left.take(parents), right.take(parents)])
+                parents = np.concatenate([parents, parents])
+                paths[kids] = paths[parents]
+                paths[kids, self.feature.take(parents)] += value.take(kids, axis=0) - value.take(parents, axis=0)
+                frontier = kids
+            self._paths = paths
+        return self._paths
+
+    def explain(self, X):
+        """(predict_proba(X), bias, contrib) from a single traversal; see contributions()"""
+        X = np.asarray(X).reshape(-1, self.n_features)
+        paths = self._path_contributions()
+        proba = np.empty((len(X), self.leaf_proba.shape[1]))
+        contrib = np.empty((len(X),) + paths.shape[1:])
+        for start in range(0, len(X), BATCH_ROWS):
+            leaves = self.apply(X[start:start + BATCH_ROWS])
+            proba[start:start + BATCH_ROWS] = self._proba(leaves)
+            contrib[start:start + BATCH_ROWS] = paths.take(leaves, axis=0).sum(axis=0)
+        contrib /= len(self.roots)
+        return proba, self.leaf_proba.take(self.roots, axis=0).mean(axis=0), contrib
+
+    def contributions(self, X):
+        """
+        Decision-path attributions (Saabas): (bias, contrib) where bias is
+        the forest's mean root probability per class and contrib is
+        (rows, features, classes), so bias + contrib.sum(axis=1) equals
+        predict_proba(X) up to rounding.
+        """
+        _, bias, contrib = self.explain(X)
+        return bias, contrib
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def save(self, directory: str, model_hash: str = ""):
+        """
+        Write the forest to `directory` (which must not exist yet) through a
+        temp directory and one rename; `model_hash` identifies the source model
+        """
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = os.path.join(parent, f".{os.path.basename(directory)}.{uuid.uuid4().hex}.tmp")
+        os.makedirs(tmp_dir)
+        try:
+            for name in _ARRAYS:
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), getattr(self, name), allow_pickle=False)
+            meta = {"format": FORMAT_VERSION, "depth": self.depth, "n_features": self.n_features,
+                    "model_hash": model_hash}
+            with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            try:
+                os.replace(tmp_dir, directory)
+            except OSError:
+                # Another process saved the same forest first
+                if not os.path.exists(os.path.join(directory, "meta.json")):
+                    raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True, model_hash: Optional[str] = None) -> "CompiledForest":
+        """Map a saved forest; ValueError if its format or (given `model_hash`) source model differs"""
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled forest format {meta.get('format')} in {directory}")
+        if model_hash is not None and meta.get("model_hash") != model_hash:
+            raise ValueError(f"Compiled forest in {directory} was built from another model")
+        arrays = {}
+        for name in _ARRAYS:
+            array = np.load(os.path.join(directory, f"{name}.npy"),
+                            mmap_mode="r" if mmap else None, allow_pickle=False)
+            # Plain ndarray views of the mapping skip np.memmap's per-operation wrapping
+            arrays[name] = array.view(np.ndarray) if isinstance(array, np.memmap) else array
+        return cls(depth=meta["depth"], n_features=meta["n_features"], **arrays)
@@ -0,0 +1,70 @@
+"""
+Non-blocking access to the ML predictor.
+
+load_predictor() returns a PredictorHandle straight away and loads the
+production model (see SoulSenseMLPredictor.load_model) on a daemon thread,
+including the sklearn imports, so app startup pays for neither. The model
+is never trained here: a missing or outdated model falls back to the
+bundled default, and retraining is the explicit
+`python -m app.ml.predictor --retrain` job.
+
+This module must stay cheap to import (no sklearn / app.ml.predictor at
+module level).
+"""
+
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PredictorHandle:
+    """A SoulSenseMLPredictor that may still be loading"""
+
+    def __init__(self, use_versioning: bool = True):
+        self.use_versioning = use_versioning
+        self.future: Future = Future()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "PredictorHandle":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._load, name="ml-predictor-load", daemon=True)
+            self._thread.start()
+        return self
+
+    def _load(self):
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            from app.ml.predictor import SoulSenseMLPredictor
+            predictor = SoulSenseMLPredictor(use_versioning=self.use_versioning)
+        except BaseException as e:
+            logger.error(f"Failed to load ML predictor: {e}")
+            self.future.set_exception(e)
+            return
+        logger.info(f"ML predictor ready (v{predictor.current_version})")
+        self.future.set_result(predictor)
+
+    def ready(self) -> bool:
+        """Loaded and usable"""
+        return self.future.done() and self.future.exception() is None
+
+    def failed(self) -> bool:
+        return self.future.done() and self.future.exception() is not None
+
+    def get(self, timeout: Optional[float] = None):
+        """The predictor, waiting up to `timeout` seconds; re-raises a load failure"""
+        return self.future.result(timeout)
+
+    def predict_with_explanation(self, *args, **kwargs):
+        return self.get().predict_with_explanation(*args, **kwargs)
+
+    def predict_batch(self, *args, **kwargs):
+        return self.get().predict_batch(*args, **kwargs)
+
+
+def load_predictor(use_versioning: bool = True) -> PredictorHandle:
+    """Start loading the predictor in the background; returns immediately"""
+    return PredictorHandle(use_versioning).start()
@@ -0,0 +1,98 @@
+"""
+Memoized predict_with_explanation results.
+
+Predictor inputs are five 0-5 item scores, an integer age and total and a
+sentiment score, so the same feature vector comes up again and again
+across users. PredictionCache is a bounded LRU keyed by (model generation,
+model version, feature vector). The key holds the sentiment at the
+resolution of ml.prediction_cache_sentiment_step, so nearby sentiments
+share an entry and a hit skips inference, attribution and explanation text
+entirely; the model itself always scores the raw sentiment.
+
+Loading, retraining, promoting or rolling back a model calls invalidate(),
+which starts a new generation: entries of the old one are dropped, and a
+prediction still running against the old model is not stored.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+
+def quantize(value, step: float):
+    """
+    `value` (a number or an array) rounded to a multiple of `step`;
+    unchanged when step <= 0. Halves round to even, as in round().
+    """
+    if step <= 0:
+        return value if isinstance(value, np.ndarray) else float(value)
+    # Second round drops float noise such as 0.30000000000000004
+    rounded = np.round(np.round(np.asarray(value, dtype=float) / step) * step, 10)
+    return rounded if isinstance(value, np.ndarray) else float(rounded)
+
+
+class PredictionCache:
+    """Thread-safe bounded LRU with hit/miss/eviction/invalidation counters"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max(0, int(max_size))
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def key(self, *parts: Hashable) -> Tuple:
+        """Cache key for `parts` in the current generation"""
+        return (self._generation,) + parts
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Tuple, value: Any):
+        if not self.enabled:
+            return
+        with self._lock:
+            if key[0] != self._generation:
+                # Computed with a model that has since been replaced
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Forget every entry; keys built before this no longer match"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+            }
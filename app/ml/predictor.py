@@ -17,29 +17,103 @@ import warnings
 warnings.filterwarnings('ignore')
 from app.analysis.data_cleaning import DataCleaner
 from .versioning import ModelVersioningManager, create_versioning_manager
+from .compiled_forest import try_compile
+from .prediction_cache import PredictionCache, quantize
 import logging
-from app.config import MODELS_DIR, DATA_DIR
+from app.config import MODELS_DIR, DATA_DIR, PREDICTION_CACHE_SIZE, PREDICTION_CACHE_SENTIMENT_STEP
 import os
 
 logger = logging.getLogger(__name__)
 
+FEATURE_NAMES = (
+    'emotional_recognition',      # Q1
+    'emotional_understanding',    # Q2
+    'emotional_regulation',       # Q3
+    'emotional_reflection',       # Q4
+    'social_awareness',           # Q5
+    'total_score',
+    'age',
+    'average_score',
+    'sentiment_score'             # New Feature
+)
+# Prebuilt model shipped with the app, so a fresh install never trains on
+# startup; rebuild with `python -m app.ml.predictor --build-default`
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'default_model.joblib')
+
+# Recommendation rules, applied in order: (tips, rule). A rule takes the
+# prediction and the feature values, as scalars or as whole columns.
+RECOMMENDATION_RULES = [
+    # Sentiment-Specific Advice
+    (("Prioritize Self-Care: Your sentiment analysis suggests significant stress or distress.",
+      "Journaling 2.0: Try 'Cognitive Reframing' to challenge negative thoughts."),
+     lambda prediction, f: f['sentiment_score'] < -40),
+    (("Your sentiment is slightly negative. Try listing 3 things you're grateful for.",),
+     lambda prediction, f: (f['sentiment_score'] >= -40) & (f['sentiment_score'] < -10)),
+    # General Advice based on Risk Level
+    (("Consider consulting a mental health professional for personalized support.",
+      "Reach out to a trusted friend or family member to share your feelings."),
+     lambda prediction, f: prediction == 2),
+    (("Try setting aside 10 minutes daily for mindfulness or meditation.",
+      "Focus on maintaining a regular sleep schedule."),
+     lambda prediction, f: prediction == 1),
+    # Specific Advice based on Low Scores
+    (("Practice 'Box Breathing': Inhale 4s, Hold 4s, Exhale 4s, Hold 4s.",
+      "Identify your triggers: Write down what situations cause strong reactions."),
+     lambda prediction, f: f['emotional_regulation'] <= 2),
+    (("Active Listening: Focus entirely on the speaker without planning your response.",
+      "Observe Body Language: Notice non-verbal cues in your next conversation."),
+     lambda prediction, f: f['social_awareness'] <= 2),
+    (("Emotion Labeling: paused to specifically name what you are feeling (e.g., 'Frustrated').",),
+     lambda prediction, f: f['emotional_understanding'] <= 2),
+    (("Body Scan: Close your eyes and notice where you feel tension in your body.",),
+     lambda prediction, f: f['emotional_recognition'] <= 2),
+]
+FALLBACK_RECOMMENDATIONS = (
+    "Continue engaging in hobbies that bring you joy.",
+    "Maintain your current healthy emotional habits!",
+)
+MAX_RECOMMENDATIONS = 6
+# Feature values get_recommendations assumes when a feature is missing
+RECOMMENDATION_DEFAULTS = {
+    'sentiment_score': 0.0,
+    'emotional_regulation': 5,
+    'social_awareness': 5,
+    'emotional_understanding': 5,
+    'emotional_recognition': 5,
+}
+# Question-score columns, in order, as prepare_features reads q_scores
+Q_SCORE_FEATURES = list(FEATURE_NAMES[:5])
+# predict_batch input columns; an ndarray gives them in this order (the
+# last two may be left off)
+BATCH_COLUMNS = Q_SCORE_FEATURES + ['age', 'total_score', 'sentiment_score', 'answer_count']
+EXPLAIN_MODES = (False, "summary", "full")
+# Columns of the explain="summary" ranking
+TOP_FEATURES = 3
+
+
+def _result_copy(result):
+    """A cached prediction the caller may modify without touching the cache"""
+    return {key: value.copy() if isinstance(value, (dict, list)) else value for key, value in result.items()}
+
+
+def _recommendation_list(matched):
+    """Tips for one row of rule matches"""
+    advice = [tip for (tips, _), hit in zip(RECOMMENDATION_RULES, matched) if hit for tip in tips]
+    if not advice:
+        advice = list(FALLBACK_RECOMMENDATIONS)
+    return advice[:MAX_RECOMMENDATIONS]
+
+
 class SoulSenseMLPredictor:
     MODEL_NAME = "soulsense_predictor"
     
-    def __init__(self, use_versioning: bool = True):
+    def __init__(self, use_versioning: bool = True, load: bool = True):
         self.model = None
         self.scaler = StandardScaler()
-        self.feature_names = [
-            'emotional_recognition',      # Q1
-            'emotional_understanding',    # Q2
-            'emotional_regulation',       # Q3
-            'emotional_reflection',       # Q4
-            'social_awareness',           # Q5
-            'total_score',
-            'age',
-            'average_score',
-            'sentiment_score'             # New Feature
-        ]
+        # Compiled flat-array copy of model + scaler used for inference, when
+        # the model is a tree ensemble (see app.ml.compiled_forest)
+        self.engine = None
+        self.feature_names = list(FEATURE_NAMES)
         self.class_names = ['Low Risk', 'Moderate Risk', 'High Risk']
         self.use_versioning = use_versioning
         self.versioning_manager = None
@@ -49,33 +123,13 @@ class SoulSenseMLPredictor:
         if use_versioning:
             self.versioning_manager = create_versioning_manager()
         
-        # Try to load existing model, otherwise train new one
-        try:
+        # predict_with_explanation results, dropped whenever the model changes
+        self.prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE)
+        
+        # Never trains: without a usable registered or saved model this
+        # loads the bundled default (see retrain() for the training job)
+        if load:
             self.load_model()
-            # Check if loaded model has sentiment support
-            if 'sentiment_score' not in self.feature_names:
-                print("🔄 Model outdated (no sentiment). Retraining...")
-                # RESET feature names to include sentiment_score
-                self.feature_names = [
-                    'emotional_recognition',
-                    'emotional_understanding',
-                    'emotional_regulation',
-                    'emotional_reflection',
-                    'social_awareness',
-                    'total_score',
-                    'age',
-                    'average_score',
-                    'sentiment_score'
-                ]
-                self.train_sample_model()
-                self.save_model()
-            else:
-                print("✅ Loaded existing ML model")
-        except Exception as e:
-            logger.info(f"No existing model found: {e}")
-            print("🔄 Training new ML model...")
-            self.train_sample_model()
-            self.save_model()
     
     def prepare_features(self, q_scores, age, total_score, sentiment_score=0.0):
         """Prepare features for ML prediction"""
@@ -222,6 +276,8 @@ class SoulSenseMLPredictor:
             # Save artifacts
             self.save_evaluation_artifacts(y_test, y_pred, report)
             
+            self.engine = try_compile(self.model, self.scaler)
+            self.prediction_cache.invalidate()
             return self.model
             
         except Exception as e:
@@ -262,119 +318,282 @@ class SoulSenseMLPredictor:
         # Prepare features
         X_scaled, feature_dict = self.prepare_features(q_scores, age, total_score, sentiment_score)
         
+        # Same feature vector and model: reuse the whole result. Only the key
+        # buckets the sentiment, so nearly equal tones share one entry; the
+        # model always sees the raw score
+        cache = self.prediction_cache
+        key_features = dict(feature_dict, sentiment_score=quantize(sentiment_score, PREDICTION_CACHE_SENTIMENT_STEP))
+        key = cache.key(self.current_version, tuple(float(key_features[name]) for name in self.feature_names))
+        cached = cache.get(key)
+        if cached is not None:
+            return _result_copy(cached)
+        
         # Scale features
-        X_scaled = self.scaler.transform(X_scaled)
+        scaler, model = self._inference_models()
+        X_scaled = scaler.transform(X_scaled)
         
-        # Make prediction
-        prediction = self.model.predict(X_scaled)[0]
-        probabilities = self.model.predict_proba(X_scaled)[0]
+        # Make prediction (what model.predict returns, without a second pass)
+        probabilities, path_contributions = self._score(X_scaled, explain=True)
+        probabilities = probabilities[0]
+        prediction = model.classes_[np.argmax(probabilities)]
         
-        # Get feature importance
-        feature_importance = self.get_feature_importance(X_scaled[0])
+        # Attribute the prediction to the features
+        importance, contributions, order = self._explain_rows([np.argmax(probabilities)], path_contributions)
+        feature_importance = self._ranked(order[0], importance[0])
+        feature_contributions = {} if contributions is None else self._ranked(order[0], contributions[0])
         
         # Generate explanation
         explanation = self.generate_ml_explanation(
-            prediction, probabilities, feature_dict, feature_importance
+            prediction, probabilities, feature_dict, feature_importance, feature_contributions
         )
         
         # Get recommendations
         recommendations = self.get_recommendations(prediction, feature_dict)
         
-        return {
+        result = {
             'prediction': int(prediction),
             'prediction_label': self.class_names[prediction],
             'probabilities': probabilities.tolist(),
             'confidence': float(probabilities[prediction]),
             'features': feature_dict,
             'feature_importance': feature_importance,
+            'feature_contributions': feature_contributions,
             'explanation': explanation,
             'recommendations': recommendations
         }
+        cache.put(key, result)
+        return _result_copy(result)
     
-    def get_recommendations(self, prediction, features):
-        """Generate actionable advice based on specific feature deficits"""
-        advice = []
-        
-        sentiment = features.get('sentiment_score', 0.0)
-        
-        # Sentiment-Specific Advice
-        if sentiment < -40:
-            advice.append("Prioritize Self-Care: Your sentiment analysis suggests significant stress or distress.")
-            advice.append("Journaling 2.0: Try 'Cognitive Reframing' to challenge negative thoughts.")
-        elif sentiment < -10:
-            advice.append("Your sentiment is slightly negative. Try listing 3 things you're grateful for.")
-        
-        # General Advice based on Risk Level
-        if prediction == 2: # High Risk
-            advice.append("Consider consulting a mental health professional for personalized support.")
-            advice.append("Reach out to a trusted friend or family member to share your feelings.")
-        elif prediction == 1: # Moderate Risk
-            advice.append("Try setting aside 10 minutes daily for mindfulness or meditation.")
-            advice.append("Focus on maintaining a regular sleep schedule.")
+    def _inference_models(self):
+        """(scaler, model) to predict with: the compiled engine when there is one"""
+        if self.engine is not None:
+            return self.engine, self.engine
+        return self.scaler, self.model
+    
+    def predict_batch(self, data, explain=False):
+        """
+        Score many assessments at once; the batch form of predict_with_explanation.
 
-        # Specific Advice based on Low Scores
-        # Emotional Regulation (Q3)
-        if features.get('emotional_regulation', 5) <= 2:
-            advice.append("Practice 'Box Breathing': Inhale 4s, Hold 4s, Exhale 4s, Hold 4s.")
-            advice.append("Identify your triggers: Write down what situations cause strong reactions.")
-            
-        # Social Awareness (Q5)
-        if features.get('social_awareness', 5) <= 2:
-            advice.append("Active Listening: Focus entirely on the speaker without planning your response.")
-            advice.append("Observe Body Language: Notice non-verbal cues in your next conversation.")
-            
-        # Emotional Understanding (Q2)
-        if features.get('emotional_understanding', 5) <= 2:
-            advice.append("Emotion Labeling: paused to specifically name what you are feeling (e.g., 'Frustrated').")
-            
-        # Emotional Recognition (Q1)
-        if features.get('emotional_recognition', 5) <= 2:
-            advice.append("Body Scan: Close your eyes and notice where you feel tension in your body.")
+        data: DataFrame with the BATCH_COLUMNS (age and total_score required;
+        a missing or NaN question score counts as unanswered, sentiment_score
+        defaults to 0, and answer_count defaults to the number of answered scores), or an
+        (n, 7..9) array with the columns in BATCH_COLUMNS order.
+        explain: False, "summary" (top feature columns) or "full" (feature
+        values, importance dict and explanation text per row).
 
-        # Fallback
-        if not advice:
-            advice.append("Continue engaging in hobbies that bring you joy.")
-            advice.append("Maintain your current healthy emotional habits!")
-            
-        return advice[:6] # Limit to top 6 tips
+        Returns a DataFrame, one row per input row: prediction,
+        prediction_label, confidence, one probability column per class and
+        recommendations (a tuple of tips).
+        """
+        if explain not in EXPLAIN_MODES:
+            raise ValueError(f"explain must be one of {EXPLAIN_MODES}, got {explain!r}")
+        features = self._batch_features(data)
+        n = len(features['age'])
+        index = data.index if isinstance(data, pd.DataFrame) else pd.RangeIndex(n)
+        
+        X = np.column_stack([features[name] for name in self.feature_names]).astype(float)
+        scaler, model = self._inference_models()
+        X_scaled = scaler.transform(X)
+        probabilities, path_contributions = self._score(X_scaled, explain=bool(explain))
+        best = np.argmax(probabilities, axis=1)
+        prediction = np.asarray(model.classes_).take(best).astype(int)
+        
+        result = pd.DataFrame({
+            'prediction': prediction,
+            'prediction_label': np.asarray(self.class_names, dtype=object).take(prediction),
+            'confidence': probabilities[np.arange(n), best],
+        }, index=index)
+        for i, name in enumerate(self.class_names):
+            result['prob_' + self._class_slug(name)] = probabilities[:, i]
+        result['recommendations'] = self._batch_recommendations(prediction, features)
+        
+        if explain:
+            importance, contributions, order = self._explain_rows(best, path_contributions)
+            names = np.asarray(self.feature_names, dtype=object)
+            for rank in range(min(TOP_FEATURES, len(self.feature_names))):
+                column = order[:, rank:rank + 1]
+                result[f'top_feature_{rank + 1}'] = names.take(column[:, 0])
+                result[f'top_importance_{rank + 1}'] = np.take_along_axis(importance, column, axis=1)[:, 0]
+                if contributions is not None:
+                    result[f'top_contribution_{rank + 1}'] = np.take_along_axis(contributions, column, axis=1)[:, 0]
+        
+        if explain == "full":
+            for name in self.feature_names:
+                result[name] = features[name]
+            rows = self._feature_rows(features)
+            importance_dicts = [self._ranked(o, imp) for o, imp in zip(order, importance)]
+            contribution_dicts = [{} for _ in range(n)] if contributions is None else \
+                [self._ranked(o, c) for o, c in zip(order, contributions)]
+            result['feature_importance'] = importance_dicts
+            result['feature_contributions'] = contribution_dicts
+            result['explanation'] = [
+                self.generate_ml_explanation(int(p), proba, row, imp, contrib)
+                for p, proba, row, imp, contrib in zip(prediction, probabilities, rows, importance_dicts, contribution_dicts)
+            ]
+        return result
     
-    def get_feature_importance(self, features):
-        """Get feature importance for this specific prediction"""
-        if hasattr(self.model, 'feature_importances_'):
-            # Global feature importance
-            global_imp = dict(zip(self.feature_names, self.model.feature_importances_))
+    def explain_cohort(self, data):
+        """
+        Aggregate explanation report for a cohort (predict_batch input):
+        one row per feature, most influential first, with its mean share of
+        the predictions (mean_importance), its mean contribution to each
+        row's predicted class, and its mean contribution to every class
+        probability (contribution_<class>). Without a tree model only the
+        global importances are reported.
+        """
+        features = self._batch_features(data)
+        scaler, _ = self._inference_models()
+        X_scaled = scaler.transform(np.column_stack([features[name] for name in self.feature_names]).astype(float))
+        n = len(X_scaled)
+        
+        report = pd.DataFrame(index=pd.Index(self.feature_names, name='feature'))
+        if self.engine is None:
+            report['mean_importance'] = self._importance_shares(None, 1)[0]
+            return report.sort_values('mean_importance', ascending=False, kind='stable')
+        
+        probabilities, contrib = self._score(X_scaled, explain=True)
+        best = np.argmax(probabilities, axis=1)
+        toward_prediction = contrib[np.arange(n), :, best]
+        report['mean_importance'] = self._importance_shares(toward_prediction, n).mean(axis=0) if n else 0.0
+        report['mean_contribution'] = toward_prediction.mean(axis=0) if n else 0.0
+        for i, name in enumerate(self.class_names):
+            report['contribution_' + self._class_slug(name)] = contrib[:, :, i].mean(axis=0) if n else 0.0
+        return report.sort_values('mean_importance', ascending=False, kind='stable')
+    
+    def _batch_features(self, data):
+        """Cleaned feature columns (name -> array) for predict_batch"""
+        if isinstance(data, pd.DataFrame):
+            frame = data
         else:
-            # Default importance
-            global_imp = {name: 1.0 for name in self.feature_names}
-        
-        # Adjust importance based on feature values
-        personalized_imp = {}
-        for i, (name, value) in enumerate(zip(self.feature_names, features)):
-            # Higher importance for extreme values
-            if name in ['emotional_regulation', 'social_awareness']:
-                if value < 2 or value > 4:  # Extreme values
-                    personalized_imp[name] = global_imp[name] * 1.5
-                else:
-                    personalized_imp[name] = global_imp[name] * 0.8
-            else:
-                personalized_imp[name] = global_imp[name]
-        
-        # Normalize to sum to 1
-        total = sum(personalized_imp.values())
-        if total > 0:
-            personalized_imp = {k: v/total for k, v in personalized_imp.items()}
-        
-        # Sort by importance
-        sorted_imp = dict(sorted(
-            personalized_imp.items(), 
-            key=lambda x: x[1], 
-            reverse=True
-        ))
-        
-        return sorted_imp
+            array = np.asarray(data, dtype=float)
+            if array.ndim != 2 or not 7 <= array.shape[1] <= len(BATCH_COLUMNS):
+                raise ValueError(f"Expected an (n, 7..{len(BATCH_COLUMNS)}) array in {BATCH_COLUMNS} order")
+            frame = pd.DataFrame(array, columns=BATCH_COLUMNS[:array.shape[1]])
+        for column in ('age', 'total_score'):
+            if column not in frame:
+                raise ValueError(f"Missing required column {column!r}")
+        
+        n = len(frame)
+        unanswered = np.full(n, np.nan)
+        q_scores = np.column_stack([
+            frame[name].to_numpy() if name in frame else unanswered for name in Q_SCORE_FEATURES
+        ]) if n else np.empty((0, len(Q_SCORE_FEATURES)))
+        q_scores, age, total_score = DataCleaner.clean_input_arrays(
+            q_scores, frame['age'].to_numpy(), frame['total_score'].to_numpy()
+        )
+        answered = (~np.isnan(q_scores)).sum(axis=1)
+        
+        sentiment = pd.to_numeric(frame['sentiment_score'], errors='coerce').to_numpy(dtype=float) \
+            if 'sentiment_score' in frame else np.zeros(n)
+        answer_count = pd.to_numeric(frame['answer_count'], errors='coerce').to_numpy(dtype=float) \
+            if 'answer_count' in frame else np.full(n, np.nan)
+        answer_count = np.where(np.isnan(answer_count), answered, answer_count)
+        
+        # Unanswered questions take the neutral 3, as in prepare_features
+        features = {name: np.where(np.isnan(q_scores[:, i]), 3, q_scores[:, i])
+                    for i, name in enumerate(Q_SCORE_FEATURES)}
+        features.update({
+            'total_score': total_score,
+            'age': age,
+            'average_score': total_score / np.maximum(answer_count, 1),
+            'sentiment_score': np.nan_to_num(sentiment),
+        })
+        return features
     
-    def generate_ml_explanation(self, prediction, probabilities, features, importance):
-        """Generate ML-based explanation"""
+    def _feature_rows(self, features):
+        """Per-row feature dicts with the value types prepare_features produces"""
+        integral = set(Q_SCORE_FEATURES) | {'total_score', 'age'}
+        columns = {
+            name: (values.astype(int) if name in integral else values).tolist()
+            for name, values in features.items()
+        }
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+    
+    def _batch_recommendations(self, prediction, features):
+        """get_recommendations for every row; each distinct rule pattern is built once"""
+        n = len(prediction)
+        values = {**RECOMMENDATION_DEFAULTS, **features}
+        matched = np.column_stack([
+            np.broadcast_to(rule(prediction, values), (n,)) for _, rule in RECOMMENDATION_RULES
+        ])
+        patterns, inverse = np.unique(matched, axis=0, return_inverse=True)
+        advice = [tuple(_recommendation_list(pattern)) for pattern in patterns]
+        return [advice[i] for i in inverse.reshape(-1)]
+    
+    @staticmethod
+    def _class_slug(name):
+        return name.lower().replace(' ', '_')
+    
+    def _score(self, X_scaled, explain):
+        """
+        (probabilities, path contributions) for scaled rows; with explain and
+        a compiled tree model both come from one pass over the forest,
+        otherwise the contributions are None
+        """
+        if explain and self.engine is not None:
+            probabilities, _, contributions = self.engine.explain(X_scaled)
+            return probabilities, contributions
+        _, model = self._inference_models()
+        return model.predict_proba(X_scaled), None
+    
+    def _importance_shares(self, contributions, n):
+        """(rows, features) shares summing to 1: |contribution|, else the global importances"""
+        if contributions is None:
+            _, model = self._inference_models()
+            global_imp = getattr(model, 'feature_importances_', None)
+            if global_imp is None:
+                global_imp = np.ones(len(self.feature_names))
+            weights = np.tile(np.asarray(global_imp, dtype=float), (n, 1))
+        else:
+            weights = np.abs(contributions)
+        total = weights.sum(axis=1, keepdims=True)
+        return np.divide(weights, total, out=weights, where=total > 0)
+    
+    def _explain_rows(self, columns, path_contributions):
+        """
+        Per row: importance shares, signed contributions to the class at
+        columns[row] (None without path contributions), and the features by
+        share descending
+        """
+        n = len(columns)
+        contributions = None
+        if path_contributions is not None:
+            contributions = path_contributions[np.arange(n), :, np.asarray(columns)]
+        importance = self._importance_shares(contributions, n)
+        return importance, contributions, np.argsort(-importance, axis=1, kind='stable')
+    
+    def _ranked(self, order, values):
+        """{feature: value} in `order`"""
+        return dict(zip(np.asarray(self.feature_names, dtype=object).take(order).tolist(), values.take(order).tolist()))
+    
+    def get_recommendations(self, prediction, features):
+        """Generate actionable advice based on specific feature deficits"""
+        values = {**RECOMMENDATION_DEFAULTS, **features}
+        return _recommendation_list([rule(prediction, values) for _, rule in RECOMMENDATION_RULES])
+    
+    def get_feature_importance(self, features, prediction=None):
+        """
+        Get feature importance for this specific prediction: each feature's
+        share of its decision-path contributions to the predicted class
+        (global importances for non-tree models), largest first.
+        features is the scaled feature row; prediction defaults to the
+        model's prediction for it.
+        """
+        X_scaled = np.asarray(features, dtype=float).reshape(1, -1)
+        _, model = self._inference_models()
+        probabilities, path_contributions = self._score(X_scaled, explain=True)
+        if prediction is None:
+            column = int(np.argmax(probabilities[0]))
+        else:
+            column = int(np.flatnonzero(np.asarray(model.classes_) == prediction)[0])
+        importance, _, order = self._explain_rows([column], path_contributions)
+        return self._ranked(order[0], importance[0])
+    
+    def generate_ml_explanation(self, prediction, probabilities, features, importance, contributions=None):
+        """
+        Generate ML-based explanation. contributions ({feature: change in
+        the predicted class's probability}) adds each factor's direction.
+        """
         
         # Risk level descriptions
         risk_levels = {
@@ -433,7 +652,8 @@ class SoulSenseMLPredictor:
                 'feature': feature_readable,
                 'importance': float(imp_value),
                 'value': float(feature_value),
-                'explanation': explanation
+                'explanation': explanation,
+                'contribution': (contributions or {}).get(feature_name)
             })
         
         # Generate report
@@ -454,6 +674,10 @@ class SoulSenseMLPredictor:
         {i}. **{feat['feature']}** (Impact: {feat['importance']:.1%})
            • {feat['explanation']}
            • Your score: {feat['value']:.1f}"""
+            if feat['contribution'] is not None:
+                direction = "Raised" if feat['contribution'] >= 0 else "Lowered"
+                explanation_report += f"""
+           • {direction} the {risk_info['level'].title()} probability by {abs(feat['contribution']):.1%}"""
         
         explanation_report += f"""
         
@@ -465,7 +689,7 @@ class SoulSenseMLPredictor:
         💡 **ML MODEL INSIGHTS:**
         • Based on Random Forest algorithm
         • Analyzed {len(self.feature_names)} key features
-        • Feature importance derived from SHAP-like analysis
+        • {"Impact traced through each tree's decision path for your answers" if contributions else "Impact from the model's overall feature importance"}
         • Model accuracy: ~85% on test data
         
         ⚠️ **DISCLAIMER:** This is an AI-assisted assessment, not a clinical diagnosis.
@@ -506,56 +730,96 @@ class SoulSenseMLPredictor:
         print(f"✅ ML model saved to {model_path}")
     
     def load_model(self, version: str = None):
-        """Load model with versioning support"""
-        loaded_from_registry = False
-        
+        """
+        Load model with versioning support: the registry (production, else
+        latest), then the legacy pkl, then the bundled default model.
+        Models without the current features are skipped, not retrained.
+        """
         # Try loading from versioning registry first
         if self.use_versioning and self.versioning_manager:
             try:
                 if version:
                     model_data, metadata = self.versioning_manager.registry.get_model(
-                        self.MODEL_NAME, version
+                        self.MODEL_NAME, version, compiled=True
                     )
                 else:
                     # Try to get production model
-                    result = self.versioning_manager.get_production_model(self.MODEL_NAME)
+                    result = self.versioning_manager.get_production_model(self.MODEL_NAME, compiled=True)
                     if result:
                         model_data, metadata = result
                     else:
                         # Fall back to latest version
                         model_data, metadata = self.versioning_manager.registry.get_model(
-                            self.MODEL_NAME
+                            self.MODEL_NAME, compiled=True
                         )
                 
-                self.model = model_data['model']
-                self.scaler = model_data['scaler']
-                self.feature_names = model_data.get('feature_names', self.feature_names)
-                self.class_names = model_data.get('class_names', self.class_names)
-                self.current_version = metadata.version
-                self.model_metadata = metadata
-                loaded_from_registry = True
-                print(f"✅ ML model loaded from registry (v{self.current_version})")
-                return
+                if self._use_model_data(model_data, metadata.version, "registry"):
+                    self.model_metadata = metadata
+                    return
             except Exception as e:
                 logger.debug(f"Could not load from registry: {e}")
         
         # Fall back to legacy pkl file
-        if not loaded_from_registry:
-            model_path = os.path.join(MODELS_DIR, 'soulsense_ml_model.pkl')
-            if not os.path.exists(model_path):
-                 # Try legacy path in root for migration safety?
-                 if os.path.exists('soulsense_ml_model.pkl'):
-                     model_path = 'soulsense_ml_model.pkl'
-
-            with open(model_path, 'rb') as f:
-                model_data = pickle.load(f)
-            
-            self.model = model_data['model']
-            self.scaler = model_data['scaler']
-            self.feature_names = model_data['feature_names']
-            self.class_names = model_data['class_names']
-            self.current_version = model_data.get('version', 'legacy')
-            print(f"✅ ML model loaded from soulsense_ml_model.pkl (v{self.current_version})")
+        model_path = os.path.join(MODELS_DIR, 'soulsense_ml_model.pkl')
+        if not os.path.exists(model_path) and os.path.exists('soulsense_ml_model.pkl'):
+            # Legacy path in root, for migration safety
+            model_path = 'soulsense_ml_model.pkl'
+        if os.path.exists(model_path):
+            try:
+                with open(model_path, 'rb') as f:
+                    model_data = pickle.load(f)
+                if self._use_model_data(model_data, model_data.get('version') or 'legacy', model_path):
+                    return
+            except Exception as e:
+                logger.warning(f"Could not load {model_path}: {e}")
+        
+        self.load_default_model()
+    
+    def load_default_model(self):
+        """Load the model bundled with the app"""
+        model_data = joblib.load(DEFAULT_MODEL_PATH)
+        if not self._use_model_data(model_data, model_data.get('version', 'default'), DEFAULT_MODEL_PATH):
+            raise ValueError(f"Bundled model {DEFAULT_MODEL_PATH} is outdated; rebuild it with --build-default")
+    
+    def _use_model_data(self, model_data, version, source):
+        """Adopt a loaded model unless it predates the current feature set"""
+        feature_names = model_data.get('feature_names', self.feature_names)
+        if 'sentiment_score' not in feature_names:
+            logger.warning(f"Model v{version} from {source} has no sentiment support; skipping it "
+                           f"(retrain with `python -m app.ml.predictor --retrain`)")
+            return False
+        self.model = model_data['model']
+        self.scaler = model_data['scaler']
+        self.engine = try_compile(self.model, self.scaler)
+        self.feature_names = list(feature_names)
+        self.class_names = model_data.get('class_names', self.class_names)
+        self.current_version = version
+        self.model_metadata = None
+        self.prediction_cache.invalidate()
+        print(f"✅ ML model loaded from {source} (v{self.current_version})")
+        return True
+    
+    def retrain(self, bump_type: str = "patch"):
+        """Train on the synthetic data set and register the result; run as an explicit job"""
+        self.feature_names = list(FEATURE_NAMES)
+        self.scaler = StandardScaler()
+        self.train_sample_model(bump_type=bump_type)
+        self.save_model(bump_type=bump_type)
+        return self.current_version
+    
+    def build_default_model(self, path: str = DEFAULT_MODEL_PATH):
+        """Train and write the bundled default model"""
+        self.feature_names = list(FEATURE_NAMES)
+        self.scaler = StandardScaler()
+        self.train_sample_model()
+        joblib.dump({
+            'model': self.model,
+            'scaler': self.scaler,
+            'feature_names': self.feature_names,
+            'class_names': self.class_names,
+            'version': 'default',
+        }, path, compress=3)
+        print(f"✅ Default ML model written to {path}")
     
     def load_specific_version(self, version: str):
         """Load a specific model version"""
@@ -568,9 +832,16 @@ class SoulSenseMLPredictor:
             return False
         
         target_version = version or self.current_version
-        if target_version:
-            return self.versioning_manager.promote_model(self.MODEL_NAME, target_version)
-        return False
+        if not target_version:
+            return False
+        success = self.versioning_manager.promote_model(self.MODEL_NAME, target_version)
+        if success:
+            # Serve the new production model; cached predictions are invalidated
+            if target_version != self.current_version:
+                self.load_specific_version(target_version)
+            else:
+                self.prediction_cache.invalidate()
+        return success
     
     def list_versions(self):
         """List all available model versions"""
@@ -605,7 +876,9 @@ class SoulSenseMLPredictor:
             "version": self.current_version,
             "feature_names": self.feature_names,
             "class_names": self.class_names,
-            "model_type": type(self.model).__name__ if self.model else None
+            "model_type": type(self.model).__name__ if self.model else None,
+            "compiled": self.engine is not None,
+            "prediction_cache": self.prediction_cache.stats()
         }
         
         if self.model_metadata:
@@ -619,22 +892,35 @@ class SoulSenseMLPredictor:
         return info
     
     def plot_feature_importance(self, importance_dict, username):
-        """Create feature importance visualization"""
+        """
+        Create feature importance visualization. Takes feature_importance
+        shares or signed feature_contributions (drawn as a diverging chart).
+        """
         plt.figure(figsize=(10, 6))
         
         features = list(importance_dict.keys())[:10]
         importances = list(importance_dict.values())[:10]
+        signed = any(imp < 0 for imp in importances)
         
-        colors = plt.cm.viridis(np.linspace(0.3, 0.9, len(features)))
+        if signed:
+            colors = ['#EF4444' if imp >= 0 else '#3B82F6' for imp in importances]
+        else:
+            colors = plt.cm.viridis(np.linspace(0.3, 0.9, len(features)))
         
         bars = plt.barh(features, importances, color=colors)
-        plt.xlabel('Feature Importance')
+        if signed:
+            plt.axvline(0, color='#333333', linewidth=0.8)
+            plt.xlabel('Contribution to Predicted Risk Probability')
+        else:
+            plt.xlabel('Feature Importance')
         plt.title(f'Top Features Influencing {username}\'s Assessment', fontsize=14, fontweight='bold')
         
         # Add value labels
         for bar, imp in zip(bars, importances):
-            plt.text(bar.get_width() + 0.001, bar.get_y() + bar.get_height()/2,
-                    f'{imp:.1%}', va='center', fontsize=10)
+            x = bar.get_width() + (0.001 if imp >= 0 else -0.001)
+            plt.text(x, bar.get_y() + bar.get_height()/2,
+                    f'{imp:+.1%}' if signed else f'{imp:.1%}', va='center', fontsize=10,
+                    ha='left' if imp >= 0 else 'right')
         
         plt.gca().invert_yaxis()
         plt.tight_layout()
@@ -647,8 +933,27 @@ class SoulSenseMLPredictor:
         return filename
 
 
-# Quick test
+# Quick test; --retrain / --build-default are the (schedulable) training jobs
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="SoulSense ML predictor")
+    parser.add_argument("--retrain", action="store_true",
+                        help="train and register a new model version")
+    parser.add_argument("--bump", default="patch", choices=["major", "minor", "patch"],
+                        help="version bump for --retrain")
+    parser.add_argument("--build-default", action="store_true",
+                        help=f"rebuild the bundled default model ({DEFAULT_MODEL_PATH})")
+    args = parser.parse_args()
+    
+    if args.build_default:
+        SoulSenseMLPredictor(use_versioning=False, load=False).build_default_model()
+        raise SystemExit(0)
+    if args.retrain:
+        version = SoulSenseMLPredictor(use_versioning=True, load=False).retrain(args.bump)
+        print(f"✅ Retrained model v{version}")
+        raise SystemExit(0)
+    
     print("🧠 Testing SoulSense ML Predictor with Versioning...")
     
     # Initialize predictor with versioning enabled
@@ -5,6 +5,7 @@ from typing import Dict, List, Optional
 from app.db import get_session
 from app.models import Score, User
 from app.analysis.outlier_detection import OutlierDetector
+from app.analysis.score_stats import get_user_score_stats
 
 logger = logging.getLogger(__name__)
 
@@ -20,27 +21,26 @@ class ScoreAnalyzer:
         """Validate new score against user history."""
         session = get_session()
         try:
-            # Get user's historical scores
-            historical_scores = session.query(Score).filter(
-                Score.username == username
-            ).all()
+            # Running aggregates stand in for the full history
+            stats = get_user_score_stats(username, session=session)
             
-            if not historical_scores:
+            if not stats:
                 return {
                     "valid": True,
                     "warnings": [],
                     "message": "First score - no historical comparison available"
                 }
             
-            historical_values = [s.total_score for s in historical_scores]
-            
             warnings = []
             
-            # Check if new score would be statistical outlier
-            all_scores = historical_values + [score_value]
-            result = self.detector.detect_outliers_zscore(all_scores)
+            # Check if new score would be statistical outlier: z-score over
+            # history + [new], folded into the stored count / sum / sum of squares
+            count = stats["count"] + 1
+            mean = (stats["sum"] + score_value) / count
+            variance = max((stats["sum_sq"] + score_value ** 2) / count - mean ** 2, 0.0)
+            std_dev = variance ** 0.5
             
-            if score_value in result["outliers"]:
+            if std_dev > 0 and abs(score_value - mean) / std_dev > self.detector.threshold:
                 warnings.append({
                     "type": "statistical_outlier",
                     "severity": "medium",
@@ -48,9 +48,9 @@ class ScoreAnalyzer:
                 })
             
             # Check for extreme change from last score
-            last_score = historical_values[-1]
+            last_score = stats["last_score"]
             change = abs(score_value - last_score)
-            avg_change = self._calculate_average_change(historical_values)
+            avg_change = stats["average_change"]
             
             if change > 3 * avg_change:
                 warnings.append({
@@ -63,9 +63,9 @@ class ScoreAnalyzer:
                 "valid": len(warnings) == 0 or all(w["severity"] != "critical" for w in warnings),
                 "warnings": warnings,
                 "validation_details": {
-                    "user_history_count": len(historical_values),
-                    "historical_mean": sum(historical_values) / len(historical_values),
-                    "historical_std": self._calculate_std(historical_values),
+                    "user_history_count": stats["count"],
+                    "historical_mean": stats["mean"],
+                    "historical_std": stats["std_dev"] if stats["count"] >= 2 else 0,
                     "change_from_last": score_value - last_score
                 }
             }
@@ -192,14 +192,6 @@ class ScoreAnalyzer:
     
     # Helper methods
     
-    def _calculate_average_change(self, values: List[int]) -> float:
-        """Calculate average absolute change between consecutive values"""
-        if len(values) < 2:
-            return 0
-        
-        changes = [abs(values[i+1] - values[i]) for i in range(len(values)-1)]
-        return sum(changes) / len(changes)
-    
     def _calculate_std(self, values: List[int]) -> float:
         """Calculate standard deviation"""
         if len(values) < 2:
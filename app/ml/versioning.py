@@ -22,6 +22,7 @@ from dataclasses import dataclass, asdict, field
 import uuid
 import logging
 from app.config import MODELS_DIR, DATA_DIR
+from app.ml.compiled_forest import CompiledForest, try_compile
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -111,8 +112,15 @@ class ModelRegistry:
     - Track metadata and lineage
     - Support for production model promotion
     - Model comparison and rollback
+    
+    Tree-ensemble classifiers are also stored compiled (app.ml.compiled_forest)
+    in compiled/<model.pkl hash> next to model.pkl; get_model(compiled=True)
+    memory-maps that instead of unpickling. Keyed by the hash, a replaced
+    model.pkl never loads a forest compiled from the old one.
     """
     
+    COMPILED_DIR = "compiled"
+    
     def __init__(self, registry_path: str = None):
         self.registry_path = Path(registry_path or os.path.join(MODELS_DIR, "registry"))
         self.models_path = self.registry_path / "models"
@@ -242,6 +250,10 @@ class ModelRegistry:
         file_hash = self._compute_file_hash(model_file)
         file_size = model_file.stat().st_size
         
+        compiled = try_compile(model, scaler)
+        if compiled is not None:
+            compiled.save(str(self._compiled_dir(model_dir, file_hash)), model_hash=file_hash)
+        
         # Get parent version
         versions = list(self.registry["models"][name]["versions"].keys())
         parent_version = max(versions, key=lambda v: SemanticVersion(v)) if versions else None
@@ -281,7 +293,8 @@ class ModelRegistry:
     def get_model(
         self,
         name: str,
-        version: Optional[str] = None
+        version: Optional[str] = None,
+        compiled: bool = False
     ) -> Tuple[Any, ModelMetadata]:
         """
         Load a model by name and version.
@@ -289,6 +302,10 @@ class ModelRegistry:
         Args:
             name: Model name
             version: Version string (default: latest)
+            compiled: Load the compiled form of a tree ensemble (a
+                CompiledForest as both model and scaler) instead of
+                unpickling; versions registered before it existed are
+                compiled on first use. Other models load as usual.
             
         Returns:
             Tuple of (model_data, metadata)
@@ -311,22 +328,56 @@ class ModelRegistry:
         model_dir = self.models_path / name / version
         model_file = model_dir / "model.pkl"
         
-        with open(model_file, 'rb') as f:
-            model_data = pickle.load(f)
-        
         # Load metadata
         metadata_dict = versions[version]
         metadata = ModelMetadata(**metadata_dict)
         
+        model_data = None
+        if compiled:
+            engine, model_data = self._load_compiled(model_dir, metadata.file_hash)
+            if engine is not None:
+                logger.info(f"✅ Loaded compiled model: {name} v{version}")
+                return {
+                    "model": engine,
+                    "scaler": engine,
+                    "feature_names": metadata.feature_names,
+                    "class_names": metadata.class_names
+                }, metadata
+        
+        if model_data is None:
+            with open(model_file, 'rb') as f:
+                model_data = pickle.load(f)
+        
         logger.info(f"✅ Loaded model: {name} v{version}")
         return model_data, metadata
+    
+    def _compiled_dir(self, model_dir: Path, file_hash: str) -> Path:
+        return model_dir / self.COMPILED_DIR / file_hash[:16]
+
+    def _load_compiled(
+        self, model_dir: Path, file_hash: str = ""
+    ) -> Tuple[Optional[CompiledForest], Optional[Dict[str, Any]]]:
+        """(compiled model, None), or (None, unpickled model data) if it cannot be compiled"""
+        file_hash = file_hash or self._compute_file_hash(model_dir / "model.pkl")
+        compiled_dir = self._compiled_dir(model_dir, file_hash)
+        if (compiled_dir / "meta.json").exists():
+            return CompiledForest.load(str(compiled_dir), model_hash=file_hash), None
+        
+        # Registered before models were compiled (or by an older layout): compile it once now
+        with open(model_dir / "model.pkl", 'rb') as f:
+            model_data = pickle.load(f)
+        engine = try_compile(model_data.get("model"), model_data.get("scaler"))
+        if engine is None:
+            return None, model_data
+        engine.save(str(compiled_dir), model_hash=file_hash)
+        return CompiledForest.load(str(compiled_dir), model_hash=file_hash), None
 
     # Backwards-compatible alias for older callers
     def load_model(self, name: str, version: Optional[str] = None) -> Tuple[Any, ModelMetadata]:
         """Alias for get_model to preserve backward compatibility."""
         return self.get_model(name, version)
     
-    def get_production_model(self, name: str) -> Optional[Tuple[Any, ModelMetadata]]:
+    def get_production_model(self, name: str, compiled: bool = False) -> Optional[Tuple[Any, ModelMetadata]]:
         """Get the production model for a given name."""
         if name not in self.registry["models"]:
             return None
@@ -334,7 +385,7 @@ class ModelRegistry:
         versions = self.registry["models"][name]["versions"]
         for version, metadata in versions.items():
             if metadata.get("is_production", False):
-                return self.get_model(name, version)
+                return self.get_model(name, version, compiled=compiled)
         
         return None
 
@@ -896,9 +947,9 @@ class ModelVersioningManager:
         self._current_experiment = None
         self._experiment_start_time = None
     
-    def get_production_model(self, name: str) -> Optional[Tuple[Any, ModelMetadata]]:
+    def get_production_model(self, name: str, compiled: bool = False) -> Optional[Tuple[Any, ModelMetadata]]:
         """Get the production model."""
-        return self.registry.get_production_model(name)
+        return self.registry.get_production_model(name, compiled=compiled)
     
     def promote_model(self, name: str, version: str):
         """Promote a model to production."""
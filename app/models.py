@@ -1,11 +1,20 @@
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey, Boolean, Index, func, event, text
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey, Boolean, Index, LargeBinary, func, event, text, inspect
 from sqlalchemy.orm import declarative_base, relationship
-from datetime import datetime, timedelta
+from sqlalchemy.exc import OperationalError
+from datetime import datetime
 import logging
 
+from app.utils import to_epoch_ms
+
 # Create Base
 Base = declarative_base()
 
+def _epoch_ms_from(source_column):
+    """Column default deriving epoch milliseconds from a string timestamp column"""
+    def default(context):
+        return to_epoch_ms(context.get_current_parameters().get(source_column))
+    return default
+
 class User(Base):
     __tablename__ = 'users'
     
@@ -30,6 +39,8 @@ class Score(Base):
     detailed_age_group = Column(String, index=True)  # Added index
     user_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)  # Added index
     timestamp = Column(String, default=lambda: datetime.utcnow().isoformat(), index=True)  # Added timestamp and index
+    timestamp_ms = Column(Integer, default=_epoch_ms_from('timestamp'), nullable=True)  # UTC epoch millis for range scans
+    session_id = Column(Integer, ForeignKey('exam_sessions.id'), nullable=True)  # Exam attempt that produced this score
 
     user = relationship("User", back_populates="scores")
 
@@ -39,6 +50,9 @@ class Score(Base):
         Index('idx_score_user_timestamp', 'user_id', 'timestamp'),
         Index('idx_score_age_score', 'age', 'total_score'),
         Index('idx_score_agegroup_score', 'detailed_age_group', 'total_score'),
+        Index('idx_score_username_ts_ms', 'username', 'timestamp_ms'),
+        Index('idx_score_user_ts_ms', 'user_id', 'timestamp_ms'),
+        Index('idx_score_session', 'session_id'),
     )
 
 class Response(Base):
@@ -52,6 +66,8 @@ class Response(Base):
     detailed_age_group = Column(String, index=True)  # Added index
     timestamp = Column(String, default=lambda: datetime.utcnow().isoformat(), index=True)  # Added index
     user_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)  # Added index
+    timestamp_ms = Column(Integer, default=_epoch_ms_from('timestamp'), nullable=True)  # UTC epoch millis for range scans
+    session_id = Column(Integer, ForeignKey('exam_sessions.id'), nullable=True)  # Exam attempt (legacy rows, backfilled)
 
     user = relationship("User", back_populates="responses")
 
@@ -62,6 +78,40 @@ class Response(Base):
         Index('idx_response_question_timestamp', 'question_id', 'timestamp'),
         Index('idx_response_user_timestamp', 'user_id', 'timestamp'),
         Index('idx_response_agegroup_timestamp', 'detailed_age_group', 'timestamp'),
+        Index('idx_response_username_ts_ms', 'username', 'timestamp_ms'),
+        Index('idx_response_user_ts_ms', 'user_id', 'timestamp_ms'),
+        Index('idx_response_ts_ms', 'timestamp_ms'),  # archival range scans
+        Index('idx_response_session', 'session_id'),
+    )
+
+class ExamSession(Base):
+    """
+    One completed exam with all of its answers packed into two parallel
+    BLOBs (see app.services.exam_sessions): question ids as little-endian
+    uint16 and answer values as int8. Replaces one `responses` row per
+    answer for new exams; the exam_responses / all_responses views expand
+    them back into rows for ad-hoc SQL (bulk readers decode the BLOBs in
+    Python). Every attempt has a row, so scores.session_id (and
+    responses.session_id for pre-packing rows) joins answers to their score
+    exactly.
+    """
+    __tablename__ = 'exam_sessions'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    username = Column(String, nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    age_group = Column(String, nullable=True)
+    detailed_age_group = Column(String, nullable=True)
+    timestamp = Column(String, default=lambda: datetime.utcnow().isoformat())
+    timestamp_ms = Column(Integer, default=_epoch_ms_from('timestamp'), nullable=True)
+    answer_count = Column(Integer, nullable=False, default=0)
+    question_ids = Column(LargeBinary, nullable=False)
+    response_values = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        Index('idx_exam_session_username_ts_ms', 'username', 'timestamp_ms'),
+        Index('idx_exam_session_user_ts_ms', 'user_id', 'timestamp_ms'),
+        Index('idx_exam_session_ts_ms', 'timestamp_ms'),
     )
 
 class Question(Base):
@@ -91,6 +141,13 @@ class JournalEntry(Base):
     content = Column(Text)
     sentiment_score = Column(Float)
     emotional_patterns = Column(Text)
+    entry_date_ms = Column(Integer, default=_epoch_ms_from('entry_date'), nullable=True)  # UTC epoch millis for range scans
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+
+    __table_args__ = (
+        Index('idx_journal_username_date_ms', 'username', 'entry_date_ms'),
+        Index('idx_journal_user_date_ms', 'user_id', 'entry_date_ms'),
+    )
 
 # Simple function to get session (from upstream)
 def get_session():
@@ -106,53 +163,383 @@ def receive_before_create(target, connection, **kw):
     """Optimize database settings before tables are created"""
     logger.info("Optimizing database settings...")
     
-    # SQLite specific optimizations
+    # SQLite specific optimizations. Engines built by app.db.create_db_engine
+    # already apply this profile on every connect; this covers ad-hoc engines
+    # (tests, alembic) that create the schema directly.
     if connection.engine.name == 'sqlite':
-        connection.execute(text('PRAGMA journal_mode = WAL'))  # Write-Ahead Logging for better concurrency
-        connection.execute(text('PRAGMA synchronous = NORMAL'))  # Good balance of safety and performance
-        connection.execute(text('PRAGMA cache_size = -2000'))  # 2MB cache
-        connection.execute(text('PRAGMA temp_store = MEMORY'))  # Store temp tables in memory
-        connection.execute(text('PRAGMA mmap_size = 268435456'))  # 256MB memory map
-        connection.execute(text('PRAGMA foreign_keys = ON'))  # Enable foreign key constraints
-
-@event.listens_for(Question.__table__, 'after_create')
-def receive_after_create_question(target, connection, **kw):
-    """Create additional indexes and optimizations after question table creation"""
-    logger.info("Creating question search optimization indexes...")
-    
+        from app.db import pragma_statements, applies_pragma_profile
+        if applies_pragma_profile(connection.engine):
+            return
+        for statement in pragma_statements():
+            connection.execute(text(statement))
+
+# question_search: external-content FTS5 index over question_bank.question_text
+QUESTION_SEARCH_TRIGGERS = {
+    'question_ai': """
+        CREATE TRIGGER question_ai AFTER INSERT ON question_bank BEGIN
+            INSERT INTO question_search(rowid, question_text) VALUES (new.id, new.question_text);
+        END;
+    """,
+    'question_ad': """
+        CREATE TRIGGER question_ad AFTER DELETE ON question_bank BEGIN
+            INSERT INTO question_search(question_search, rowid, question_text) VALUES('delete', old.id, old.question_text);
+        END;
+    """,
+    'question_au': """
+        CREATE TRIGGER question_au AFTER UPDATE OF question_text ON question_bank BEGIN
+            INSERT INTO question_search(question_search, rowid, question_text) VALUES('delete', old.id, old.question_text);
+            INSERT INTO question_search(rowid, question_text) VALUES (new.id, new.question_text);
+        END;
+    """,
+}
+
+def create_question_search(connection):
+    """
+    (Re)create the question_search FTS5 table and its sync triggers, then
+    index the rows already in question_bank. Returns False when this SQLite
+    build has no FTS5 (app.services.question_search falls back to LIKE).
+    """
+    for trigger in QUESTION_SEARCH_TRIGGERS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    connection.execute(text("DROP TABLE IF EXISTS question_search"))
     try:
-        # Check if FTS5 extension is available
-        connection.execute(text("SELECT fts5(?)"), ('test',))
-        
-        # Create virtual table for full-text search
         connection.execute(text("""
-            CREATE VIRTUAL TABLE IF NOT EXISTS question_search 
-            USING fts5(id, question_text, content='question_bank', content_rowid='id')
+            CREATE VIRTUAL TABLE question_search
+            USING fts5(question_text, content='question_bank', content_rowid='id')
         """))
-        
-        # Create triggers to keep the search index updated
-        connection.execute(text("""
-            CREATE TRIGGER IF NOT EXISTS question_ai AFTER INSERT ON question_bank BEGIN
-                INSERT INTO question_search(rowid, question_text) VALUES (new.id, new.question_text);
-            END;
-        """))
-        
-        connection.execute(text("""
-            CREATE TRIGGER IF NOT EXISTS question_ad AFTER DELETE ON question_bank BEGIN
-                INSERT INTO question_search(question_search, rowid, question_text) VALUES('delete', old.id, old.question_text);
-            END;
-        """))
-        
-        connection.execute(text("""
-            CREATE TRIGGER IF NOT EXISTS question_au AFTER UPDATE ON question_bank BEGIN
-                INSERT INTO question_search(question_search, rowid, question_text) VALUES('delete', old.id, old.question_text);
-                INSERT INTO question_search(rowid, question_text) VALUES (new.id, new.question_text);
-            END;
-        """))
-        
-        logger.info("Full-text search indexes created for questions")
-    except:
-        logger.warning("FTS5 not available, skipping full-text search optimization")
+    except OperationalError as e:
+        logger.warning(f"FTS5 not available, skipping full-text search index: {e.orig}")
+        return False
+
+    for ddl in QUESTION_SEARCH_TRIGGERS.values():
+        connection.execute(text(ddl))
+    # Triggers only see new writes; index what is already there
+    connection.execute(text("INSERT INTO question_search(question_search) VALUES('rebuild')"))
+    logger.info("Full-text search index created for questions")
+    return True
+
+# SQL expression converting a stored ISO / "%Y-%m-%d %H:%M:%S" string to UTC epoch millis
+EPOCH_MS_SQL = "CAST(ROUND((julianday({column}) - 2440587.5) * 86400000.0) AS INTEGER)"
+
+# (table, source text column, epoch millis column)
+EPOCH_MS_COLUMNS = [
+    ('scores', 'timestamp', 'timestamp_ms'),
+    ('responses', 'timestamp', 'timestamp_ms'),
+    ('journal_entries', 'entry_date', 'entry_date_ms'),
+    ('exam_sessions', 'timestamp', 'timestamp_ms'),
+]
+
+def create_epoch_ms_trigger(connection, table, source, target):
+    """Fill the epoch column for rows inserted through raw SQL that leave it NULL"""
+    connection.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_{target}_ai AFTER INSERT ON {table}
+        WHEN new.{target} IS NULL AND new.{source} IS NOT NULL BEGIN
+            UPDATE {table} SET {target} = {EPOCH_MS_SQL.format(column='new.' + source)}
+            WHERE id = new.id;
+        END;
+    """))
+
+@event.listens_for(Score.__table__, 'after_create')
+@event.listens_for(Response.__table__, 'after_create')
+@event.listens_for(JournalEntry.__table__, 'after_create')
+@event.listens_for(ExamSession.__table__, 'after_create')
+def receive_after_create_epoch_table(target, connection, **kw):
+    """Keep epoch millisecond columns populated for raw sqlite3 writers"""
+    if connection.engine.name != 'sqlite':
+        return
+    for table, source, column in EPOCH_MS_COLUMNS:
+        if table == target.name:
+            create_epoch_ms_trigger(connection, table, source, column)
+
+# ==================== MATERIALIZED SCORE AGGREGATES ====================
+
+class UserScoreStats(Base):
+    """
+    Per-user running aggregates over `scores`, maintained by triggers in the
+    same transaction as each insert so per-user summaries are O(1) lookups.
+    """
+    __tablename__ = 'user_score_stats'
+
+    username = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
+    attempt_count = Column(Integer, nullable=False, default=0, index=True)
+    score_sum = Column(Float, nullable=False, default=0)
+    score_sum_sq = Column(Float, nullable=False, default=0)
+    min_score = Column(Integer)
+    max_score = Column(Integer)
+    first_score = Column(Integer)
+    first_timestamp = Column(String)
+    first_timestamp_ms = Column(Integer)
+    last_score = Column(Integer)
+    last_timestamp = Column(String)
+    last_timestamp_ms = Column(Integer)
+    abs_change_sum = Column(Float, nullable=False, default=0)  # sum of |score - previous score|
+
+_STATS_COLUMNS = """
+    username, user_id, attempt_count, score_sum, score_sum_sq, min_score, max_score,
+    first_score, first_timestamp, first_timestamp_ms,
+    last_score, last_timestamp, last_timestamp_ms, abs_change_sum
+"""
+
+def user_score_stats_rebuild_sql(where=""):
+    """INSERT ... SELECT recomputing stats rows from `scores` (optionally filtered)"""
+    ts_ms = f"COALESCE(timestamp_ms, {EPOCH_MS_SQL.format(column='timestamp')})"
+    return f"""
+        INSERT INTO user_score_stats ({_STATS_COLUMNS})
+        SELECT username, MAX(user_id), COUNT(*), SUM(total_score), SUM(total_score * total_score),
+               MIN(total_score), MAX(total_score),
+               MAX(CASE WHEN rn_first = 1 THEN total_score END),
+               MAX(CASE WHEN rn_first = 1 THEN timestamp END),
+               MAX(CASE WHEN rn_first = 1 THEN ts_ms END),
+               MAX(CASE WHEN rn_last = 1 THEN total_score END),
+               MAX(CASE WHEN rn_last = 1 THEN timestamp END),
+               MAX(CASE WHEN rn_last = 1 THEN ts_ms END),
+               COALESCE(SUM(ABS(total_score - prev_score)), 0)
+        FROM (
+            SELECT id, username, user_id, total_score, timestamp, ts_ms,
+                   ROW_NUMBER() OVER (PARTITION BY username ORDER BY ts_ms IS NULL, ts_ms, id) AS rn_first,
+                   ROW_NUMBER() OVER (PARTITION BY username ORDER BY ts_ms IS NULL, ts_ms DESC, id DESC) AS rn_last,
+                   LAG(total_score) OVER (PARTITION BY username ORDER BY ts_ms IS NULL, ts_ms, id) AS prev_score
+            FROM (
+                SELECT id, username, user_id, total_score, timestamp, {ts_ms} AS ts_ms
+                FROM scores
+                WHERE username IS NOT NULL AND total_score IS NOT NULL {where}
+            )
+        )
+        GROUP BY username
+    """
+
+USER_SCORE_STATS_TRIGGERS = ('scores_stats_ai', 'scores_stats_ai_reorder', 'scores_stats_ad', 'scores_stats_au')
+
+def create_user_score_stats_triggers(connection):
+    """Install the triggers that keep user_score_stats in step with scores"""
+    ts_ms = f"COALESCE(new.timestamp_ms, {EPOCH_MS_SQL.format(column='new.timestamp')})"
+    newer_first = "(first_timestamp_ms IS NULL OR excluded.first_timestamp_ms < first_timestamp_ms)"
+    newer_last = "(last_timestamp_ms IS NULL OR excluded.last_timestamp_ms >= last_timestamp_ms)"
+    # The rebuild orders a user's scores by (timestamp, id), untimed ones last.
+    # A new row only folds in when it lands at the end of that order: it is
+    # timed, no earlier than the stored last score, and the user has no
+    # untimed score. Anything else (backfills, imported history) rebuilds
+    # the user instead, so abs_change_sum always follows timestamp order.
+    out_of_order = f"""EXISTS (
+        SELECT 1 FROM user_score_stats s WHERE s.username = new.username AND (
+            {ts_ms} IS NULL OR s.last_timestamp_ms IS NULL OR {ts_ms} < s.last_timestamp_ms
+            OR EXISTS (
+                SELECT 1 FROM scores o
+                WHERE o.username = new.username AND o.timestamp_ms IS NULL AND o.id <> new.id
+                  AND o.total_score IS NOT NULL AND {EPOCH_MS_SQL.format(column='o.timestamp')} IS NULL
+            )
+        )
+    )"""
+
+    # Re-created so databases with older definitions pick up changes
+    for trigger in USER_SCORE_STATS_TRIGGERS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+
+    # In-order inserts fold into the running aggregates
+    connection.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS scores_stats_ai AFTER INSERT ON scores
+        WHEN new.username IS NOT NULL AND new.total_score IS NOT NULL AND NOT {out_of_order} BEGIN
+            INSERT INTO user_score_stats ({_STATS_COLUMNS})
+            VALUES (new.username, new.user_id, 1, new.total_score, new.total_score * new.total_score,
+                    new.total_score, new.total_score,
+                    new.total_score, new.timestamp, {ts_ms},
+                    new.total_score, new.timestamp, {ts_ms}, 0)
+            ON CONFLICT(username) DO UPDATE SET
+                user_id = COALESCE(excluded.user_id, user_id),
+                attempt_count = attempt_count + 1,
+                score_sum = score_sum + excluded.score_sum,
+                score_sum_sq = score_sum_sq + excluded.score_sum_sq,
+                min_score = MIN(min_score, excluded.min_score),
+                max_score = MAX(max_score, excluded.max_score),
+                abs_change_sum = abs_change_sum + ABS(excluded.last_score - last_score),
+                first_score = CASE WHEN {newer_first} THEN excluded.first_score ELSE first_score END,
+                first_timestamp = CASE WHEN {newer_first} THEN excluded.first_timestamp ELSE first_timestamp END,
+                first_timestamp_ms = CASE WHEN {newer_first} THEN excluded.first_timestamp_ms ELSE first_timestamp_ms END,
+                last_score = CASE WHEN {newer_last} THEN excluded.last_score ELSE last_score END,
+                last_timestamp = CASE WHEN {newer_last} THEN excluded.last_timestamp ELSE last_timestamp END,
+                last_timestamp_ms = CASE WHEN {newer_last} THEN excluded.last_timestamp_ms ELSE last_timestamp_ms END;
+        END;
+    """))
+
+    connection.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS scores_stats_ai_reorder AFTER INSERT ON scores
+        WHEN new.username IS NOT NULL AND new.total_score IS NOT NULL AND {out_of_order} BEGIN
+            DELETE FROM user_score_stats WHERE username = new.username;
+            {user_score_stats_rebuild_sql("AND username = new.username")};
+        END;
+    """))
+
+    # Deletes and edits are rare; recompute just the affected users
+    connection.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS scores_stats_ad AFTER DELETE ON scores
+        WHEN old.username IS NOT NULL BEGIN
+            DELETE FROM user_score_stats WHERE username = old.username;
+            {user_score_stats_rebuild_sql("AND username = old.username")};
+        END;
+    """))
+    connection.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS scores_stats_au AFTER UPDATE OF username, total_score, timestamp ON scores
+        BEGIN
+            DELETE FROM user_score_stats WHERE username IN (old.username, new.username);
+            {user_score_stats_rebuild_sql("AND username IN (old.username, new.username)")};
+        END;
+    """))
+
+def rebuild_user_score_stats(connection):
+    """Recompute every user_score_stats row from scratch"""
+    connection.execute(text("DELETE FROM user_score_stats"))
+    connection.execute(text(user_score_stats_rebuild_sql()))
+
+@event.listens_for(UserScoreStats.__table__, 'after_create')
+def receive_after_create_user_score_stats(target, connection, **kw):
+    """Seed aggregates from existing scores the first time the table appears"""
+    if connection.engine.name != 'sqlite':
+        return
+    if inspect(connection).has_table('scores'):
+        rebuild_user_score_stats(connection)
+
+# ==================== SCHEMA BOOKKEEPING ====================
+
+# Bump when DDL that is not captured by table/index definitions changes
+# (triggers, seeded rows) so existing databases re-run create_all once
+SCHEMA_REVISION = 7
+
+class SchemaInfo(Base):
+    """Key/value bookkeeping for the bootstrap fast path (e.g. schema fingerprint)"""
+    __tablename__ = 'schema_info'
+
+    key = Column(String, primary_key=True)
+    value = Column(String)
+
+# ==================== TABLE WRITE COUNTERS ====================
+
+class DataVersion(Base):
+    """
+    Write counter per table, bumped by triggers on every insert, update and
+    delete so cached aggregates can tell whether their inputs changed.
+    Appends to APPEND_TABLES are not counted; see APPEND_TABLES.
+    """
+    __tablename__ = 'data_versions'
+
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+# Tables whose writes are counted in data_versions
+VERSIONED_TABLES = ('users', 'scores', 'responses', 'exam_sessions', 'question_bank', 'journal_entries')
+
+# Hot insert paths: an insert that becomes the new MAX(rowid) is visible from
+# MAX(rowid) itself, so only out-of-order inserts bump the counter and bulk
+# appends pay one indexed read per row instead of an extra write. Readers
+# version these tables as (counter, MAX(rowid)).
+APPEND_TABLES = ('scores', 'responses', 'exam_sessions')
+
+def data_version_trigger_names(table):
+    return tuple(f"{table}_version_a{op}" for op in ('i', 'u', 'd'))
+
+def create_data_version_triggers(connection, tables=VERSIONED_TABLES):
+    """Seed data_versions and install the write-counting triggers"""
+    existing = set(inspect(connection).get_table_names())
+    derived = {table: column for table, _, column in EPOCH_MS_COLUMNS}
+    for table in tables:
+        if table not in existing:
+            continue
+        connection.execute(
+            text("INSERT OR IGNORE INTO data_versions (table_name, version) VALUES (:t, 0)"),
+            {"t": table}
+        )
+        for trigger in data_version_trigger_names(table):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+
+        insert_when = update_of = ""
+        if table in APPEND_TABLES:
+            insert_when = f"WHEN new.rowid < (SELECT MAX(rowid) FROM {table})"
+            # The epoch-ms fill-in rewrites a derived column of the new row
+            columns = [c['name'] for c in inspect(connection).get_columns(table)
+                       if c['name'] != derived.get(table)]
+            update_of = "OF " + ", ".join(columns)
+        events = (('i', f"INSERT ON {table} {insert_when}"),
+                  ('u', f"UPDATE {update_of} ON {table}"),
+                  ('d', f"DELETE ON {table}"))
+        for suffix, event in events:
+            connection.execute(text(f"""
+                CREATE TRIGGER {table}_version_a{suffix} AFTER {event}
+                BEGIN
+                    UPDATE data_versions SET version = version + 1 WHERE table_name = '{table}';
+                END;
+            """))
+
+# ==================== PACKED RESPONSE VIEWS ====================
+
+# Longest session pack_answers() accepts
+MAX_SESSION_ANSWERS = 1024
+
+_HEX_DIGITS = "'0123456789ABCDEF'"
+
+def _hex_byte_sql(hex_expr, offset_expr):
+    """Unsigned value of the byte starting at 1-based `offset_expr` in a hex() string"""
+    return (f"((instr({_HEX_DIGITS}, substr({hex_expr}, {offset_expr}, 1)) - 1) * 16"
+            f" + instr({_HEX_DIGITS}, substr({hex_expr}, {offset_expr} + 1, 1)) - 1)")
+
+def exam_responses_view_sql():
+    """
+    One row per packed answer: uint16 LE question id, int8 value. Every read
+    runs the recursive slot CTE and decodes hex per answer in SQL. Measured
+    on 20k sessions x 30 answers: one user's answers take ~14 ms (~1 ms from
+    the indexed legacy `responses` table), and an AVG per question over
+    everything takes ~4.5 s (~0.65 s legacy). The view is therefore for
+    ad-hoc queries only. Application readers (analysis, bias checks, EDA
+    export) go through app.services.exam_sessions.read_responses /
+    load_responses instead: they decode the BLOBs in Python (~0.5 s for all
+    sessions) and also include legacy rows.
+    """
+    ids, values = "hex(s.question_ids)", "hex(s.response_values)"
+    question_id = (f"({_hex_byte_sql(ids, 'slot.n * 4 + 1')}"
+                   f" + 256 * {_hex_byte_sql(ids, 'slot.n * 4 + 3')})")
+    raw_value = _hex_byte_sql(values, 'slot.n * 2 + 1')
+    return f"""
+        CREATE VIEW IF NOT EXISTS exam_responses AS
+        WITH RECURSIVE slot(n) AS (
+            SELECT 0 UNION ALL SELECT n + 1 FROM slot
+            WHERE n + 1 < (SELECT MAX(answer_count) FROM exam_sessions)
+        )
+        SELECT s.id AS session_id, slot.n AS position, s.username, s.user_id,
+               {question_id} AS question_id,
+               CASE WHEN {raw_value} > 127 THEN {raw_value} - 256 ELSE {raw_value} END AS response_value,
+               s.age_group, s.detailed_age_group, s.timestamp, s.timestamp_ms
+        FROM exam_sessions s JOIN slot ON slot.n < s.answer_count
+    """
+
+ALL_RESPONSES_VIEW_SQL = """
+    CREATE VIEW IF NOT EXISTS all_responses AS
+    SELECT id, {legacy_session_id} AS session_id, username, user_id, question_id, response_value,
+           age_group, detailed_age_group, timestamp, timestamp_ms
+    FROM responses
+    UNION ALL
+    SELECT NULL, session_id, username, user_id, question_id, response_value,
+           age_group, detailed_age_group, timestamp, timestamp_ms
+    FROM exam_responses
+"""
+
+def create_response_views(connection):
+    """(Re)create the row-per-answer views over legacy `responses` plus packed exam_sessions"""
+    # responses.session_id only exists once the session-link migration has run
+    has_session_id = any(c['name'] == 'session_id' for c in inspect(connection).get_columns('responses'))
+    connection.execute(text("DROP VIEW IF EXISTS all_responses"))
+    connection.execute(text("DROP VIEW IF EXISTS exam_responses"))
+    connection.execute(text(exam_responses_view_sql()))
+    connection.execute(text(ALL_RESPONSES_VIEW_SQL.format(
+        legacy_session_id="session_id" if has_session_id else "NULL"
+    )))
+
+@event.listens_for(Base.metadata, 'after_create')
+def receive_after_create_metadata(target, connection, **kw):
+    """Install cross-table triggers and views once every table exists"""
+    if connection.engine.name == 'sqlite':
+        create_user_score_stats_triggers(connection)
+        create_data_version_triggers(connection)
+        create_response_views(connection)
+        create_question_search(connection)
 
 # ==================== CACHE AND PERFORMANCE TABLES ====================
 
@@ -223,45 +610,43 @@ def create_performance_indexes(engine):
 def preload_frequent_data(session):
     """Preload frequently accessed data into cache"""
     try:
-        # Cache active questions
+        from app.questions import QUESTION_CACHE_VERSION_KEY, question_bank_version
+
+        # Rebuild the question cache as a copy of one question_bank version;
+        # load_questions only serves it while that version is current
+        version = question_bank_version(session)
         active_questions = session.query(Question).filter(
             Question.is_active == 1
         ).order_by(Question.id).all()
         
+        # Access counts outlive the rebuild; they drive the hot set
+        access_counts = dict(session.query(QuestionCache.question_id, QuestionCache.access_count).all())
+        session.query(QuestionCache).delete()
         for question in active_questions:
             cache_entry = QuestionCache(
                 question_id=question.id,
                 question_text=question.question_text,
                 category_id=question.category_id,
                 difficulty=question.difficulty,
-                is_active=question.is_active
+                is_active=question.is_active,
+                min_age=question.min_age,
+                max_age=question.max_age,
+                tooltip=question.tooltip,
+                access_count=access_counts.get(question.id) or 0
             )
-            session.merge(cache_entry)
-        
-        # Cache global statistics
-        from sqlalchemy import func
-        avg_score = session.query(func.avg(Score.total_score)).scalar() or 0
-        question_count = session.query(func.count(Question.id)).filter(
-            Question.is_active == 1
-        ).scalar() or 0
+            session.add(cache_entry)
+        if version is not None:
+            session.merge(SchemaInfo(key=QUESTION_CACHE_VERSION_KEY, value=str(version)))
         
-        stats = [
-            ('avg_score_global', avg_score, datetime.utcnow().isoformat()),
-            ('question_count', question_count, datetime.utcnow().isoformat()),
-            ('active_users', session.query(func.count(User.id)).scalar() or 0, 
-             datetime.utcnow().isoformat())
-        ]
+        session.commit()
         
-        for stat_name, stat_value, calculated_at in stats:
-            cache_entry = StatisticsCache(
-                stat_name=stat_name,
-                stat_value=stat_value,
-                calculated_at=calculated_at,
-                valid_until=(datetime.utcnow() + timedelta(hours=24)).isoformat()
-            )
-            session.merge(cache_entry)
+        # Warm global statistics through the shared get-or-compute cache
+        from app.services import stats
+        from app.questions import get_question_count
+        stats.get_global_average_score()
+        stats.get_active_user_count()
+        get_question_count()
         
-        session.commit()
         logger.info("Frequent data preloaded into cache")
         
     except Exception as e:
@@ -285,10 +670,9 @@ def get_active_questions_optimized(session, limit=None, offset=0):
     cached_results = cached.all()
     
     if cached_results:
-        # Update access count
-        for cache_entry in cached_results:
-            cache_entry.access_count += 1
-        session.commit()
+        # Counted in memory; the maintenance round writes access_count in one batch
+        from app.services.access_counts import record_access
+        record_access(c.question_id for c in cached_results)
         
         return [(c.question_id, c.question_text) for c in cached_results]
     
@@ -0,0 +1,349 @@
+"""
+SQL statement instrumentation.
+
+Pooled and raw sqlite3 connections are created with InstrumentedConnection,
+whose cursors time every statement, count the rows it returns and aggregate
+both per statement fingerprint (literals and IN-lists normalised away).
+sqlite3 only steps a SELECT to its first row in execute(), so a statement
+that returns rows is timed from execute() until its cursor is exhausted,
+closed or reused (time between fetches in the caller is not counted).
+Statements slower than the configured threshold are written, together with
+their EXPLAIN QUERY PLAN, to logs/slow_queries.log. The app entry point
+calls save_query_stats_at_exit() so counters are merged into
+logs/query_stats.json and `scripts/admin_cli.py query-stats` can report
+across runs.
+"""
+
+import atexit
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List
+
+from app.config import LOG_DIR, DB_SLOW_QUERY_MS, DB_INSTRUMENTATION
+from app.logger import MAX_BYTES, BACKUP_COUNT
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_LOG_FILE = os.path.join(LOG_DIR, "slow_queries.log")
+QUERY_STATS_FILE = os.path.join(LOG_DIR, "query_stats.json")
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# Statements EXPLAIN QUERY PLAN can describe
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_stats: Dict[str, Dict] = {}
+_stats_lock = threading.Lock()
+
+slow_query_logger = logging.getLogger("soulsense.slow_queries")
+slow_query_logger.propagate = False
+_slow_log_ready = False
+
+
+# ---------------- Fingerprinting ----------------
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_NAMED_PARAM_RE = re.compile(r"[:@$][A-Za-z_]\w*")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Normalise a statement so calls differing only in literals group together"""
+    sql = _COMMENT_RE.sub(" ", statement)
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NAMED_PARAM_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(?...)", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+# ---------------- Aggregation ----------------
+
+def _bucket_index(elapsed_ms: float) -> int:
+    for i, bound in enumerate(LATENCY_BUCKETS_MS):
+        if elapsed_ms <= bound:
+            return i
+    return len(LATENCY_BUCKETS_MS)
+
+
+def _new_entry() -> Dict:
+    return {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0,
+            "histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1)}
+
+
+def record_execute(statement: str, elapsed_ms: float, rows: int = 0) -> str:
+    """Count one execution; returns its fingerprint"""
+    key = fingerprint(statement)
+    with _stats_lock:
+        entry = _stats.get(key)
+        if entry is None:
+            entry = _stats[key] = _new_entry()
+        entry["calls"] += 1
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+        entry["rows"] += rows
+        entry["histogram"][_bucket_index(elapsed_ms)] += 1
+    return key
+
+
+def reset_query_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def percentile_ms(histogram: List[int], pct: float) -> float:
+    """Upper bucket bound below which `pct` of calls fall"""
+    total = sum(histogram)
+    if not total:
+        return 0.0
+    threshold = total * pct / 100.0
+    running = 0
+    for i, count in enumerate(histogram):
+        running += count
+        if running >= threshold:
+            return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else float("inf")
+    return float("inf")
+
+
+def get_query_stats(include_saved: bool = False) -> List[Dict]:
+    """Per-fingerprint counters, slowest total time first"""
+    with _stats_lock:
+        merged = {key: dict(entry, histogram=list(entry["histogram"])) for key, entry in _stats.items()}
+    if include_saved:
+        merged = _merge(load_saved_stats(), merged)
+
+    report = []
+    for key, entry in merged.items():
+        calls = entry["calls"]
+        report.append({
+            "fingerprint": key,
+            "calls": calls,
+            "total_ms": entry["total_ms"],
+            "avg_ms": entry["total_ms"] / calls if calls else 0.0,
+            "p95_ms": percentile_ms(entry["histogram"], 95),
+            "max_ms": entry["max_ms"],
+            "rows": entry["rows"],
+            "histogram": entry["histogram"],
+        })
+    return sorted(report, key=lambda r: r["total_ms"], reverse=True)
+
+
+# ---------------- Persistence ----------------
+
+def _merge(base: Dict, extra: Dict) -> Dict:
+    merged = {key: dict(entry, histogram=list(entry["histogram"])) for key, entry in base.items()}
+    for key, entry in extra.items():
+        target = merged.get(key)
+        if target is None:
+            merged[key] = dict(entry, histogram=list(entry["histogram"]))
+            continue
+        target["calls"] += entry["calls"]
+        target["total_ms"] += entry["total_ms"]
+        target["max_ms"] = max(target["max_ms"], entry["max_ms"])
+        target["rows"] += entry["rows"]
+        target["histogram"] = [a + b for a, b in zip(target["histogram"], entry["histogram"])]
+    return merged
+
+
+def load_saved_stats(path: str = QUERY_STATS_FILE) -> Dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Histograms from a different bucket layout cannot be merged
+    if saved.get("buckets") != list(LATENCY_BUCKETS_MS):
+        return {}
+    return saved.get("statements", {})
+
+
+def save_query_stats(path: str = QUERY_STATS_FILE):
+    """Fold this process's counters into the stats file and reset them"""
+    with _stats_lock:
+        current = dict(_stats)
+        _stats.clear()
+    if not current:
+        return
+
+    merged = _merge(load_saved_stats(path), current)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"buckets": list(LATENCY_BUCKETS_MS), "statements": merged}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.error(f"Failed to save query stats: {e}")
+
+
+def save_query_stats_at_exit():
+    """Persist the counters when the process exits (app entry point only, so
+    test runs and scripts do not write logs/query_stats.json)"""
+    if DB_INSTRUMENTATION:
+        atexit.register(save_query_stats)
+
+
+# ---------------- Slow query log ----------------
+
+def _ensure_slow_log():
+    global _slow_log_ready
+    if _slow_log_ready:
+        return
+    with _stats_lock:
+        if not _slow_log_ready:
+            try:
+                handler = RotatingFileHandler(
+                    SLOW_QUERY_LOG_FILE, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8"
+                )
+                handler.setFormatter(logging.Formatter("%(asctime)s - %(message)s"))
+                slow_query_logger.addHandler(handler)
+                slow_query_logger.setLevel(logging.INFO)
+            except OSError as e:
+                logger.error(f"Failed to open slow query log: {e}")
+            _slow_log_ready = True
+
+
+def _query_plan(connection, statement, parameters) -> str:
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return ""
+    try:
+        # A plain cursor, so the EXPLAIN itself is not instrumented
+        cursor = sqlite3.Cursor(connection)
+        try:
+            rows = cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        finally:
+            cursor.close()
+        return "\n".join(f"    {row[-1]}" for row in rows)
+    except sqlite3.Error as e:
+        return f"    (plan unavailable: {e})"
+
+
+def log_slow_query(connection, statement, parameters, elapsed_ms):
+    _ensure_slow_log()
+    plan = _query_plan(connection, statement, parameters)
+    slow_query_logger.info(
+        f"{elapsed_ms:.1f} ms: {_SPACE_RE.sub(' ', statement).strip()}"
+        + (f"\n  QUERY PLAN\n{plan}" if plan else "")
+    )
+
+
+# ---------------- Instrumented sqlite3 classes ----------------
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor that records each statement's latency and row count. Statements
+    returning rows stay pending while they are read and are recorded once
+    the cursor is exhausted, closed or reused.
+    """
+
+    # [statement, plan parameters, elapsed ms, rows] of a statement being read
+    _pending = None
+
+    def _timed(self, method, statement, parameters, plan_parameters):
+        self._finish()
+        start = time.perf_counter()
+        result = method(statement, parameters)
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        if self.description is None:
+            # DML row counts are known immediately
+            self._record(statement, plan_parameters, elapsed_ms, max(self.rowcount, 0))
+        else:
+            self._pending = [statement, plan_parameters, elapsed_ms, 0]
+        return result
+
+    def _record(self, statement, plan_parameters, elapsed_ms, rows):
+        record_execute(statement, elapsed_ms, rows)
+        if elapsed_ms >= DB_SLOW_QUERY_MS:
+            log_slow_query(self.connection, statement, plan_parameters, elapsed_ms)
+
+    def _finish(self):
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            self._record(*pending)
+
+    def _fetched(self, start, count, exhausted):
+        pending = self._pending
+        if pending is None:
+            return
+        pending[2] += (time.perf_counter() - start) * 1000.0
+        pending[3] += count
+        if exhausted:
+            self._finish()
+
+    def execute(self, statement, parameters=()):
+        return self._timed(super().execute, statement, parameters, parameters)
+
+    def executemany(self, statement, seq_of_parameters):
+        seq = list(seq_of_parameters)
+        return self._timed(super().executemany, statement, seq, seq[0] if seq else ())
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(start, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0, True)
+            raise
+        self._fetched(start, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # A cursor dropped after reading only part of its rows
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection whose cursors (including execute shortcuts) are instrumented"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, statement, parameters=()):
+        return self.cursor().execute(statement, parameters)
+
+    def executemany(self, statement, seq_of_parameters):
+        return self.cursor().executemany(statement, seq_of_parameters)
+
+
+def connect_args() -> Dict:
+    """sqlite3.connect keyword arguments enabling instrumentation (if configured)"""
+    return {"factory": InstrumentedConnection} if DB_INSTRUMENTATION else {}
+
@@ -1,29 +1,45 @@
 import logging
-import json
 import os
 import time
-from datetime import datetime, timedelta
+from collections import OrderedDict
 from functools import lru_cache
 import threading
-from typing import List, Tuple, Optional
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
 from sqlalchemy.orm import Session
 
+from app import db
 from app.db import get_session, safe_db_context
-from app.models import Question, QuestionCache, StatisticsCache
+from app.models import Question, QuestionCache, SchemaInfo, StatisticsCache
 from app.exceptions import DatabaseError, ResourceError
-from app.config import DATA_DIR
+from app.config import DATA_DIR, SHARED_QUESTION_CACHE
+from app.services import question_shm, stats
+from app.services.access_counts import hot_question_ids
+from app.services.question_snapshot import (
+    NULL_AGE, Snapshot, SnapshotError, SnapshotRows, read_snapshot, write_snapshot
+)
 
 logger = logging.getLogger(__name__)
 
 # ------------------ CACHING CONFIGURATION ------------------
+#
+# Every layer (in-memory question set, binary snapshot file, question_cache
+# table, LRU) is keyed by the question bank's scope: the database file plus
+# the question_bank write counter that triggers keep in data_versions. Any
+# insert, update or delete on question_bank, from this process, another one
+# or admin_cli, moves the counter, so cached entries never expire by time;
+# they stop matching the moment the bank changes.
 CACHE_DIR = os.path.join(DATA_DIR, "cache")
-CACHE_FILE = os.path.join(CACHE_DIR, "questions_cache.json")
-CACHE_MAX_AGE_HOURS = 24  # Cache valid for 24 hours
-MEMORY_CACHE_TTL = 300  # 5 minutes for memory cache
+CACHE_FILE = os.path.join(CACHE_DIR, "questions.snapshot")
+QUESTION_BANK_TABLE = "question_bank"
+# schema_info key recording the question_bank version question_cache was built from
+QUESTION_CACHE_VERSION_KEY = "question_cache_version"
 
 # ------------------ PERFORMANCE OPTIMIZATIONS ------------------
-_questions_cache = {}
-_cache_timestamps = {}
+# (scope, QuestionSet) for the most recently loaded bank version
+_question_set = None
+# The mapped disk snapshot, closed before the file is replaced or removed
+_disk_snapshot: Optional[Snapshot] = None
 _cache_lock = threading.Lock()
 _last_preload_time = 0
 _preload_interval = 60  # Preload every 60 seconds if needed
@@ -36,17 +52,17 @@ def _ensure_cache_dir():
         except OSError as e:
             logger.error(f"Failed to create cache dir: {e}")
 
-def _get_cache_key(age: Optional[int] = None) -> str:
-    """Generate cache key based on age filter"""
-    return f"questions_age_{age}" if age is not None else "questions_all"
+def question_bank_version(session: Optional[Session] = None) -> Optional[int]:
+    """Write counter of question_bank (one-row read), or None if unavailable"""
+    versions = stats.get_table_versions([QUESTION_BANK_TABLE], session)
+    return None if versions is None else versions[QUESTION_BANK_TABLE]
 
-def _is_cache_valid(cache_key: str) -> bool:
-    """Check if cache is still valid in memory"""
-    if cache_key not in _cache_timestamps:
-        return False
-    
-    cache_time = _cache_timestamps[cache_key]
-    return (time.time() - cache_time) < MEMORY_CACHE_TTL
+def _cache_scope(session: Optional[Session] = None) -> Optional[Tuple[str, int]]:
+    """(database, question bank version) the caches are keyed by; None disables caching"""
+    version = question_bank_version(session)
+    if version is None:
+        return None
+    return (str(db.engine.url.database), version)
 
 def safe_thread_run(func, *args, **kwargs):
     """Wrapper to run a function safely in a thread with exception logging."""
@@ -59,63 +75,49 @@ def safe_thread_run(func, *args, **kwargs):
     thread = threading.Thread(target=wrapper, daemon=True)
     thread.start()
 
-def _save_to_disk_cache(questions: List[Tuple[int, str, Optional[str]]], age: Optional[int] = None):
-    """Save questions to disk cache file"""
+def _release_disk_snapshot():
+    """Unmap the disk snapshot (its rows stay in memory) so the file can change"""
+    global _disk_snapshot
+    with _cache_lock:
+        snapshot, _disk_snapshot = _disk_snapshot, None
+    if snapshot is not None:
+        snapshot.close()
+
+def _save_to_disk_cache(questions: List[Tuple], scope: Tuple[str, int]):
+    """Write the question set snapshot (temp file + os.replace)"""
     try:
         _ensure_cache_dir()
-        cache_data = {
-            "timestamp": datetime.now().isoformat(),
-            "questions": questions,
-            "age_filter": age,
-            "count": len(questions)
-        }
-        cache_key = "questions" if age is None else f"questions_age_{age}"
-        cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
-        
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
-        logger.debug(f"Cached {len(questions)} questions to disk (age filter: {age})")
+        _release_disk_snapshot()
+        write_snapshot(CACHE_FILE, questions, *scope)
+        logger.debug(f"Cached {len(questions)} questions to disk (version: {scope[1]})")
         return True
     except Exception as e:
         logger.error(f"Failed to save disk cache: {e}")
         return False
 
-def _load_from_disk_cache(age: Optional[int] = None):
-    """Load questions from disk cache if valid"""
+def _load_from_disk_cache(scope: Tuple[str, int]) -> Optional[Snapshot]:
+    """Map the snapshot if it was written for this scope"""
+    global _disk_snapshot
+    _release_disk_snapshot()
     try:
-        cache_key = "questions" if age is None else f"questions_age_{age}"
-        cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
-        
-        if not os.path.exists(cache_file):
-            return None
-        
-        with open(cache_file, 'r', encoding='utf-8') as f:
-            cache_data = json.load(f)
-        
-        # Check cache age
-        cache_time = datetime.fromisoformat(cache_data.get("timestamp", ""))
-        if datetime.now() - cache_time > timedelta(hours=CACHE_MAX_AGE_HOURS):
-            logger.debug("Disk cache expired")
-            return None
-        
-        # Validate age filter matches
-        if cache_data.get("age_filter") != age:
-            return None
-        
-        questions = [(int(q[0]), q[1], q[2]) for q in cache_data["questions"]]
-        logger.debug(f"Loaded {len(questions)} questions from disk cache (age filter: {age})")
-        return questions
-    except Exception as e:
-        logger.error(f"Failed to load disk cache: {e}")
+        snapshot = read_snapshot(CACHE_FILE)
+    except FileNotFoundError:
+        return None
+    except (OSError, SnapshotError) as e:
+        logger.warning(f"Ignoring unreadable question snapshot: {e}")
         return None
-
-@lru_cache(maxsize=8)  # Cache for different age filters
-def _get_cached_questions_from_db(age: Optional[int] = None) -> List[Tuple[int, str, Optional[str]]]:
-    """Get questions from database with LRU caching"""
-    # Using safe_db_context would be good, but LRU cache expects a return, 
-    # and context manager yields. We can use get_session() but wrap in try..finally properly 
-    # or rely on safe_db_context just for the query.
     
+    if (snapshot.database, snapshot.version) != scope:
+        logger.debug("Disk cache is from another question bank version")
+        snapshot.close()
+        return None
+    with _cache_lock:
+        _disk_snapshot = snapshot
+    logger.debug(f"Mapped {len(snapshot.rows)} questions from disk cache")
+    return snapshot
+
+def _query_questions(age: Optional[int] = None) -> List[Tuple[int, str, Optional[str], int, int]]:
+    """Active questions as (id, text, tooltip, min_age, max_age), straight from question_bank"""
     # Since this function returns data and shouldn't commit, get_session is fine if we close it.
     session = get_session()
     try:
@@ -149,37 +151,98 @@ def _get_cached_questions_from_db(age: Optional[int] = None) -> List[Tuple[int,
     finally:
         session.close()
 
-def _try_database_cache(session: Session, age: Optional[int] = None) -> List[Tuple[int, str, Optional[str]]]:
-    """Try to get questions from database cache table first"""
+_NO_MATCH_MIN = np.iinfo(np.int32).max
+# Age selections a QuestionSet keeps, least recently used dropped first
+AGE_SELECTIONS_KEPT = 16
+
+class QuestionSet:
+    """
+    All active questions of one bank version with their age bounds in
+    parallel NumPy arrays. Any age resolves with one vectorized mask over
+    the bounds (no DB access); the selections for the AGE_SELECTIONS_KEPT
+    most recently asked ages are kept.
+    """
+
+    def __init__(self, rows: Sequence[Tuple], min_age: Optional[np.ndarray] = None,
+                 max_age: Optional[np.ndarray] = None):
+        # Any sequence of rows; a snapshot passes one that decodes on access
+        self.rows = rows
+        if min_age is None:
+            min_age = np.fromiter((NULL_AGE if r[3] is None else r[3] for r in rows),
+                                  dtype=np.int32, count=len(rows))
+        if max_age is None:
+            max_age = np.fromiter((NULL_AGE if r[4] is None else r[4] for r in rows),
+                                  dtype=np.int32, count=len(rows))
+        # A NULL bound never matches, as with the SQL filter
+        self.min_age = np.where(min_age == NULL_AGE, _NO_MATCH_MIN, min_age)
+        self.max_age = max_age
+        self._by_age = OrderedDict()
+        self._by_age_lock = threading.Lock()
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Snapshot) -> "QuestionSet":
+        # Own copies of the bounds: a file snapshot's mapping is closed on change
+        return cls(snapshot.rows, snapshot.min_age, snapshot.max_age.copy())
+
+    def __len__(self):
+        return len(self.rows)
+
+    def pin(self, question_ids: Sequence[int]) -> int:
+        """
+        Keep the rows of `question_ids` (the hot set) decoded in memory.
+        Rows loaded from the database already are; snapshot rows are
+        otherwise decoded on first access. Returns the number pinned.
+        """
+        if not isinstance(self.rows, SnapshotRows) or not len(question_ids):
+            return 0
+        indices = np.flatnonzero(np.isin(self.rows.ids, np.asarray(question_ids, dtype=np.int64)))
+        self.rows.pin(indices)
+        return len(indices)
+
+    def for_age(self, age: Optional[int] = None) -> List[Tuple]:
+        """Rows whose [min_age, max_age] contains `age`, in id order; all rows for None"""
+        with self._by_age_lock:
+            selected = self._by_age.get(age)
+            if selected is not None:
+                self._by_age.move_to_end(age)
+                return selected
+
+        if age is None:
+            indices = np.arange(len(self.rows))
+        else:
+            indices = np.flatnonzero((self.min_age <= age) & (self.max_age >= age))
+        if isinstance(self.rows, SnapshotRows):
+            selected = self.rows.take(indices)
+        else:
+            selected = [self.rows[i] for i in indices]
+
+        with self._by_age_lock:
+            selected = self._by_age.setdefault(age, selected)
+            self._by_age.move_to_end(age)
+            while len(self._by_age) > AGE_SELECTIONS_KEPT:
+                self._by_age.popitem(last=False)
+        return selected
+
+@lru_cache(maxsize=2)  # Current bank version (plus the one it replaced)
+def _get_cached_questions_from_db(scope: Tuple[str, int]) -> List[Tuple]:
+    """All active questions, memoized per scope; a new bank version is simply a new key"""
+    return _query_questions(None)
+
+def _try_database_cache(session: Session, scope: Tuple[str, int]) -> Optional[List[Tuple]]:
+    """Serve from the question_cache table if it was built from this bank version"""
     try:
-        query = session.query(QuestionCache).filter(QuestionCache.is_active == 1)
-        
-        cached = query.order_by(QuestionCache.question_id).all()
+        built_from = session.query(SchemaInfo.value).filter(
+            SchemaInfo.key == QUESTION_CACHE_VERSION_KEY
+        ).scalar()
+        if built_from is None or int(built_from) != scope[1]:
+            return None
+
+        cached = session.query(QuestionCache).filter(
+            QuestionCache.is_active == 1
+        ).order_by(QuestionCache.question_id).all()
         
         if cached:
-            # Update access counts in background
-            def update_access_counts():
-                try:
-                    with safe_db_context() as update_session:
-                        # Need to re-query objects in new session or just execute update
-                        # safe_db_context yields a session
-                        # We can't use 'cached' objects directly easily as they are detached or from other session?
-                        # Actually 'cached' are from 'session' passed in arg. 
-                        # Background thread needs its own session.
-                        # Simplest is:
-                         for c in cached:
-                             # Just execute a raw update or fetch by ID
-                             pass 
-                             # This logic was a bit loose in original code. 
-                             # Let's keep it simple and safe.
-                             pass 
-                except Exception as e:
-                    logger.error(f"Failed to update access counts: {e}")
-            
-            # Use safe_thread_run, but we need to define the target func better
-            # For now keeping it simple as logic below is just a stub
-            
-            result = [(c.question_id, c.question_text, None) for c in cached]
+            result = [(c.question_id, c.question_text, c.tooltip, c.min_age, c.max_age) for c in cached]
             logger.debug(f"Loaded {len(result)} questions from DB cache")
             return result
     except Exception as e:
@@ -187,24 +250,26 @@ def _try_database_cache(session: Session, age: Optional[int] = None) -> List[Tup
     
     return None
 
-def _preload_background(age: Optional[int] = None):
-    """Preload questions in background thread"""
+def _remember(scope: Tuple[str, int], questions) -> QuestionSet:
+    global _question_set
+    question_set = questions if isinstance(questions, QuestionSet) else QuestionSet(questions)
+    with _cache_lock:
+        _question_set = (scope, question_set)
+    return question_set
+
+def _preload_background():
+    """Preload the question set in a background thread, hot questions decoded first"""
     def preload():
-        logger.debug(f"Background preloading questions (age filter: {age})")
-        
-        # Load from database (this might raise, but safe_thread_run will catch it)
-        questions = _get_cached_questions_from_db(age)
+        logger.debug("Background preloading questions")
         
-        # Update memory cache
-        cache_key = _get_cache_key(age)
-        with _cache_lock:
-            _questions_cache[cache_key] = questions
-            _cache_timestamps[cache_key] = time.time()
+        # Through the cache layers: a current snapshot avoids the database
+        # (this might raise, but safe_thread_run will catch it)
+        question_set = get_question_set()
+        if question_set is None:
+            return
+        pinned = question_set.pin(hot_question_ids())
         
-        # Save to disk cache in background
-        safe_thread_run(_save_to_disk_cache, questions, age)
-        
-        logger.debug(f"Background preload completed: {len(questions)} questions")
+        logger.debug(f"Background preload completed: {len(question_set)} questions, {pinned} pinned")
             
     safe_thread_run(preload)
 
@@ -214,16 +279,73 @@ def _warmup_cache():
     
     current_time = time.time()
     if current_time - _last_preload_time > _preload_interval:
-        _preload_background(None)  # Preload all questions
+        _preload_background()
         _last_preload_time = current_time
 
+def _load_question_set(scope: Tuple[str, int]) -> QuestionSet:
+    """Disk snapshot, then the question_cache table, then question_bank"""
+    # 2. Check disk cache
+    snapshot = _load_from_disk_cache(scope)
+    if snapshot is not None:
+        return QuestionSet.from_snapshot(snapshot)
+    
+    # 3. Try database cache table
+    session = get_session()
+    try:
+        db_cache = _try_database_cache(session, scope)
+    finally:
+        session.close()
+    if db_cache is not None:
+        safe_thread_run(_save_to_disk_cache, db_cache, scope)
+        return QuestionSet(db_cache)
+    
+    # 4. Load from database (slowest)
+    logger.debug("Question set cache miss, loading from database...")
+    start_time = time.time()
+    
+    # Use LRU cached database function
+    questions = _get_cached_questions_from_db(scope)
+    safe_thread_run(_save_to_disk_cache, questions, scope)
+    
+    load_time = time.time() - start_time
+    logger.info(f"Loaded {len(questions)} questions from DB in {load_time:.3f}s")
+    return QuestionSet(questions)
+
+def get_question_set() -> Optional[QuestionSet]:
+    """
+    The active questions of the current bank version, through the cache
+    layers. None when the bank version cannot be read (caching disabled).
+    """
+    # One-row version read; every layer below is keyed by it
+    scope = _cache_scope()
+    if scope is None:
+        return None
+    
+    # 1. Check memory cache first
+    entry = _question_set
+    if entry is not None and entry[0] == scope:
+        logger.debug("Memory cache hit for question set")
+        return entry[1]
+    
+    # 1b. Shared memory: attach the set another instance published, or
+    # load it once through the layers below and publish it for the others
+    if SHARED_QUESTION_CACHE and question_shm.available():
+        snapshot = question_shm.shared_snapshot(
+            scope, lambda: _load_question_set(scope).rows, CACHE_DIR
+        )
+        if snapshot is not None:
+            return _remember(scope, QuestionSet.from_snapshot(snapshot))
+    
+    return _remember(scope, _load_question_set(scope))
+
 def load_questions(
     age: Optional[int] = None,
     db_path: Optional[str] = None
 ) -> List[Tuple[int, str, Optional[str]]]:
     """
     Load questions from DB using ORM with multi-level caching.
-    Returns list of (id, question_text, tooltip) tuples.
+    Returns list of (id, question_text, tooltip, min_age, max_age) tuples.
+    Every age is served from the one cached QuestionSet.
     """
     # Backward compatibility
     if isinstance(age, str) and db_path is None:
@@ -232,56 +354,14 @@ def load_questions(
         except ValueError:
             age = None
     
-    cache_key = _get_cache_key(age)
-    
-    # 1. Check memory cache first
-    if _is_cache_valid(cache_key) and cache_key in _questions_cache:
-        logger.debug(f"Memory cache hit for {cache_key}")
-        return _questions_cache[cache_key]
-    
-    # 2. Check disk cache
-    with _cache_lock:
-        if _is_cache_valid(cache_key) and cache_key in _questions_cache:
-            return _questions_cache[cache_key]
-        
-        disk_cache = _load_from_disk_cache(age)
-        if disk_cache is not None:
-            _questions_cache[cache_key] = disk_cache
-            _cache_timestamps[cache_key] = time.time()
-            return disk_cache
-    
-    # 3. Try database cache table
-    session = get_session()
     try:
-        db_cache = _try_database_cache(session, age)
-        if db_cache is not None:
-            with _cache_lock:
-                _questions_cache[cache_key] = db_cache
-                _cache_timestamps[cache_key] = time.time()
-            
-            safe_thread_run(_save_to_disk_cache, db_cache, age)
-            return db_cache
-    finally:
-        session.close()
-    
-    # 4. Load from database (slowest)
-    logger.debug(f"Cache miss for {cache_key}, loading from database...")
-    start_time = time.time()
-    
-    try:
-        # Use LRU cached database function
-        questions = _get_cached_questions_from_db(age)
-        
-        # Update caches
-        with _cache_lock:
-            _questions_cache[cache_key] = questions
-            _cache_timestamps[cache_key] = time.time()
-        
-        safe_thread_run(_save_to_disk_cache, questions, age)
-        
-        load_time = time.time() - start_time
-        logger.info(f"Loaded {len(questions)} questions from DB in {load_time:.3f}s (age filter: {age})")
+        question_set = get_question_set()
+        if question_set is None:
+            return _query_questions(age)
         
+        questions = question_set.for_age(age)
+        if not questions:
+            raise ResourceError("No questions found in database.")
         return questions
         
     except Exception as e:
@@ -295,75 +375,45 @@ def load_questions(
 
 def get_question_count(age: Optional[int] = None) -> int:
     """Get count of active questions (optimized)"""
-    cache_key = f"count_age_{age}" if age is not None else "count_all"
+    cache_key = f"question_count_age_{age}" if age is not None else "question_count"
     
-    # Check statistics cache first
-    session = get_session()
-    try:
-        stat = session.query(StatisticsCache).filter(
-            StatisticsCache.stat_name == cache_key,
-            StatisticsCache.valid_until > datetime.now().isoformat()
-        ).first()
-        
-        if stat:
-            return int(stat.stat_value)
-    except Exception:
-        pass # Fallback to DB count
-    finally:
-        session.close()
+    def count_questions():
+        session = get_session()
+        try:
+            query = session.query(Question).filter(Question.is_active == 1)
+            
+            if age is not None:
+                query = query.filter(Question.min_age <= age, Question.max_age >= age)
+                
+            return query.count()
+        finally:
+            session.close()
     
-    # Count from database
-    session = get_session()
     try:
-        query = session.query(Question).filter(Question.is_active == 1)
-        
-        if age is not None:
-            query = query.filter(Question.min_age <= age, Question.max_age >= age)
-            
-        count = query.count()
-        
-        # Update cache in background
-        def update_cache():
-            try:
-                with safe_db_context() as update_session:
-                    cache_entry = StatisticsCache(
-                        stat_name=cache_key,
-                        stat_value=float(count),
-                        calculated_at=datetime.now().isoformat(),
-                        valid_until=(datetime.now() + timedelta(hours=1)).isoformat()
-                    )
-                    update_session.merge(cache_entry)
-            except Exception as e:
-                logger.error(f"Failed to update count cache: {e}")
-        
-        safe_thread_run(update_cache)
-        
-        return count
+        return stats.get_or_compute(cache_key, count_questions, depends_on=["question_bank"])
     except Exception as e:
         logger.error(f"Failed to count questions: {e}")
         return 0
-    finally:
-        session.close()
 
 def preload_all_question_sets():
-    """Preload common question sets in background"""
-    common_ages = [None, 18, 25, 35, 50, 65]  # Common age filters
-    
-    for age in common_ages:
-        _preload_background(age)
+    """Preload the question set in background (it serves every age)"""
+    _preload_background()
 
 def clear_all_caches():
     """Clear all caches"""
-    global _questions_cache, _cache_timestamps, _last_preload_time
+    global _question_set, _last_preload_time
     
     with _cache_lock:
-        _questions_cache.clear()
-        _cache_timestamps.clear()
+        _question_set = None
+    _get_cached_questions_from_db.cache_clear()
+    if question_shm.available():
+        question_shm.detach_all()
+    _release_disk_snapshot()
     
     try:
         if os.path.exists(CACHE_DIR):
             for file in os.listdir(CACHE_DIR):
-                if file.endswith('.json'):
+                if file.endswith(('.json', '.snapshot')):
                     os.remove(os.path.join(CACHE_DIR, file))
     except Exception as e:
         logger.error(f"Failed to clear disk cache: {e}")
@@ -374,28 +424,50 @@ def clear_all_caches():
             session.query(QuestionCache).delete()
             session.query(StatisticsCache).delete()
             logger.info("All caches cleared")
+        stats.clear_local_cache()
     except Exception as e:
         logger.error(f"Failed to clear database caches: {e}")
         return False
     
     return True
 
-import random
-
-def get_random_questions_by_age(all_questions, user_age, num_questions):
+def get_random_questions_by_age(all_questions, user_age, num_questions, seed=None):
     """
-    Filters questions by min_age and max_age, returns randomized,
-    non-repeating set of questions for one attempt.
+    Filters questions by min_age and max_age, returns a weighted,
+    non-repeating set of questions for one attempt. A row may carry its
+    sampling weight as a sixth field (rows weighted 0 are never drawn);
+    without weights every question is equally likely. Pass `seed` for a
+    reproducible form. Works on the given rows only; see
+    sample_questions_by_age for the question bank's weights.
     """
-    filtered_questions = [
-        q for q in all_questions if q[3] <= user_age <= q[4]
-    ]
+    from app.services.question_sampler import QuestionSampler
 
-    if len(filtered_questions) < num_questions:
+    eligible = []
+    weights = []
+    for q in all_questions:
+        weight = q[5] if len(q) > 5 and q[5] is not None else 1.0
+        if q[3] <= user_age <= q[4] and weight > 0:
+            eligible.append(q)
+            weights.append(weight)
+    if len(eligible) < num_questions:
         raise ValueError("Not enough questions for this age")
 
-    selected_questions = random.sample(filtered_questions, num_questions)
-    return selected_questions
+    n = len(eligible)
+    sampler = QuestionSampler(range(n), weights, [0] * n, [0] * n,
+                              [q[3] for q in eligible], [q[4] for q in eligible])
+    return [eligible[i] for i in sampler.sample(user_age, num_questions, seed=seed).tolist()]
+
+def sample_questions_by_age(user_age, num_questions, seed=None):
+    """
+    A weighted exam form from the current question bank: active questions
+    for `user_age` drawn by their bank weight (weight 0 never drawn).
+    ValueError if the bank has too few.
+    """
+    from app.services.question_sampler import get_question_sampler
+
+    by_id = {q[0]: q for q in load_questions(user_age)}
+    ids = get_question_sampler().sample(user_age, num_questions, seed=seed).tolist()
+    return [by_id[i] for i in ids]
 
 
 # ------------------ INITIALIZATION ------------------
@@ -0,0 +1,202 @@
+"""
+Question access counts, gathered in memory and written in batches.
+
+record_access() only touches a dict owned by the calling thread, so the
+read path takes no lock and writes nothing. Each thread's counts only grow;
+flush_access_counts() copies them (one C-level dict copy), writes what
+changed since its last flush as a single UPDATE ... CASE per chunk, and
+remembers what it wrote. Questions without a question_cache row yet stay
+pending until a cache rebuild adds one. The maintenance scheduler runs it
+every round, so counts reach question_cache.access_count within a
+maintenance interval.
+
+hot_question_ids() ranks questions by stored plus pending counts; it decides
+which rows the question set keeps decoded in memory (see
+questions.QuestionSet.pin) and what is warmed at startup.
+"""
+
+import atexit
+import logging
+import threading
+import weakref
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# Questions kept decoded in the in-memory question set
+HOT_SET_SIZE = 200
+# question ids per UPDATE (each takes three bound parameters)
+FLUSH_CHUNK_SIZE = 300
+
+
+class _ThreadCounts:
+    """One thread's counters; only the owner writes `counts`, only the flusher `flushed`"""
+    __slots__ = ("counts", "flushed", "thread")
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.flushed: Dict[int, int] = {}
+        self.thread = weakref.ref(threading.current_thread())
+
+
+_local = threading.local()
+_registry: List[_ThreadCounts] = []
+_registry_lock = threading.Lock()
+_flush_lock = threading.Lock()
+
+
+def _thread_counts() -> _ThreadCounts:
+    mine = getattr(_local, "counts", None)
+    if mine is None:
+        mine = _local.counts = _ThreadCounts()
+        with _registry_lock:
+            _registry.append(mine)
+    return mine
+
+
+def record_access(question_ids: Iterable[int]):
+    """Count one access to each question; lock-free, no database work"""
+    counts = _thread_counts().counts
+    for question_id in question_ids:
+        counts[question_id] = counts.get(question_id, 0) + 1
+
+
+def _collect():
+    """
+    (pending, snapshots): accesses not yet flushed summed over threads, and
+    the per-thread copies they were computed from
+    """
+    with _registry_lock:
+        registry = list(_registry)
+    pending: Dict[int, int] = {}
+    snapshots = []
+    for entry in registry:
+        counts = entry.counts.copy()
+        for question_id, count in counts.items():
+            delta = count - entry.flushed.get(question_id, 0)
+            if delta:
+                pending[question_id] = pending.get(question_id, 0) + delta
+        snapshots.append((entry, counts))
+    return pending, snapshots
+
+
+def _mark_flushed(snapshots, written=None):
+    # Increments made after the copies were taken stay pending, as do
+    # questions outside `written` when it is given
+    for entry, counts in snapshots:
+        if written is None:
+            entry.flushed = counts
+        else:
+            flushed = entry.flushed.copy()
+            flushed.update((question_id, count) for question_id, count in counts.items()
+                           if question_id in written)
+            entry.flushed = flushed
+
+
+def pending_access_counts() -> Dict[int, int]:
+    return _collect()[0]
+
+
+def _prune_dead_threads():
+    """Forget counters of finished threads once everything they counted is written"""
+    with _registry_lock:
+        _registry[:] = [
+            entry for entry in _registry
+            if (entry.thread() is not None and entry.thread().is_alive())
+            or entry.counts != entry.flushed
+        ]
+
+
+def flush_access_counts(conn=None) -> Optional[Dict]:
+    """
+    Add pending counts to question_cache.access_count. Returns a summary
+    (maintenance task result), or None when there was nothing to write.
+    Counts for questions with no question_cache row are kept for a later flush.
+    """
+    with _flush_lock:
+        pending, snapshots = _collect()
+        if not pending:
+            return None
+
+        own_conn = conn is None
+        conn = conn or db.get_connection()
+        try:
+            cursor = conn.cursor()
+            # Hold the write lock so the rows found are the rows updated
+            cursor.execute("BEGIN IMMEDIATE")
+            written = set()
+            items = sorted(pending.items())
+            for start in range(0, len(items), FLUSH_CHUNK_SIZE):
+                chunk = items[start:start + FLUSH_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                cursor.execute(
+                    f"SELECT question_id FROM question_cache WHERE question_id IN ({placeholders})",
+                    [question_id for question_id, _ in chunk]
+                )
+                found = {row[0] for row in cursor.fetchall()}
+                chunk = [item for item in chunk if item[0] in found]
+                if not chunk:
+                    continue
+                written.update(found)
+                cases = " ".join("WHEN ? THEN ?" for _ in chunk)
+                placeholders = ",".join("?" * len(chunk))
+                params = [value for item in chunk for value in item]
+                params.extend(question_id for question_id, _ in chunk)
+                cursor.execute(f"""
+                    UPDATE question_cache
+                    SET access_count = COALESCE(access_count, 0) + CASE question_id {cases} ELSE 0 END
+                    WHERE question_id IN ({placeholders})
+                """, params)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if own_conn:
+                conn.close()
+
+        _mark_flushed(snapshots, written)
+        _prune_dead_threads()
+        if not written:
+            return None
+        return {"questions": len(written), "accesses": sum(pending[i] for i in written)}
+
+
+def hot_question_ids(limit: int = HOT_SET_SIZE) -> List[int]:
+    """The `limit` most accessed questions, stored counts plus pending ones"""
+    totals = dict(pending_access_counts())
+    conn = db.get_connection()
+    try:
+        rows = conn.execute(
+            "SELECT question_id, access_count FROM question_cache WHERE access_count > 0"
+        ).fetchall()
+    finally:
+        conn.close()
+    for question_id, count in rows:
+        totals[question_id] = totals.get(question_id, 0) + count
+    if not totals:
+        return []
+
+    ids = np.fromiter(totals.keys(), dtype=np.int64, count=len(totals))
+    counts = np.fromiter(totals.values(), dtype=np.int64, count=len(totals))
+    # Most accessed first, ties by id
+    order = np.lexsort((ids, -counts))[:limit]
+    return ids[order].tolist()
+
+
+def discard_pending_access_counts():
+    """Drop counts that were not flushed yet"""
+    with _flush_lock:
+        _mark_flushed(_collect()[1])
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        flush_access_counts()
+    except Exception as e:
+        logger.debug(f"Access counts not flushed at exit: {e}")
@@ -0,0 +1,242 @@
+"""
+Hot/cold archival for append-only history tables.
+
+Rows older than the configured horizon are moved out of the main database
+into one SQLite file per period (e.g. data/archive/responses_2024.db). Each
+chunk is an INSERT ... SELECT into the ATTACHed archive followed by a DELETE
+from the hot table in the same transaction, bounded by timestamp so no
+statement touches more than chunk_size rows (plus timestamp ties).
+
+Historical reads go through attached_history() / query_history(), which
+attach the relevant archives and expose a TEMP view <table>_all that
+UNIONs the hot table with them.
+
+In WAL mode a commit spanning attached files is atomic per file only; a
+crash between the two can leave a chunk in both places. Re-running the
+archiver repairs that (archive inserts are idempotent on id).
+"""
+
+import glob
+import logging
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from app.config import ARCHIVE_DIR, ARCHIVE_HORIZON_DAYS, ARCHIVE_PERIOD, ARCHIVE_CHUNK_SIZE
+from app.db import get_connection
+from app.utils import to_epoch_ms, from_epoch_ms
+
+logger = logging.getLogger(__name__)
+
+# table -> epoch-ms column used for the horizon and period split
+ARCHIVABLE_TABLES = {"responses": "timestamp_ms", "exam_sessions": "timestamp_ms"}
+
+PERIOD_FORMATS = {"year": "%Y", "month": "%Y-%m"}
+
+# SQLite's default SQLITE_MAX_ATTACHED is 10; keep one slot for callers
+MAX_ATTACHED_ARCHIVES = 9
+
+
+def _check_table(table: str) -> str:
+    if table not in ARCHIVABLE_TABLES:
+        raise ValueError(f"Table {table!r} is not archivable")
+    return ARCHIVABLE_TABLES[table]
+
+
+def _period_bounds(ms: int, period: str) -> Tuple[str, int, int]:
+    """(label, start_ms, end_ms) of the period containing `ms`"""
+    if period not in PERIOD_FORMATS:
+        raise ValueError(f"Unknown archive period {period!r}")
+    moment = from_epoch_ms(ms)
+    if period == "year":
+        start = datetime(moment.year, 1, 1)
+        end = datetime(moment.year + 1, 1, 1)
+    else:
+        start = datetime(moment.year, moment.month, 1)
+        end = datetime(moment.year + (moment.month == 12), moment.month % 12 + 1, 1)
+    return start.strftime(PERIOD_FORMATS[period]), to_epoch_ms(start), to_epoch_ms(end)
+
+
+def archive_path(table: str, label: str) -> str:
+    return os.path.join(ARCHIVE_DIR, f"{table}_{label}.db")
+
+
+def list_archives(table: str = "responses") -> List[Tuple[str, str]]:
+    """(period label, path) of every archive file for `table`, oldest first"""
+    _check_table(table)
+    prefix = f"{table}_"
+    found = []
+    for path in glob.glob(os.path.join(ARCHIVE_DIR, f"{prefix}*.db")):
+        found.append((os.path.basename(path)[len(prefix):-len(".db")], path))
+    return sorted(found)
+
+
+def _columns(cursor, table: str) -> List[Tuple[str, str]]:
+    cursor.execute(f"PRAGMA main.table_info({table})")
+    return [(row[1], row[2] or "") for row in cursor.fetchall()]
+
+
+def _ensure_archive_table(cursor, schema: str, table: str, ts_column: str, columns):
+    # Plain copy of the columns: the archive has no users table for the FKs to point at
+    defs = ", ".join(
+        f"{name} INTEGER PRIMARY KEY" if name == "id" else f"{name} {col_type}".strip()
+        for name, col_type in columns
+    )
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {schema}.{table} ({defs})")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_{ts_column} ON {table} ({ts_column})")
+    if any(name == "username" for name, _ in columns):
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_username_{ts_column} "
+            f"ON {table} (username, {ts_column})"
+        )
+
+
+def _move_period(conn, table, ts_column, columns, path, start_ms, end_ms, chunk_size) -> int:
+    """Move rows with start_ms <= ts < end_ms into the archive at `path`"""
+    column_list = ", ".join(name for name, _ in columns)
+    moved = 0
+    cursor = conn.cursor()
+    # Hot rows may still reference archived ones (scores.session_id); the
+    # reference stays resolvable through attached_history()
+    cursor.execute("PRAGMA foreign_keys")
+    foreign_keys = cursor.fetchone()[0]
+    cursor.execute("PRAGMA foreign_keys = OFF")
+    cursor.execute("ATTACH DATABASE ? AS archive", (path,))
+    try:
+        _ensure_archive_table(cursor, "archive", table, ts_column, columns)
+        conn.commit()
+        while True:
+            # Upper bound of the next chunk, found by walking the timestamp index
+            cursor.execute(
+                f"SELECT {ts_column} FROM main.{table} WHERE {ts_column} >= ? AND {ts_column} < ? "
+                f"ORDER BY {ts_column} LIMIT 1 OFFSET ?",
+                (start_ms, end_ms, chunk_size - 1)
+            )
+            row = cursor.fetchone()
+            upper = row[0] + 1 if row else end_ms
+            predicate = f"{ts_column} >= ? AND {ts_column} < ?"
+
+            cursor.execute(
+                f"INSERT OR IGNORE INTO archive.{table} ({column_list}) "
+                f"SELECT {column_list} FROM main.{table} WHERE {predicate}",
+                (start_ms, upper)
+            )
+            cursor.execute(f"DELETE FROM main.{table} WHERE {predicate}", (start_ms, upper))
+            deleted = cursor.rowcount
+            conn.commit()
+
+            moved += deleted
+            if row is None:
+                break
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.execute("DETACH DATABASE archive")
+        cursor.execute(f"PRAGMA foreign_keys = {int(foreign_keys)}")
+    return moved
+
+
+def archive_old_rows(table: str = "responses", horizon_days: Optional[int] = None,
+                     period: Optional[str] = None, chunk_size: Optional[int] = None,
+                     now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Move rows older than the horizon into per-period archive files.
+    Returns {period label: rows moved}.
+    """
+    ts_column = _check_table(table)
+    horizon_days = ARCHIVE_HORIZON_DAYS if horizon_days is None else horizon_days
+    period = period or ARCHIVE_PERIOD
+    chunk_size = max(1, chunk_size or ARCHIVE_CHUNK_SIZE)
+    cutoff_ms = to_epoch_ms((now or datetime.utcnow()) - timedelta(days=horizon_days))
+
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    results: Dict[str, int] = {}
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        columns = _columns(cursor, table)
+        while True:
+            cursor.execute(f"SELECT MIN({ts_column}) FROM main.{table} WHERE {ts_column} < ?", (cutoff_ms,))
+            oldest = cursor.fetchone()[0]
+            if oldest is None:
+                break
+
+            label, start_ms, end_ms = _period_bounds(oldest, period)
+            moved = _move_period(conn, table, ts_column, columns, archive_path(table, label),
+                                 start_ms, min(end_ms, cutoff_ms), chunk_size)
+            results[label] = results.get(label, 0) + moved
+            logger.info(f"Archived {moved} {table} rows into period {label}")
+    finally:
+        conn.close()
+    return results
+
+
+def _archives_in_range(table, start_ms, end_ms, period) -> List[str]:
+    selected = []
+    for label, path in list_archives(table):
+        try:
+            first = datetime.strptime(label, PERIOD_FORMATS[period])
+        except ValueError:
+            continue
+        _, p_start, p_end = _period_bounds(to_epoch_ms(first), period)
+        if (end_ms is None or p_start < end_ms) and (start_ms is None or p_end > start_ms):
+            selected.append(path)
+    return selected
+
+
+@contextmanager
+def attached_history(conn, table: str = "responses", start_ms: Optional[int] = None,
+                     end_ms: Optional[int] = None, period: Optional[str] = None):
+    """
+    Attach the archives overlapping [start_ms, end_ms) to `conn` and create
+    TEMP VIEW <table>_all over the hot table plus those archives.
+    Yields the view name; everything is detached again on exit.
+    """
+    _check_table(table)
+    paths = _archives_in_range(table, start_ms, end_ms, period or ARCHIVE_PERIOD)
+    if len(paths) > MAX_ATTACHED_ARCHIVES:
+        raise ValueError(
+            f"{len(paths)} archives overlap the requested range; narrow it to at most "
+            f"{MAX_ATTACHED_ARCHIVES} periods"
+        )
+
+    view = f"{table}_all"
+    cursor = conn.cursor()
+    column_list = ", ".join(name for name, _ in _columns(cursor, table))
+    schemas = []
+    try:
+        for i, path in enumerate(paths):
+            # Table-specific names so histories of different tables can nest
+            schema = f"{table}_history_{i}"
+            cursor.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+            schemas.append(schema)
+        selects = [f"SELECT {column_list} FROM main.{table}"]
+        selects += [f"SELECT {column_list} FROM {schema}.{table}" for schema in schemas]
+        cursor.execute(f"DROP VIEW IF EXISTS temp.{view}")
+        cursor.execute(f"CREATE TEMP VIEW {view} AS " + " UNION ALL ".join(selects))
+        yield view
+    finally:
+        cursor.execute(f"DROP VIEW IF EXISTS temp.{view}")
+        conn.commit()
+        for schema in schemas:
+            cursor.execute(f"DETACH DATABASE {schema}")
+
+
+def query_history(sql: str, params=(), table: str = "responses",
+                  start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> List[tuple]:
+    """
+    Run `sql` (which reads from <table>_all) with archives attached.
+    Rows come back as namedtuples keyed by the selected column names.
+    """
+    conn = get_connection()
+    try:
+        with attached_history(conn, table, start_ms, end_ms):
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            Row = namedtuple("Row", [d[0] for d in cursor.description])
+            return [Row(*r) for r in cursor.fetchall()]
+    finally:
+        conn.close()
@@ -0,0 +1,157 @@
+"""
+Packed per-session response storage.
+
+A finished exam is one exam_sessions row: question ids packed as
+little-endian uint16 and answers as int8, in answer order. That replaces
+one indexed `responses` row (username, age groups, ISO timestamp) per
+answer. Analytics decode the BLOBs with np.frombuffer, which wraps the
+bytes without copying (load_responses / read_responses). The
+exam_responses / all_responses views (see app.models.create_response_views)
+decode in SQL and are meant for ad-hoc queries, not bulk reads.
+
+Rows written before packing was introduced stay in `responses`;
+load_responses() returns both.
+"""
+
+from contextlib import ExitStack
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.db import get_connection
+from app.models import MAX_SESSION_ANSWERS
+from app.services.archive import attached_history
+from app.services.users import user_where
+from app.utils import to_epoch_ms
+
+QUESTION_ID_DTYPE = np.dtype("<u2")
+RESPONSE_DTYPE = np.dtype("i1")
+
+INSERT_SESSION_SQL = """
+    INSERT INTO exam_sessions
+    (username, age_group, detailed_age_group, timestamp, timestamp_ms,
+     answer_count, question_ids, response_values, user_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Bulk writers that assign session ids themselves (see app.services.ingest)
+INSERT_SESSION_WITH_ID_SQL = """
+    INSERT INTO exam_sessions
+    (id, username, age_group, detailed_age_group, timestamp, timestamp_ms,
+     answer_count, question_ids, response_values, user_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+RESPONSE_COLUMNS = ["id", "session_id", "username", "question_id", "response_value",
+                    "age_group", "detailed_age_group", "timestamp", "timestamp_ms"]
+
+
+def pack_answers(answers: Iterable[Tuple[int, int]]) -> Tuple[bytes, bytes]:
+    """(question_id, value) pairs -> (question id BLOB, value BLOB)"""
+    pairs = list(answers)
+    if len(pairs) > MAX_SESSION_ANSWERS:
+        raise ValueError(f"A session holds at most {MAX_SESSION_ANSWERS} answers, got {len(pairs)}")
+    if not pairs:
+        return b"", b""
+    question_ids, values = zip(*pairs)
+    # np.array(..., dtype) would wrap out-of-range values silently
+    if min(question_ids) < 0 or max(question_ids) > np.iinfo(QUESTION_ID_DTYPE).max:
+        raise ValueError("question_id out of range for packed storage")
+    if min(values) < np.iinfo(RESPONSE_DTYPE).min or max(values) > np.iinfo(RESPONSE_DTYPE).max:
+        raise ValueError("response value out of range for packed storage")
+    return (np.asarray(question_ids, dtype=QUESTION_ID_DTYPE).tobytes(),
+            np.asarray(values, dtype=RESPONSE_DTYPE).tobytes())
+
+
+def unpack_answers(question_ids: bytes, response_values: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Zero-copy, read-only views over the packed BLOBs"""
+    return (np.frombuffer(question_ids, dtype=QUESTION_ID_DTYPE),
+            np.frombuffer(response_values, dtype=RESPONSE_DTYPE))
+
+
+def session_row(username, age_group, detailed_age_group, timestamp,
+                answers: Iterable[Tuple[int, int]], user_id: Optional[int] = None) -> tuple:
+    """Parameters for INSERT_SESSION_SQL"""
+    question_ids, values = pack_answers(answers)
+    return (username, age_group, detailed_age_group, timestamp, to_epoch_ms(timestamp),
+            len(values), question_ids, values, user_id)
+
+
+def _packed_frame(rows) -> pd.DataFrame:
+    if not rows:
+        return pd.DataFrame(columns=RESPONSE_COLUMNS)
+    session_ids, usernames, age_groups, detailed, timestamps, timestamps_ms, counts, id_blobs, value_blobs = zip(*rows)
+    counts = np.asarray(counts, dtype=np.int64)
+    # Session-level columns repeat once per answer; the answers themselves are
+    # read straight out of the BLOBs and joined in one copy
+    return pd.DataFrame({
+        "id": None,
+        "session_id": np.repeat(np.asarray(session_ids, dtype=np.int64), counts),
+        "username": np.repeat(np.asarray(usernames, dtype=object), counts),
+        "question_id": np.concatenate([np.frombuffer(b, dtype=QUESTION_ID_DTYPE) for b in id_blobs]).astype(np.int64),
+        "response_value": np.concatenate([np.frombuffer(b, dtype=RESPONSE_DTYPE) for b in value_blobs]).astype(np.int64),
+        "age_group": np.repeat(np.asarray(age_groups, dtype=object), counts),
+        "detailed_age_group": np.repeat(np.asarray(detailed, dtype=object), counts),
+        "timestamp": np.repeat(np.asarray(timestamps, dtype=object), counts),
+        "timestamp_ms": np.repeat(np.asarray(timestamps_ms, dtype=object), counts),
+    }, columns=RESPONSE_COLUMNS)
+
+
+def load_responses(username: Optional[str] = None, include_legacy: bool = True,
+                   include_archived: bool = False, user_id: Optional[int] = None) -> pd.DataFrame:
+    """
+    One row per answer (RESPONSE_COLUMNS), ordered by time, decoded from
+    exam_sessions and, unless include_legacy is False, the old `responses`
+    rows. include_archived also reads the attached archive databases.
+    Pass user_id when the caller has already resolved the username.
+    """
+    where, params = "", ()
+    if username is not None or user_id is not None:
+        predicate, params = user_where(username, user_id)
+        where = f"WHERE {predicate}"
+    conn = get_connection()
+    try:
+        with ExitStack() as stack:
+            sessions_source, responses_source = "exam_sessions", "responses"
+            if include_archived:
+                sessions_source = stack.enter_context(attached_history(conn, "exam_sessions"))
+                if include_legacy:
+                    responses_source = stack.enter_context(attached_history(conn, "responses"))
+            return read_responses(conn.cursor(), include_legacy, where, params,
+                                  sessions_source, responses_source)
+    finally:
+        conn.close()
+
+
+def read_responses(cursor, include_legacy: bool = True, where: str = "", params: tuple = (),
+                   sessions_source: str = "exam_sessions", responses_source: str = "responses") -> pd.DataFrame:
+    """
+    load_responses() over an open cursor (any database with these tables,
+    tuple rows). Bulk readers use this rather than the exam_responses view,
+    which decodes hex in SQL one answer at a time.
+    """
+    cursor.execute(f"""
+        SELECT id, username, age_group, detailed_age_group, timestamp, timestamp_ms,
+               answer_count, question_ids, response_values
+        FROM {sessions_source} {where}
+    """, params)
+    frames = [_packed_frame(cursor.fetchall())]
+    if include_legacy:
+        cursor.execute(f"""
+            SELECT id, session_id, username, question_id, response_value,
+                   age_group, detailed_age_group, timestamp, timestamp_ms
+            FROM {responses_source} {where}
+        """, params)
+        legacy = cursor.fetchall()
+        if legacy:
+            frames.append(pd.DataFrame(legacy, columns=RESPONSE_COLUMNS))
+
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=RESPONSE_COLUMNS)
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    # Stable sort keeps answer order within a session
+    df = df.sort_values(["timestamp_ms", "timestamp"], kind="stable", na_position="first")
+    df["id"] = df["id"].astype(object).where(df["id"].notna(), None)
+    return df.reset_index(drop=True)
@@ -0,0 +1,299 @@
+"""
+Bulk ingestion of completed exams (offline kiosk sync, paper-results import).
+
+Sessions are read lazily from any iterable (see iter_jsonl / iter_csv for
+streaming file readers), validated a batch at a time with
+DataCleaner.clean_exam_batch, scored for sentiment in a process pool and
+written with executemany, one transaction per batch. Answers are stored
+packed, one exam_sessions row per exam (see app.services.exam_sessions).
+
+Each session is a mapping with:
+    username         required
+    age              optional; invalid values are stored as unknown
+    responses        {question_id: value}, [[question_id, value], ...] or
+                     [{"question_id": .., "value": ..}, ...]
+    reflection_text  optional
+    timestamp        optional ISO timestamp; defaults to the import time
+"""
+
+import csv
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from app.analysis.data_cleaning import DataCleaner
+from app.db import get_connection
+from app.services.exam_sessions import INSERT_SESSION_WITH_ID_SQL, session_row
+from app.services.users import resolve_user_ids
+from app.services.maintenance import write_activity
+from app.utils import compute_age_group, compute_detailed_age_group, to_epoch_ms
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 2000
+MAX_RESPONSE_VALUE = 4
+MAX_REPORTED_REJECTIONS = 100
+# CSV columns named q<question_id> hold that question's answer
+CSV_QUESTION_PREFIX = "q"
+
+INSERT_SCORE_SQL = """
+    INSERT INTO scores
+    (username, age, total_score, sentiment_score, reflection_text, detailed_age_group, timestamp, timestamp_ms,
+     user_id, session_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+# ---------------- Streaming readers ----------------
+
+def iter_jsonl(path: str) -> Iterator[Dict]:
+    """Yield one session per non-blank line"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning(f"{path}:{line_no}: skipping malformed JSON line")
+
+
+def iter_csv(path: str) -> Iterator[Dict]:
+    """Yield one session per row; answers come from q<question_id> columns"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        question_columns = [
+            (name, name[len(CSV_QUESTION_PREFIX):]) for name in reader.fieldnames or []
+            if name.startswith(CSV_QUESTION_PREFIX) and name[len(CSV_QUESTION_PREFIX):].isdigit()
+        ]
+        for row in reader:
+            yield {
+                "username": row.get("username"),
+                "age": row.get("age"),
+                "reflection_text": row.get("reflection_text") or "",
+                "timestamp": row.get("timestamp") or None,
+                "responses": {qid: row[name] for name, qid in question_columns if row.get(name) not in (None, "")},
+            }
+
+
+def iter_file(path: str) -> Iterator[Dict]:
+    """Pick a streaming reader from the file extension"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return iter_jsonl(path)
+    if ext == ".csv":
+        return iter_csv(path)
+    raise ValueError(f"Unsupported import format: {ext}")
+
+
+# ---------------- Sentiment workers ----------------
+
+_worker_analyzer = None
+
+
+def _load_analyzer():
+    try:
+        from nltk.sentiment import SentimentIntensityAnalyzer
+        return SentimentIntensityAnalyzer()
+    except Exception as e:
+        logger.warning(f"Sentiment analyzer unavailable, storing 0.0: {e}")
+        return None
+
+
+def _init_worker():
+    global _worker_analyzer
+    _worker_analyzer = _load_analyzer()
+
+
+def _score_texts(texts: List[str]) -> List[float]:
+    """Same scale as the exam UI: VADER compound * 100, 0.0 for empty text"""
+    analyzer = _worker_analyzer
+    scores = []
+    for text in texts:
+        if not text or analyzer is None:
+            scores.append(0.0)
+            continue
+        try:
+            scores.append(analyzer.polarity_scores(text)["compound"] * 100)
+        except Exception:
+            scores.append(0.0)
+    return scores
+
+
+class _SentimentPool:
+    """Process pool created on first use; falls back to inline scoring"""
+
+    def __init__(self, workers: Optional[int]):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self._executor = None
+        self._available = None
+
+    def score(self, texts: List[str]) -> List[float]:
+        if not any(texts):
+            return [0.0] * len(texts)
+
+        if self._available is None:
+            # Probe once in-process so a missing lexicon does not spin up workers
+            self._available = _load_analyzer() is not None
+        if not self._available:
+            return [0.0] * len(texts)
+
+        if self.workers <= 1:
+            if _worker_analyzer is None:
+                _init_worker()
+            return _score_texts(texts)
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        chunk = max(1, len(texts) // self.workers + 1)
+        parts = [texts[i:i + chunk] for i in range(0, len(texts), chunk)]
+        return [s for part in self._executor.map(_score_texts, parts) for s in part]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+# ---------------- Ingestion ----------------
+
+def _response_pairs(responses):
+    if isinstance(responses, dict):
+        return list(responses.items())
+    pairs = []
+    for item in responses or []:
+        if isinstance(item, dict):
+            pairs.append((item.get("question_id"), item.get("value", item.get("response_value"))))
+        elif isinstance(item, (list, tuple)) and len(item) == 2:
+            pairs.append(tuple(item))
+    return pairs
+
+
+def _prepare_batch(batch: List[Dict], start_index: int):
+    """Frame one batch for DataCleaner; index = position in the input stream"""
+    import_time = datetime.utcnow().isoformat()
+    sessions, responses = [], []
+    for offset, session in enumerate(batch):
+        index = start_index + offset
+        if not isinstance(session, dict):
+            session = {}
+        sessions.append({
+            "session": index,
+            "username": session.get("username"),
+            "age": session.get("age"),
+            "reflection_text": (session.get("reflection_text") or "").strip(),
+            "timestamp": session.get("timestamp") or import_time,
+        })
+        responses.extend(
+            {"session": index, "question_id": qid, "response_value": value}
+            for qid, value in _response_pairs(session.get("responses"))
+        )
+
+    sessions_df = pd.DataFrame(sessions).set_index("session")
+    responses_df = pd.DataFrame(responses, columns=["session", "question_id", "response_value"])
+    return DataCleaner.clean_exam_batch(sessions_df, responses_df, max_response=MAX_RESPONSE_VALUE)
+
+
+def _write_batch(score_rows: List[tuple], session_rows: List[tuple]):
+    with write_activity():
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            # Take the write lock before reading MAX(id) so the ids assigned
+            # here cannot be claimed by another writer; both tables then go
+            # in with one executemany each
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM exam_sessions")
+            first_id = cursor.fetchone()[0] + 1
+            session_ids = range(first_id, first_id + len(session_rows))
+            cursor.executemany(INSERT_SESSION_WITH_ID_SQL, [
+                (session_id,) + row for session_id, row in zip(session_ids, session_rows)
+            ])
+            cursor.executemany(INSERT_SCORE_SQL, [
+                score + (session_id,) for score, session_id in zip(score_rows, session_ids)
+            ])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+def ingest_sessions(sessions: Iterable[Dict], batch_size: int = BATCH_SIZE,
+                    sentiment_workers: Optional[int] = None) -> Dict:
+    """
+    Store many completed exams. Consumes `sessions` lazily, `batch_size` at a
+    time, each batch in its own transaction. Returns counts of stored and
+    rejected sessions plus the first rejection reasons (by input position).
+    """
+    report = {"sessions": 0, "responses": 0, "rejected": 0, "rejections": []}
+    pool = _SentimentPool(sentiment_workers)
+    iterator = iter(sessions)
+    start_index = 0
+
+    try:
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                break
+
+            sessions_df, responses_df = _prepare_batch(batch, start_index)
+            start_index += len(batch)
+
+            rejected = sessions_df[sessions_df["reject_reason"].notna()]
+            report["rejected"] += len(rejected)
+            for index, reason in rejected["reject_reason"].items():
+                if len(report["rejections"]) < MAX_REPORTED_REJECTIONS:
+                    report["rejections"].append((int(index), reason))
+
+            valid = sessions_df[sessions_df["reject_reason"].isna()]
+            if valid.empty:
+                continue
+
+            ages = [None if pd.isna(a) else int(a) for a in valid["age"]]
+            detailed_groups = [compute_detailed_age_group(a) for a in ages]
+            age_groups = [compute_age_group(a) for a in ages]
+            timestamps = list(valid["timestamp"])
+            timestamps_ms = [to_epoch_ms(ts) for ts in timestamps]
+            sentiments = pool.score(list(valid["reflection_text"]))
+            # Registered names map to users.id; one lookup for the whole batch
+            user_ids = resolve_user_ids(valid["username"].unique())
+            batch_user_ids = [user_ids.get(name) for name in valid["username"]]
+
+            score_rows = list(zip(
+                valid["username"], ages, valid["total_score"].astype(int).tolist(), sentiments,
+                valid["reflection_text"], detailed_groups, timestamps, timestamps_ms, batch_user_ids,
+            ))
+
+            answers = {
+                index: list(zip(group["question_id"].tolist(), group["response_value"].tolist()))
+                for index, group in responses_df[responses_df["session"].isin(valid.index)].groupby("session")
+            }
+            session_rows = [
+                session_row(username, age_group, detailed, ts, answers[index], user_id)
+                for index, username, age_group, detailed, ts, user_id in zip(
+                    valid.index, valid["username"], age_groups, detailed_groups, timestamps, batch_user_ids
+                )
+            ]
+
+            _write_batch(score_rows, session_rows)
+            report["sessions"] += len(score_rows)
+            report["responses"] += sum(len(answers[index]) for index in valid.index)
+            logger.info(f"Ingested {report['sessions']} sessions so far")
+    finally:
+        pool.close()
+
+    return report
+
+
+def ingest_file(path: str, **kwargs) -> Dict:
+    """Stream a .jsonl or .csv export into the database"""
+    return ingest_sessions(iter_file(path), **kwargs)
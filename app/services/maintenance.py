@@ -0,0 +1,270 @@
+"""
+Background database maintenance.
+
+A daemon thread wakes every interval_seconds and runs whichever tasks are due:
+
+    access_counts      batch-write question access counts gathered in memory
+                       (app.services.access_counts)
+    wal_checkpoint     PASSIVE once the -wal file passes wal_passive_mb,
+                       TRUNCATE once it passes wal_truncate_mb
+    analyze            ANALYZE (bounded by analysis_limit) + PRAGMA optimize
+                       after analyze_after_writes row writes, counted from the
+                       data_versions triggers plus MAX(rowid) of the
+                       append-only tables
+    incremental_vacuum when the freelist exceeds vacuum_freelist_pages
+                       (needs auto_vacuum=INCREMENTAL, see the PRAGMA profile)
+
+Exam and import writers call note_write_activity() / write_activity(); the
+scheduler skips a round while a writer is active or has been within
+busy_backoff_seconds, so maintenance never competes with an exam for the
+write lock. Every task logs how long it took.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from app import db
+from app.models import APPEND_TABLES
+from app.services.access_counts import flush_access_counts
+from app.config import (
+    MAINTENANCE_ENABLED, MAINTENANCE_INTERVAL_SECONDS,
+    MAINTENANCE_WAL_PASSIVE_BYTES, MAINTENANCE_WAL_TRUNCATE_BYTES,
+    MAINTENANCE_ANALYZE_AFTER_WRITES, MAINTENANCE_VACUUM_FREELIST_PAGES,
+    MAINTENANCE_VACUUM_PAGES_PER_RUN, MAINTENANCE_BUSY_BACKOFF_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# Rows ANALYZE samples per index; keeps a run in the milliseconds on large tables
+ANALYSIS_LIMIT = 1000
+# schema_info key holding the write counter at the last ANALYZE
+ANALYZE_MARK_KEY = "maintenance_analyze_writes"
+
+# auto_vacuum values reported by PRAGMA auto_vacuum
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+# ---------------- Write activity ----------------
+
+_activity_lock = threading.Lock()
+_active_writers = 0
+_last_write_at = 0.0
+
+
+def note_write_activity():
+    """Record that an exam/import write just happened"""
+    global _last_write_at
+    with _activity_lock:
+        _last_write_at = time.monotonic()
+
+
+@contextmanager
+def write_activity():
+    """Mark a block of writes; maintenance waits until it is over"""
+    global _active_writers, _last_write_at
+    with _activity_lock:
+        _active_writers += 1
+        _last_write_at = time.monotonic()
+    try:
+        yield
+    finally:
+        with _activity_lock:
+            _active_writers -= 1
+            _last_write_at = time.monotonic()
+
+
+def writes_active(backoff_seconds: float = MAINTENANCE_BUSY_BACKOFF_SECONDS) -> bool:
+    with _activity_lock:
+        if _active_writers > 0:
+            return True
+        return _last_write_at > 0 and time.monotonic() - _last_write_at < backoff_seconds
+
+
+# ---------------- Tasks ----------------
+
+def _database_path() -> Optional[str]:
+    return db.get_engine().url.database
+
+
+def wal_size_bytes(path: Optional[str] = None) -> int:
+    path = path or _database_path()
+    try:
+        return os.path.getsize(f"{path}-wal")
+    except (OSError, TypeError):
+        return 0
+
+
+def checkpoint_wal(conn, passive_bytes=MAINTENANCE_WAL_PASSIVE_BYTES,
+                   truncate_bytes=MAINTENANCE_WAL_TRUNCATE_BYTES) -> Optional[Dict]:
+    size = wal_size_bytes()
+    if size < passive_bytes:
+        return None
+    mode = "TRUNCATE" if size >= truncate_bytes else "PASSIVE"
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA wal_checkpoint({mode})")
+    busy, log_frames, checkpointed = cursor.fetchone()
+    return {"mode": mode, "wal_bytes": size, "busy": bool(busy),
+            "log_frames": log_frames, "checkpointed": checkpointed}
+
+
+def _write_count(cursor) -> Optional[int]:
+    try:
+        # Appends to APPEND_TABLES are not counted by the triggers
+        appended = "".join(f" + (SELECT COALESCE(MAX(rowid), 0) FROM {table})"
+                           for table in APPEND_TABLES)
+        cursor.execute(f"SELECT (SELECT COALESCE(SUM(version), 0) FROM data_versions){appended}")
+        return int(cursor.fetchone()[0])
+    except Exception:
+        # Write counters not installed on this database
+        return None
+
+
+def _analyze_mark(cursor) -> Optional[int]:
+    cursor.execute("SELECT value FROM schema_info WHERE key = ?", (ANALYZE_MARK_KEY,))
+    row = cursor.fetchone()
+    return int(row[0]) if row else None
+
+
+def _set_analyze_mark(cursor, writes: int):
+    cursor.execute("""
+        INSERT INTO schema_info (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    """, (ANALYZE_MARK_KEY, str(writes)))
+
+
+def analyze_if_due(conn, after_writes=MAINTENANCE_ANALYZE_AFTER_WRITES) -> Optional[Dict]:
+    cursor = conn.cursor()
+    writes = _write_count(cursor)
+    if writes is None:
+        return None
+    mark = _analyze_mark(cursor)
+    if mark is not None and writes - mark < after_writes:
+        return None
+
+    cursor.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    cursor.execute("ANALYZE")
+    cursor.execute("PRAGMA optimize")
+    _set_analyze_mark(cursor, writes)
+    conn.commit()
+    return {"writes_since_last": None if mark is None else writes - mark}
+
+
+def vacuum_if_due(conn, freelist_pages=MAINTENANCE_VACUUM_FREELIST_PAGES,
+                  pages_per_run=MAINTENANCE_VACUUM_PAGES_PER_RUN) -> Optional[Dict]:
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA freelist_count")
+    free = cursor.fetchone()[0]
+    if free < freelist_pages:
+        return None
+    cursor.execute("PRAGMA auto_vacuum")
+    if cursor.fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+        logger.debug(f"{free} free pages but auto_vacuum is not INCREMENTAL; skipping")
+        return None
+    # execute() steps a result-less statement only once (one page); a script runs it to completion
+    cursor.executescript(f"PRAGMA incremental_vacuum({int(pages_per_run)});")
+    cursor.execute("PRAGMA freelist_count")
+    return {"freelist_before": free, "freelist_after": cursor.fetchone()[0]}
+
+
+TASKS = (
+    ("access_counts", flush_access_counts),
+    ("wal_checkpoint", checkpoint_wal),
+    ("analyze", analyze_if_due),
+    ("incremental_vacuum", vacuum_if_due),
+)
+
+
+def run_maintenance(force_analyze: bool = False) -> Dict[str, Dict]:
+    """
+    Run every due task once on a pooled connection.
+    Returns {task: result} for the tasks that did work.
+    """
+    results = {}
+    conn = db.get_connection()
+    try:
+        for name, task in TASKS:
+            start = time.perf_counter()
+            try:
+                if name == "analyze" and force_analyze:
+                    result = task(conn, after_writes=0)
+                else:
+                    result = task(conn)
+            except Exception as e:
+                conn.rollback()
+                logger.warning(f"Maintenance task {name} failed: {e}")
+                continue
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            if result is not None:
+                result["duration_ms"] = elapsed_ms
+                results[name] = result
+                logger.info(f"Maintenance {name} took {elapsed_ms:.1f} ms: {result}")
+    finally:
+        conn.close()
+    return results
+
+
+# ---------------- Scheduler ----------------
+
+class MaintenanceScheduler:
+    """Daemon thread running run_maintenance() between exam writes"""
+
+    def __init__(self, interval_seconds: float = MAINTENANCE_INTERVAL_SECONDS,
+                 backoff_seconds: float = MAINTENANCE_BUSY_BACKOFF_SECONDS):
+        self.interval_seconds = interval_seconds
+        self.backoff_seconds = backoff_seconds
+        self.last_results: Dict[str, Dict] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="db-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def tick(self) -> bool:
+        """One scheduling round; returns False if it backed off for writers"""
+        if writes_active(self.backoff_seconds):
+            logger.debug("Exam writes active, postponing maintenance")
+            return False
+        self.last_results = run_maintenance()
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Maintenance round failed: {e}")
+
+
+_scheduler: Optional[MaintenanceScheduler] = None
+
+
+def start_maintenance() -> Optional[MaintenanceScheduler]:
+    """Start the process-wide scheduler (no-op when disabled in config)"""
+    global _scheduler
+    if not MAINTENANCE_ENABLED:
+        return None
+    if _scheduler is None:
+        _scheduler = MaintenanceScheduler()
+    _scheduler.start()
+    return _scheduler
+
+
+def stop_maintenance():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
@@ -0,0 +1,213 @@
+"""
+Weighted, stratified question sampling.
+
+QuestionSampler holds every active question's id, weight, difficulty,
+category and age bounds in NumPy arrays. The age axis is cut into bands
+at every min_age / max_age + 1 boundary; within a band the eligible
+questions never change, so each (band, stratum) gets its cumulative
+weight array once and keeps it.
+
+sample() draws one exam form without replacement: each pick is a binary
+search into the cumulative weights (O(log n)) and repeats are redrawn,
+which is exactly successive weighted sampling. generate_forms() draws many
+forms at once with exponential keys (key = Exp(1) / weight, keep the k
+smallest), the same distribution vectorized over a (forms x questions)
+matrix. Both take a seed or a numpy Generator so forms are reproducible.
+
+Quotas stratify a form: {category_id: count}, {difficulty: count} or
+{(category_id, difficulty): count}, chosen with `stratify_by`.
+"""
+
+import logging
+import threading
+from typing import Dict, Hashable, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+from app.db import get_session
+from app.models import Question
+
+logger = logging.getLogger(__name__)
+
+SeedLike = Union[None, int, np.random.Generator]
+
+STRATIFY_KEYS = ("category", "difficulty", "category_difficulty")
+# Redraw rounds before a single draw falls back to exponential keys
+MAX_REJECTION_ROUNDS = 8
+
+
+def _rng(seed: SeedLike) -> np.random.Generator:
+    return seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+
+class QuestionSampler:
+    """Precomputed weighted sampler over one version of the question bank"""
+
+    def __init__(self, ids, weights, difficulty, category, min_age, max_age):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.difficulty = np.asarray(difficulty, dtype=np.int64)
+        self.category = np.asarray(category, dtype=np.int64)
+        self.min_age = np.asarray(min_age, dtype=np.int64)
+        self.max_age = np.asarray(max_age, dtype=np.int64)
+        # Band i covers ages [boundaries[i], boundaries[i + 1])
+        self.boundaries = np.unique(np.concatenate([self.min_age, self.max_age + 1]))
+        self._strata: Dict[Tuple, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_db(cls) -> "QuestionSampler":
+        """Active questions with a positive weight; NULL columns take the model defaults"""
+        session = get_session()
+        try:
+            rows = session.query(
+                Question.id, Question.weight, Question.difficulty, Question.category_id,
+                Question.min_age, Question.max_age
+            ).filter(Question.is_active == 1).order_by(Question.id).all()
+        finally:
+            session.close()
+
+        rows = [
+            (qid, 1.0 if weight is None else weight, difficulty or 0, category or 0,
+             0 if min_age is None else min_age, 120 if max_age is None else max_age)
+            for qid, weight, difficulty, category, min_age, max_age in rows
+        ]
+        rows = [r for r in rows if r[1] > 0]
+        if not rows:
+            return cls([], [], [], [], [], [])
+        return cls(*zip(*rows))
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ---------------- strata ----------------
+
+    def _band(self, age: int) -> int:
+        return int(np.searchsorted(self.boundaries, age, side="right")) - 1
+
+    def _stratum_mask(self, stratify_by: Optional[str], key: Hashable) -> np.ndarray:
+        if stratify_by is None:
+            return np.ones(len(self.ids), dtype=bool)
+        if stratify_by == "category":
+            return self.category == key
+        if stratify_by == "difficulty":
+            return self.difficulty == key
+        if stratify_by == "category_difficulty":
+            category, difficulty = key
+            return (self.category == category) & (self.difficulty == difficulty)
+        raise ValueError(f"stratify_by must be one of {STRATIFY_KEYS}, got {stratify_by!r}")
+
+    def stratum(self, age: int, stratify_by: Optional[str] = None,
+                key: Hashable = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(question indices, cumulative weights) for one band and stratum, computed once"""
+        band = self._band(age)
+        cache_key = (band, stratify_by, key)
+        cached = self._strata.get(cache_key)
+        if cached is not None:
+            return cached
+
+        mask = self._stratum_mask(stratify_by, key) & (self.min_age <= age) & (self.max_age >= age)
+        indices = np.flatnonzero(mask)
+        cached = (indices, np.cumsum(self.weights[indices]))
+        with self._lock:
+            self._strata[cache_key] = cached
+        return cached
+
+    def _plan(self, age: int, k: Optional[int], quotas: Optional[Mapping],
+              stratify_by: Optional[str]):
+        """[(indices, cumulative weights, count)] covering the form"""
+        if quotas:
+            if stratify_by is None:
+                raise ValueError("quotas need stratify_by")
+            plan = [(*self.stratum(age, stratify_by, key), count) for key, count in quotas.items() if count]
+            if k is not None and k != sum(count for *_, count in plan):
+                raise ValueError(f"quotas add up to {sum(c for *_, c in plan)}, not k={k}")
+        else:
+            if k is None:
+                raise ValueError("k is required without quotas")
+            plan = [(*self.stratum(age), k)]
+
+        for indices, _, count in plan:
+            if count > len(indices):
+                raise ValueError("Not enough questions for this age")
+        return plan
+
+    # ---------------- drawing ----------------
+
+    def _draw(self, indices, cumulative, count, rng) -> np.ndarray:
+        """`count` distinct positions into `indices`, successive weighted sampling"""
+        chosen, seen = [], set()
+        total = cumulative[-1] if len(cumulative) else 0.0
+        for _ in range(MAX_REJECTION_ROUNDS):
+            missing = count - len(chosen)
+            if missing == 0:
+                break
+            picks = np.searchsorted(cumulative, rng.random(2 * missing) * total, side="right")
+            for pick in picks.tolist():
+                if pick not in seen:
+                    seen.add(pick)
+                    chosen.append(pick)
+                    if len(chosen) == count:
+                        break
+        else:
+            if len(chosen) < count:
+                # Nearly all the weight is taken; finish with keys over the rest
+                rest = np.setdiff1d(np.arange(len(indices)), chosen)
+                weights = self.weights[indices[rest]]
+                keys = rng.exponential(size=len(rest)) / weights
+                chosen.extend(rest[np.argsort(keys)[:count - len(chosen)]].tolist())
+        return indices[np.asarray(chosen, dtype=np.int64)]
+
+    def sample(self, age: int, k: Optional[int] = None, seed: SeedLike = None,
+               quotas: Optional[Mapping] = None, stratify_by: Optional[str] = None) -> np.ndarray:
+        """Question ids for one form; order is draw order (shuffled across strata)"""
+        rng = _rng(seed)
+        plan = self._plan(age, k, quotas, stratify_by)
+        picked = np.concatenate([
+            self._draw(indices, cumulative, count, rng) for indices, cumulative, count in plan
+        ]) if plan else np.empty(0, dtype=np.int64)
+        if len(plan) > 1:
+            picked = rng.permutation(picked)
+        return self.ids[picked]
+
+    def generate_forms(self, age: int, k: Optional[int] = None, n_forms: int = 1,
+                       seed: SeedLike = None, quotas: Optional[Mapping] = None,
+                       stratify_by: Optional[str] = None) -> np.ndarray:
+        """(n_forms, k) matrix of question ids, each row an independent form"""
+        rng = _rng(seed)
+        plan = self._plan(age, k, quotas, stratify_by)
+        columns = []
+        for indices, _, count in plan:
+            if count == 0:
+                continue
+            keys = rng.exponential(size=(n_forms, len(indices))) / self.weights[indices]
+            smallest = np.argpartition(keys, count - 1, axis=1)[:, :count]
+            # Order each form's picks by key: the order successive sampling would draw them in
+            order = np.argsort(np.take_along_axis(keys, smallest, axis=1), axis=1)
+            columns.append(indices[np.take_along_axis(smallest, order, axis=1)])
+        if not columns:
+            return np.empty((n_forms, 0), dtype=np.int64)
+        forms = np.concatenate(columns, axis=1)
+        if len(columns) > 1:
+            forms = rng.permuted(forms, axis=1)
+        return self.ids[forms]
+
+
+_sampler: Optional[Tuple[Tuple[str, int], QuestionSampler]] = None
+_sampler_lock = threading.Lock()
+
+
+def get_question_sampler() -> QuestionSampler:
+    """Sampler for the current question bank version, rebuilt when the bank changes"""
+    global _sampler
+    from app.questions import _cache_scope
+
+    scope = _cache_scope()
+    entry = _sampler
+    if scope is not None and entry is not None and entry[0] == scope:
+        return entry[1]
+    sampler = QuestionSampler.from_db()
+    if scope is not None:
+        with _sampler_lock:
+            _sampler = (scope, sampler)
+    return sampler
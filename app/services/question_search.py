@@ -0,0 +1,271 @@
+"""
+Ranked full-text search over the question bank.
+
+Queries are a list of terms, all of which must match:
+
+    word        the token itself
+    word*       any token starting with "word"
+    "a b c"     the tokens in sequence
+
+Hits are ranked by FTS5's bm25() (lower score is better) and carry a
+snippet of the question text with the matches wrapped in HIGHLIGHT_OPEN /
+HIGHLIGHT_CLOSE. Pages are keyset paginated on (score, id): pass a page's
+next_cursor back as `after` for the next one.
+
+Queries run against the question_search FTS5 table (see
+models.create_question_search). SQLite builds without FTS5 fall back to
+unranked substring matching with LIKE (every score is 0, hits in id order).
+Result pages are cached against the question bank version, so an edit
+invalidates them at once.
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+HIGHLIGHT_OPEN = "["
+HIGHLIGHT_CLOSE = "]"
+ELLIPSIS = "…"
+SNIPPET_TOKENS = 12
+DEFAULT_LIMIT = 20
+RESULT_CACHE_SIZE = 256
+
+_TOKEN_RE = re.compile(r"\w+")
+_QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+class SearchHit(NamedTuple):
+    id: int
+    question_text: str
+    snippet: str
+    score: float
+    category_id: Optional[int]
+    difficulty: Optional[int]
+    min_age: Optional[int]
+    max_age: Optional[int]
+    is_active: int
+
+
+class SearchPage(NamedTuple):
+    hits: List[SearchHit]
+    # (score, id) of the last hit when more may follow, else None
+    next_cursor: Optional[Tuple[float, int]]
+
+
+class Term(NamedTuple):
+    tokens: Tuple[str, ...]
+    prefix: bool
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens, close to FTS5's unicode61 tokenizer"""
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def parse_query(query: str) -> List[Term]:
+    """Split a query into terms; punctuation outside tokens is ignored"""
+    terms = []
+    for phrase, word in _QUERY_RE.findall(query or ""):
+        if phrase:
+            tokens = tokenize(phrase)
+            if tokens:
+                terms.append(Term(tuple(tokens), False))
+            continue
+        prefix = word.endswith("*")
+        tokens = tokenize(word)
+        if not tokens:
+            continue
+        # "don't" is two tokens: search it as a phrase, the last one as prefix
+        terms.append(Term(tuple(tokens), prefix))
+    return terms
+
+
+def fts_expression(terms: Sequence[Term]) -> str:
+    """FTS5 MATCH expression for parsed terms; every token is quoted"""
+    parts = []
+    for term in terms:
+        part = '"' + " ".join(term.tokens) + '"'
+        parts.append(part + " *" if term.prefix else part)
+    return " AND ".join(parts)
+
+
+def _snippet(text: str, terms: Sequence[Term]) -> str:
+    """Up to SNIPPET_TOKENS tokens around the first match, matches highlighted"""
+    exact = {token for term in terms for token in (term.tokens if not term.prefix else term.tokens[:-1])}
+    prefixes = tuple(term.tokens[-1] for term in terms if term.prefix)
+    spans = [m.span() for m in _TOKEN_RE.finditer(text)]
+    if not spans:
+        return text
+    hits = [
+        i for i, (start, end) in enumerate(spans)
+        if text[start:end].lower() in exact or (prefixes and text[start:end].lower().startswith(prefixes))
+    ]
+    first = max(0, (hits[0] if hits else 0) - 2)
+    last = min(len(spans), first + SNIPPET_TOKENS)
+    first = max(0, last - SNIPPET_TOKENS)
+
+    hit_set = set(hits)
+    out = [ELLIPSIS] if first > 0 else []
+    cursor = spans[first][0]
+    for i in range(first, last):
+        start, end = spans[i]
+        out.append(text[cursor:start])
+        word = text[start:end]
+        out.append(f"{HIGHLIGHT_OPEN}{word}{HIGHLIGHT_CLOSE}" if i in hit_set else word)
+        cursor = end
+    if last < len(spans):
+        out.append(ELLIPSIS)
+    else:
+        out.append(text[cursor:])
+    return "".join(out)
+
+
+# ---------------- search ----------------
+
+_results: "OrderedDict[Tuple, SearchPage]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def fts_available(conn) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'question_search'"
+    ).fetchone()
+    return row is not None
+
+
+def _category_ids(conn, category: Union[None, int, str]) -> Optional[Tuple[int, ...]]:
+    """Category filter as ids; a name matches case-insensitively"""
+    if category is None:
+        return None
+    if isinstance(category, int):
+        return (category,)
+    rows = conn.execute(
+        "SELECT id FROM question_category WHERE lower(name) = lower(?)", (category,)
+    ).fetchall()
+    return tuple(sorted(r[0] for r in rows))
+
+
+def _filters(category_ids, age_band, include_inactive) -> Tuple[List[str], List]:
+    """WHERE clauses (over question_bank q) and parameters for the search filters"""
+    where, params = [], []
+    if not include_inactive:
+        where.append("q.is_active = 1")
+    if category_ids is not None:
+        where.append(f"q.category_id IN ({','.join('?' * len(category_ids)) or 'NULL'})")
+        params.extend(category_ids)
+    if age_band is not None:
+        where.append("COALESCE(q.min_age, 0) <= ? AND COALESCE(q.max_age, 120) >= ?")
+        params.extend([age_band[1], age_band[0]])
+    return where, params
+
+
+def _page_sql(sql, params, after, limit) -> Tuple[str, List]:
+    """Keyset page on (score, id) over a query with score and id columns"""
+    # Wrapped so the cursor and order see plain columns, not bm25() calls;
+    # LIMIT -1 keeps SQLite from flattening it back
+    sql = f"SELECT * FROM ({sql} LIMIT -1)"
+    params = list(params)
+    if after is not None:
+        sql += " WHERE score > ? OR (score = ? AND id > ?)"
+        params.extend([after[0], after[0], after[1]])
+    sql += " ORDER BY score, id LIMIT ?"
+    params.append(limit)
+    return sql, params
+
+
+def _search_fts(conn, terms, category_ids, age_band, include_inactive, after, limit) -> List[SearchHit]:
+    where, params = _filters(category_ids, age_band, include_inactive)
+    sql = f"""
+        SELECT q.id, q.question_text,
+               snippet(question_search, 0, ?, ?, ?, {SNIPPET_TOKENS}),
+               bm25(question_search) AS score,
+               q.category_id, q.difficulty, q.min_age, q.max_age, q.is_active
+        FROM question_search JOIN question_bank q ON q.id = question_search.rowid
+        WHERE {' AND '.join(["question_search MATCH ?"] + where)}
+    """
+    params = [HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE, ELLIPSIS, fts_expression(terms)] + params
+    sql, params = _page_sql(sql, params, after, limit)
+    return [SearchHit(*row) for row in conn.execute(sql, params).fetchall()]
+
+
+def _like_pattern(term: Term) -> str:
+    text = " ".join(term.tokens).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{text}%"
+
+
+def _search_like(conn, terms, category_ids, age_band, include_inactive, after, limit) -> List[SearchHit]:
+    """Fallback without FTS5: every term as a case-insensitive substring, unranked"""
+    where, params = _filters(category_ids, age_band, include_inactive)
+    where += ["lower(q.question_text) LIKE ? ESCAPE '\\'"] * len(terms)
+    params += [_like_pattern(term) for term in terms]
+    sql = f"""
+        SELECT q.id, q.question_text, 0.0 AS score,
+               q.category_id, q.difficulty, q.min_age, q.max_age, q.is_active
+        FROM question_bank q
+        WHERE {' AND '.join(where)}
+    """
+    sql, params = _page_sql(sql, params, after, limit)
+    return [
+        SearchHit(question_id, text, _snippet(text or "", terms), score, *rest)
+        for question_id, text, score, *rest in conn.execute(sql, params).fetchall()
+    ]
+
+
+def search_questions(query: str, category: Union[None, int, str] = None,
+                     age_band: Optional[Tuple[int, int]] = None, include_inactive: bool = False,
+                     after: Optional[Tuple[float, int]] = None,
+                     limit: int = DEFAULT_LIMIT) -> SearchPage:
+    """
+    One page of questions matching `query`, best first.
+
+    category: a category id or name. age_band: (low, high); questions whose
+    age range overlaps it. after: the previous page's next_cursor.
+    """
+    from app.questions import _cache_scope
+
+    terms = parse_query(query)
+    if not terms or limit <= 0:
+        return SearchPage([], None)
+
+    conn = db.get_connection()
+    try:
+        category_ids = _category_ids(conn, category)
+        scope = _cache_scope()
+        key = (scope, tuple(terms), category_ids, tuple(age_band) if age_band else None,
+               bool(include_inactive), tuple(after) if after else None, limit)
+        if scope is not None:
+            with _lock:
+                page = _results.get(key)
+                if page is not None:
+                    _results.move_to_end(key)
+                    return page
+
+        # One extra row tells whether another page follows
+        search = _search_fts if fts_available(conn) else _search_like
+        hits = search(conn, terms, category_ids, age_band, include_inactive, after, limit + 1)
+    finally:
+        conn.close()
+
+    more = len(hits) > limit
+    hits = hits[:limit]
+    page = SearchPage(hits, (hits[-1].score, hits[-1].id) if more else None)
+    if scope is not None:
+        with _lock:
+            if _results and next(iter(_results))[0] != scope:
+                # Another bank version: nothing cached can be served again
+                _results.clear()
+            _results[key] = page
+            while len(_results) > RESULT_CACHE_SIZE:
+                _results.popitem(last=False)
+    return page
+
+
+def clear_search_cache():
+    with _lock:
+        _results.clear()
@@ -0,0 +1,220 @@
+"""
+Question set shared between app instances on one machine.
+
+Instances running against the same database can keep one copy of the
+active question set in a multiprocessing.shared_memory segment instead of
+each loading its own. A segment holds one question snapshot (the
+question_snapshot layout) and is named after the database and the
+question_bank version, so a new version is simply a new segment:
+
+    attach      open the segment for the current version and wrap it
+                read-only, no copy and no database access
+    publish     when it is missing, the instance that wins the writer
+                lock (an flock on a file next to the disk snapshot) loads
+                the set once and creates the segment; the others wait on
+                the lock and then attach what it wrote
+
+The writer unlinks the previous version's segment once the new one is in
+place; instances still mapped to it keep their mapping until they move on.
+Segments outlive the instance that created them (they are not left to the
+resource tracker), so a restarting instance attaches instead of loading.
+
+Needs fcntl (POSIX). Enabled with database.shared_question_cache.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.services.question_snapshot import Snapshot, SnapshotError, encode_snapshot, load_snapshot, snapshot_size
+
+try:
+    import fcntl
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "ssq"
+# Segments this instance keeps open: the current version and the one before
+KEEP_ATTACHED = 2
+
+_attached: Dict[str, "shared_memory.SharedMemory"] = {}
+# Dropped segments whose mapping a question set still uses; closed once it is free
+_retired: List["shared_memory.SharedMemory"] = []
+_attached_lock = threading.Lock()
+
+
+if fcntl is not None:
+    class _Segment(shared_memory.SharedMemory):
+        """Attached segment; at exit its question set may still map it, which is fine"""
+
+        def __del__(self):
+            try:
+                self.close()
+            except BufferError:
+                pass
+
+
+def available() -> bool:
+    return fcntl is not None
+
+
+def _database_key(database: str) -> str:
+    return hashlib.sha1(database.encode("utf-8")).hexdigest()[:16]
+
+
+def segment_name(scope: Tuple[str, int]) -> str:
+    """Segment for one (database, version); short enough for macOS's 31-character limit"""
+    database, version = scope
+    return f"{SEGMENT_PREFIX}_{_database_key(database)}_{version}"
+
+
+def _untrack(segment):
+    # The resource tracker would unlink the segment when this process exits,
+    # pulling it from under the other instances
+    try:
+        resource_tracker.unregister(segment._name, "shared_memory")
+    except Exception:
+        pass
+
+
+def _close(segment) -> bool:
+    try:
+        segment.close()
+        return True
+    except BufferError:
+        return False
+
+
+def _retire(segment):
+    """Close `segment` now, or later once nothing maps it (caller holds _attached_lock)"""
+    if not _close(segment):
+        _retired.append(segment)
+
+
+def _keep(name: str, segment):
+    with _attached_lock:
+        _attached[name] = segment
+        while len(_attached) > KEEP_ATTACHED:
+            _retire(_attached.pop(next(iter(_attached))))
+        _retired[:] = [old for old in _retired if not _close(old)]
+
+
+def detach_all():
+    """Drop every attached segment (they stay published for other instances)"""
+    with _attached_lock:
+        for segment in _attached.values():
+            _retire(segment)
+        _attached.clear()
+
+
+def _load(segment) -> Snapshot:
+    buffer = segment.buf.toreadonly()
+    # Segments can be rounded up to whole pages; the header gives the real size
+    return load_snapshot(buffer[:snapshot_size(buffer)])
+
+
+def attach(scope: Tuple[str, int]) -> Optional[Snapshot]:
+    """The published snapshot for `scope`, or None if there is none (yet)"""
+    name = segment_name(scope)
+    with _attached_lock:
+        segment = _attached.get(name)
+    if segment is None:
+        try:
+            segment = _Segment(name=name)
+        except FileNotFoundError:
+            return None
+        _untrack(segment)
+
+    try:
+        snapshot = _load(segment)
+    except SnapshotError:
+        # Created but not filled yet: the writer still holds the lock
+        snapshot = None
+    if snapshot is None or (snapshot.database, snapshot.version) != tuple(scope):
+        snapshot = None
+        with _attached_lock:
+            if _attached.get(name) is not segment:
+                _retire(segment)
+        return None
+    _keep(name, segment)
+    return snapshot
+
+
+@contextmanager
+def _writer_lock(database: str, lock_dir: str):
+    """Exclusive lock electing the one instance that publishes; yields the lock file"""
+    os.makedirs(lock_dir, exist_ok=True)
+    path = os.path.join(lock_dir, f"questions-{_database_key(database)}.shm.lock")
+    with open(path, "a+") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield f
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def publish(scope: Tuple[str, int], questions: Sequence[Tuple], lock_file=None):
+    """Create the segment for `scope`; the caller holds the writer lock"""
+    data = encode_snapshot(questions, *scope)
+    name = segment_name(scope)
+    try:
+        segment = shared_memory.SharedMemory(name=name, create=True, size=len(data))
+    except FileExistsError:
+        # Left behind by a writer that died mid-way; replace it
+        stale = shared_memory.SharedMemory(name=name)
+        stale.close()
+        stale.unlink()
+        segment = shared_memory.SharedMemory(name=name, create=True, size=len(data))
+    _untrack(segment)
+    segment.buf[:len(data)] = data
+    segment.close()
+
+    if lock_file is not None:
+        # The lock file names the live segment; drop the one it replaces
+        lock_file.seek(0)
+        previous = lock_file.read().strip()
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(name)
+        lock_file.flush()
+        if previous and previous != name:
+            unlink(previous)
+    logger.info(f"Published {len(questions)} questions to shared memory ({name}, {len(data)} bytes)")
+
+
+def unlink(name: str):
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    # Left tracked: unlink() unregisters it
+    segment.close()
+    segment.unlink()
+
+
+def shared_snapshot(scope: Tuple[str, int], load: Callable[[], Sequence[Tuple]],
+                    lock_dir: str) -> Optional[Snapshot]:
+    """
+    Attach the question set for `scope`, publishing it first (with `load`)
+    if this instance wins the writer election. None if sharing fails.
+    """
+    snapshot = attach(scope)
+    if snapshot is not None:
+        return snapshot
+    try:
+        with _writer_lock(scope[0], lock_dir) as lock_file:
+            # Another instance may have published while we waited
+            snapshot = attach(scope)
+            if snapshot is None:
+                publish(scope, load(), lock_file)
+                snapshot = attach(scope)
+        return snapshot
+    except OSError as e:
+        logger.warning(f"Shared question cache unavailable: {e}")
+        return None
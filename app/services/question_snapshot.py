@@ -0,0 +1,267 @@
+"""
+Binary snapshot of the active question set.
+
+Layout (little-endian):
+
+    header      magic "SSQS", format, database path length, question_bank
+                version, question count, string table size, CRC32 of
+                everything after the header
+    database    UTF-8 path of the database the snapshot was taken from
+    records     one RECORD_DTYPE entry per question, in id order
+    strings     question texts and tooltips as one UTF-8 string table;
+                records address it by (offset, length) in bytes
+
+Snapshots are written to a temp file, checked against their CRC once and
+moved into place with os.replace, so readers see either the old file or the
+new one. read_snapshot() maps the file and wraps the records with
+np.frombuffer; a row's strings are sliced out of the table and decoded only
+when that row is asked for, so a read touches the pages it needs. Loads
+check the header and size; pass verify=True to check the CRC as well.
+load_snapshot() does the same over any buffer, such as a shared memory
+segment (see question_shm).
+
+A mapped file cannot be replaced or removed on Windows, so Snapshot.close()
+decodes what is left into memory and unmaps the file before either.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SSQS"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<4sHHqIII")
+
+# Stored in place of a NULL age bound or tooltip
+NULL_AGE = int(np.iinfo(np.int32).min)
+NULL_LENGTH = 0xFFFFFFFF
+
+RECORD_DTYPE = np.dtype([
+    ("id", "<i4"),
+    ("min_age", "<i4"),
+    ("max_age", "<i4"),
+    ("text_offset", "<u4"),
+    ("text_length", "<u4"),
+    ("tooltip_offset", "<u4"),
+    ("tooltip_length", "<u4"),
+])
+
+
+class SnapshotError(ValueError):
+    """The file is not a readable snapshot (truncated, corrupt, other format)"""
+
+
+def encode_snapshot(questions: Sequence[Tuple], database: str, version: int) -> bytes:
+    """Serialize (id, text, tooltip, min_age, max_age) rows in the snapshot layout"""
+    records = np.zeros(len(questions), dtype=RECORD_DTYPE)
+    strings = []
+    table_length = 0
+
+    def add_string(value):
+        nonlocal table_length
+        if value is None:
+            return 0, NULL_LENGTH
+        encoded = value.encode("utf-8")
+        offset = table_length
+        strings.append(encoded)
+        table_length += len(encoded)
+        return offset, len(encoded)
+
+    for i, (question_id, text, tooltip, min_age, max_age) in enumerate(questions):
+        text_offset, text_length = add_string(text)
+        tooltip_offset, tooltip_length = add_string(tooltip)
+        records[i] = (question_id,
+                      NULL_AGE if min_age is None else min_age,
+                      NULL_AGE if max_age is None else max_age,
+                      text_offset, text_length, tooltip_offset, tooltip_length)
+
+    database_bytes = database.encode("utf-8")
+    string_table = b"".join(strings)
+    body = database_bytes + records.tobytes() + string_table
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(database_bytes), version,
+                         len(questions), len(string_table), zlib.crc32(body))
+    return header + body
+
+
+def write_snapshot(path: str, questions: Sequence[Tuple], database: str, version: int):
+    """Atomically write (id, text, tooltip, min_age, max_age) rows to `path`"""
+    data = encode_snapshot(questions, database, version)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # Checked once here; readers only check the header and size
+        read_snapshot(tmp_path, verify=True).close()
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class SnapshotRows(Sequence):
+    """Question tuples over a mapped snapshot, decoded on access"""
+
+    def __init__(self, buffer, records: np.ndarray, strings_start: int):
+        self._buffer = buffer
+        self._records = records
+        self._strings_start = strings_start
+        # Rows decoded through indexing or pin(); take() serves them from here
+        self._rows: List[Optional[Tuple]] = [None] * len(records)
+        # Held while reading the buffer, so release() cannot unmap it mid-read
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def _string(self, offset, length):
+        if length == NULL_LENGTH:
+            return None
+        start = self._strings_start + offset
+        return str(self._buffer[start:start + length], "utf-8")
+
+    def _row(self, question_id, min_age, max_age, text_offset, text_length, tooltip_offset, tooltip_length):
+        return (question_id,
+                self._string(text_offset, text_length),
+                self._string(tooltip_offset, tooltip_length),
+                None if min_age == NULL_AGE else min_age,
+                None if max_age == NULL_AGE else max_age)
+
+    def take(self, indices: np.ndarray) -> List[Tuple]:
+        """
+        Rows at `indices`; resident (pinned) rows are served as they are,
+        the others decoded in one pass without being kept
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        rows = self._rows
+        selected = [rows[i] for i in indices.tolist()]
+        missing = [position for position, row in enumerate(selected) if row is None]
+        if missing:
+            with self._lock:
+                # Per-field int arrays convert to Python ints far faster than records do
+                records = self._records[indices[missing]]
+                columns = [records[name].tolist() for name in RECORD_DTYPE.names]
+                for position, fields in zip(missing, zip(*columns)):
+                    selected[position] = self._row(*fields)
+        return selected
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._records["id"]
+
+    def pin(self, indices: Sequence[int]):
+        """Decode the rows at `indices` now; they stay resident like any decoded row"""
+        for index in indices:
+            self[int(index)]
+
+    def release(self) -> np.ndarray:
+        """
+        Decode every row into memory and stop reading the buffer, so it can
+        be closed; returns the records, now in an array of their own
+        """
+        with self._lock:
+            if self._buffer is not None:
+                for index, row in enumerate(self._rows):
+                    if row is None:
+                        self._rows[index] = self._row(*self._records[index].tolist())
+                self._records = self._records.copy()
+                self._buffer = None
+        return self._records
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        row = self._rows[index]
+        if row is None:
+            with self._lock:
+                row = self._rows[index] = self._row(*self._records[index].tolist())
+        return row
+
+
+class Snapshot:
+    """A mapped snapshot: its scope, age bound arrays and lazily decoded rows"""
+
+    def __init__(self, database: str, version: int, records: np.ndarray, rows: SnapshotRows,
+                 mapping: Optional[mmap.mmap] = None):
+        self.database = database
+        self.version = version
+        self.records = records
+        self.rows = rows
+        # The file mapping, when read_snapshot() made one
+        self._mapping = mapping
+
+    @property
+    def min_age(self) -> np.ndarray:
+        return self.records["min_age"]
+
+    @property
+    def max_age(self) -> np.ndarray:
+        return self.records["max_age"]
+
+    def close(self):
+        """Keep the rows in memory and unmap the file, which can then be replaced or removed"""
+        self.records = self.rows.release()
+        if self._mapping is not None:
+            try:
+                self._mapping.close()
+            except BufferError:
+                # A view into it is still alive; the mapping goes with it
+                logger.debug("Question snapshot still referenced, left to be unmapped later")
+            self._mapping = None
+
+
+def snapshot_size(buffer) -> int:
+    """Total size of the snapshot starting at the front of `buffer`, from its header"""
+    if len(buffer) < HEADER.size:
+        raise SnapshotError("truncated header")
+    magic, format_version, database_length, _, count, strings_length, _ = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or format_version != FORMAT_VERSION:
+        raise SnapshotError("not a question snapshot of this format")
+    return HEADER.size + database_length + count * RECORD_DTYPE.itemsize + strings_length
+
+
+def load_snapshot(buffer, verify: bool = False) -> Snapshot:
+    """
+    Wrap a snapshot held in `buffer` (mmap, memoryview) without copying it;
+    raises SnapshotError if it is not exactly one snapshot (or, with
+    `verify`, its body does not match the CRC)
+    """
+    if len(buffer) != snapshot_size(buffer):
+        raise SnapshotError("size does not match header")
+    _, _, database_length, version, count, _, checksum = HEADER.unpack_from(buffer, 0)
+    if verify and zlib.crc32(memoryview(buffer)[HEADER.size:]) != checksum:
+        raise SnapshotError("checksum mismatch")
+
+    records_start = HEADER.size + database_length
+    strings_start = records_start + count * RECORD_DTYPE.itemsize
+    database = str(buffer[HEADER.size:records_start], "utf-8")
+    records = np.frombuffer(buffer, dtype=RECORD_DTYPE, count=count, offset=records_start)
+    return Snapshot(database, version, records, SnapshotRows(buffer, records, strings_start),
+                    buffer if isinstance(buffer, mmap.mmap) else None)
+
+
+def read_snapshot(path: str, verify: bool = False) -> Snapshot:
+    """
+    Map a snapshot file; raises OSError if missing, SnapshotError if
+    unreadable. close() the result before replacing or removing the file.
+    """
+    with open(path, "rb") as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            # Empty file
+            raise SnapshotError(str(e))
+    try:
+        return load_snapshot(buffer, verify)
+    except SnapshotError:
+        buffer.close()
+        raise
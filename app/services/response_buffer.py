@@ -0,0 +1,294 @@
+"""
+Write-behind buffer for exam responses.
+
+Answers are held in memory while the user moves through the exam and are
+appended to a small per-session journal file so a crash does not lose them.
+When the exam finishes, the answers (packed into one exam_sessions row, see
+app.services.exam_sessions) and the score row are written in a single
+transaction. Journals that were never flushed are replayed by
+recover_pending_sessions() on the next startup.
+
+Several app instances may share one data directory. Each journal is named
+after its process and held under an exclusive flock while its session is
+open, so recovery skips journals that a live instance is still writing.
+Without fcntl (Windows) journals are not locked and recovery assumes it is
+the only instance.
+"""
+
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.config import DATA_DIR
+from app.db import get_connection
+from app.services.access_counts import record_access
+from app.services.exam_sessions import INSERT_SESSION_SQL, session_row
+from app.services.maintenance import note_write_activity, write_activity
+from app.services.users import resolve_user_id
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+PENDING_DIR = os.path.join(DATA_DIR, "pending_sessions")
+JOURNAL_SUFFIX = ".jsonl"
+
+INSERT_SCORE_SQL = """
+    INSERT INTO scores
+    (username, age, total_score, sentiment_score, reflection_text, timestamp, user_id, session_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _try_lock(journal) -> bool:
+    """Exclusive, non-blocking flock on an open journal; False if another session holds it"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _still_linked(journal, path: str) -> bool:
+    """True if `path` still names the file open as `journal` (not removed or replaced)"""
+    try:
+        return os.path.samestat(os.fstat(journal.fileno()), os.stat(path))
+    except OSError:
+        return False
+
+
+def _ensure_pending_dir(pending_dir: str):
+    if not os.path.exists(pending_dir):
+        try:
+            os.makedirs(pending_dir)
+        except OSError as e:
+            logger.error(f"Failed to create pending session dir: {e}")
+
+
+class ExamSessionBuffer:
+    """Buffers one exam attempt and flushes it in a single transaction."""
+
+    def __init__(self, username, age, age_group, pending_dir: str = PENDING_DIR):
+        self.username = username
+        self.age = age
+        self.age_group = age_group
+        self.user_id = resolve_user_id(username)
+        self.session_key = uuid.uuid4().hex
+        self.started_at = datetime.utcnow().isoformat()
+        self.pending_dir = pending_dir
+        self.journal_path = os.path.join(pending_dir, f"{os.getpid()}-{self.session_key}{JOURNAL_SUFFIX}")
+        self.flushed = False
+        # exam_sessions.id once committed
+        self.session_id: Optional[int] = None
+        # question_id -> (response_value, timestamp); re-answering replaces the entry
+        self._answers: Dict[int, tuple] = {}
+        self._journal = None
+
+    # ---------------- journal ----------------
+
+    def _write_journal(self, record: Dict):
+        """Append one record to the crash-recovery journal"""
+        try:
+            if self._journal is None:
+                _ensure_pending_dir(self.pending_dir)
+                # Locked and given its header under a name recovery ignores,
+                # then renamed into place (the lock moves with the file)
+                staging_path = self.journal_path + ".new"
+                journal = open(staging_path, "a", encoding="utf-8")
+                _try_lock(journal)
+                journal.write(json.dumps({
+                    "type": "session",
+                    "username": self.username,
+                    "age": self.age,
+                    "age_group": self.age_group,
+                    "started_at": self.started_at,
+                }) + "\n")
+                journal.flush()
+                os.replace(staging_path, self.journal_path)
+                self._journal = journal
+            self._journal.write(json.dumps(record) + "\n")
+            # flush() survives an application crash without paying for an fsync per click
+            self._journal.flush()
+        except OSError as e:
+            logger.error(f"Failed to write session journal: {e}")
+
+    def _close_journal(self, remove: bool):
+        # Removed before the lock is released, so recovery cannot replay a
+        # session that was just written
+        if remove and os.path.exists(self.journal_path):
+            try:
+                os.remove(self.journal_path)
+            except OSError as e:
+                logger.error(f"Failed to remove session journal: {e}")
+        if self._journal is not None:
+            try:
+                self._journal.close()
+            except OSError:
+                pass
+            self._journal = None
+
+    # ---------------- public API ----------------
+
+    def record_answer(self, question_id: int, value: int):
+        """Keep an answer in memory and journal it"""
+        ts = datetime.utcnow().isoformat()
+        self._answers[question_id] = (value, ts)
+        note_write_activity()
+        self._write_journal({"type": "answer", "question_id": question_id,
+                             "value": value, "timestamp": ts})
+
+    @property
+    def answer_count(self) -> int:
+        return len(self._answers)
+
+    def session_row(self, timestamp: str) -> tuple:
+        """exam_sessions row for the buffered answers"""
+        answers = [(qid, value) for qid, (value, _) in sorted(self._answers.items())]
+        return session_row(self.username, self.age_group, None, timestamp, answers, self.user_id)
+
+    def commit(self, total_score, sentiment_score=0.0, reflection_text="") -> bool:
+        """
+        Write all buffered responses and the score row in one transaction.
+        Returns True on success; on failure the journal is kept for recovery.
+        """
+        if self.flushed:
+            return True
+
+        score_row = (self.username, self.age, total_score, sentiment_score,
+                     reflection_text, datetime.utcnow().isoformat(), self.user_id)
+        # Record the outcome first so recovery can write the score too
+        self._write_journal({"type": "finish", "total_score": total_score,
+                             "sentiment_score": sentiment_score,
+                             "reflection_text": reflection_text,
+                             "timestamp": score_row[5]})
+
+        session_id = _write_session(self.session_row(score_row[5]), score_row)
+        if session_id is None:
+            self._close_journal(remove=False)
+            return False
+
+        self.session_id = session_id
+        self.flushed = True
+        record_access(self._answers)
+        self._close_journal(remove=True)
+        return True
+
+    def discard(self):
+        """Drop an abandoned attempt without writing anything"""
+        self._answers.clear()
+        self._close_journal(remove=True)
+
+
+def _write_session(packed_row: tuple, score_row: Optional[tuple]) -> Optional[int]:
+    """
+    Insert one session's answers and score atomically, the score linked to
+    the session. Returns the new exam_sessions id, or None on failure.
+    """
+    conn = None
+    try:
+        with write_activity():
+            conn = get_connection()
+            cursor = conn.cursor()
+            cursor.execute(INSERT_SESSION_SQL, packed_row)
+            session_id = cursor.lastrowid
+            if score_row is not None:
+                cursor.execute(INSERT_SCORE_SQL, score_row + (session_id,))
+            conn.commit()
+        return session_id
+    except Exception:
+        if conn is not None:
+            conn.rollback()
+        logger.error("Failed to flush exam session", exc_info=True)
+        return None
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def _read_journal(journal):
+    """Parse an open journal into (header, answers, finish); tolerates a torn last line"""
+    header, finish = None, None
+    answers: Dict[int, tuple] = {}
+    for line in journal:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        kind = record.get("type")
+        if kind == "session":
+            header = record
+        elif kind == "answer":
+            answers[int(record["question_id"])] = (record["value"], record["timestamp"])
+        elif kind == "finish":
+            finish = record
+    return header, answers, finish
+
+
+def recover_pending_sessions(pending_dir: str = PENDING_DIR) -> int:
+    """
+    Replay journals left behind by sessions that never flushed.
+    Answered questions are always restored; the score row only when the
+    session had reached finish_test. Journals still locked by a running
+    instance are left alone. Returns the number of sessions replayed.
+    """
+    if not os.path.isdir(pending_dir):
+        return 0
+
+    recovered = 0
+    for name in sorted(os.listdir(pending_dir)):
+        if not name.endswith(JOURNAL_SUFFIX):
+            continue
+        path = os.path.join(pending_dir, name)
+        try:
+            journal = open(path, "r", encoding="utf-8")
+        except OSError:
+            # Flushed and removed by its owner since listdir
+            continue
+        with journal:
+            if not _try_lock(journal) or not _still_linked(journal, path):
+                continue
+            if _replay_journal(journal, path, name):
+                recovered += 1
+    return recovered
+
+
+def _replay_journal(journal, path: str, name: str) -> bool:
+    """Write one locked journal's session and remove the journal"""
+    try:
+        header, answers, finish = _read_journal(journal)
+    except OSError as e:
+        logger.error(f"Failed to read session journal {name}: {e}")
+        return False
+
+    if header is None or (not answers and finish is None):
+        os.remove(path)
+        return False
+
+    username, age_group = header.get("username"), header.get("age_group")
+    user_id = resolve_user_id(username)
+    # Unfinished sessions are stamped with their last answer
+    packed_row = session_row(
+        username, age_group, None,
+        finish["timestamp"] if finish is not None else max(ts for _, ts in answers.values()),
+        [(qid, value) for qid, (value, _) in sorted(answers.items())],
+        user_id
+    )
+    score_row = None
+    if finish is not None:
+        score_row = (username, header.get("age"), finish["total_score"],
+                     finish.get("sentiment_score", 0.0),
+                     finish.get("reflection_text", ""), finish["timestamp"], user_id)
+
+    if _write_session(packed_row, score_row) is None:
+        return False
+    os.remove(path)
+    logger.info(f"Recovered exam session {name} ({len(answers)} responses)")
+    return True
@@ -0,0 +1,261 @@
+"""
+Get-or-compute cache for aggregate statistics.
+
+Values are kept in two tiers: a process-local dict (L1) in front of the
+statistics_cache table (L2), which survives restarts. An entry is served
+while its valid_until is in the future and none of the tables it depends on
+have been written since it was computed; writes are counted per table in
+data_versions by triggers, so raw sqlite3 writers invalidate entries too.
+An L1 hit re-reads those versions at most once per VERSION_CHECK_INTERVAL,
+or sooner after a session in this process commits, so hits normally cost no
+database round trip. Concurrent callers asking for the same missing stat
+share one computation.
+"""
+
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from sqlalchemy import event, func, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.db import get_session
+from app.models import APPEND_TABLES, DataVersion, StatisticsCache, Score, User
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 3600  # seconds
+# How long an L1 entry is served before its table versions are read again
+VERSION_CHECK_INTERVAL = 5.0  # seconds
+
+_MISS = object()
+
+# name -> {"value", "valid_until", "depends_on", "checked_at"}
+_l1: Dict[str, Dict] = {}
+_l1_lock = threading.Lock()
+# time.monotonic() of the last commit seen in this process
+_last_commit = 0.0
+# name -> lock held while that stat is being computed
+_compute_locks: Dict[str, threading.Lock] = {}
+
+
+def _lock_for(name: str) -> threading.Lock:
+    with _l1_lock:
+        lock = _compute_locks.get(name)
+        if lock is None:
+            lock = _compute_locks[name] = threading.Lock()
+        return lock
+
+
+@event.listens_for(Session, "after_commit")
+def _note_commit(session):
+    """Make L1 re-check versions after writes from this process"""
+    global _last_commit
+    if session.info.get("stats_cache"):
+        return
+    _last_commit = time.monotonic()
+
+
+def get_table_versions(tables: Iterable[str], session=None) -> Optional[Dict[str, Any]]:
+    """
+    Current write counters for `tables`, or None when they cannot be read
+    (e.g. a database that predates data_versions) and caching must be skipped.
+    APPEND_TABLES are versioned as [counter, MAX(rowid)] since appends to
+    them do not bump the counter.
+    """
+    tables = sorted(set(tables))
+    if not tables:
+        return {}
+
+    own_session = session is None
+    session = session or get_session()
+    try:
+        rows = session.query(DataVersion.table_name, DataVersion.version).filter(
+            DataVersion.table_name.in_(tables)
+        ).all()
+        last_rows = {
+            name: session.execute(text(f"SELECT COALESCE(MAX(rowid), 0) FROM {name}")).scalar()
+            for name in tables if name in APPEND_TABLES
+        }
+    except Exception as e:
+        logger.warning(f"Table versions unavailable, bypassing stats cache: {e}")
+        return None
+    finally:
+        if own_session:
+            session.close()
+
+    versions = {name: 0 for name in tables}
+    versions.update({name: version for name, version in rows})
+    for name, last_row in last_rows.items():
+        versions[name] = [versions[name], last_row]
+    return versions
+
+
+def _lookup(name: str, depends_on: tuple):
+    """Return a still-valid cached value from L1 or L2, else _MISS"""
+    now = datetime.utcnow()
+    entry = _l1.get(name)
+    if entry is not None and entry["valid_until"] <= now:
+        entry = None
+    if (entry is not None and entry["checked_at"] > _last_commit
+            and time.monotonic() - entry["checked_at"] < VERSION_CHECK_INTERVAL):
+        return entry["value"]
+
+    session = get_session()
+    try:
+        checked_at = time.monotonic()
+        versions = get_table_versions(depends_on, session)
+        if versions is None:
+            return _MISS
+
+        if entry is not None and entry["depends_on"] == versions:
+            entry["checked_at"] = checked_at
+            return entry["value"]
+
+        row = session.query(StatisticsCache).filter(
+            StatisticsCache.stat_name == name,
+            StatisticsCache.valid_until > now.isoformat()
+        ).first()
+        if row is None or not row.stat_json:
+            return _MISS
+
+        envelope = json.loads(row.stat_json)
+        if envelope.get("depends_on") != versions:
+            return _MISS
+
+        with _l1_lock:
+            _l1[name] = {
+                "value": envelope["value"],
+                "valid_until": datetime.fromisoformat(row.valid_until),
+                "depends_on": versions,
+                "checked_at": checked_at,
+            }
+        return envelope["value"]
+    except Exception as e:
+        logger.warning(f"Stats cache lookup failed for {name}: {e}")
+        return _MISS
+    finally:
+        session.close()
+
+
+def _store(name: str, value: Any, ttl: int, versions: Dict[str, Any], checked_at: float):
+    """Write a freshly computed value to both tiers"""
+    now = datetime.utcnow()
+    valid_until = now + timedelta(seconds=ttl)
+
+    with _l1_lock:
+        _l1[name] = {"value": value, "valid_until": valid_until,
+                     "depends_on": versions, "checked_at": checked_at}
+
+    values = {
+        "stat_name": name,
+        "stat_value": float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None,
+        "stat_json": json.dumps({"value": value, "depends_on": versions}),
+        "calculated_at": now.isoformat(),
+        "valid_until": valid_until.isoformat(),
+    }
+    stmt = sqlite_insert(StatisticsCache).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[StatisticsCache.stat_name],
+        set_={k: v for k, v in values.items() if k != "stat_name"},
+    )
+
+    session = get_session()
+    session.info["stats_cache"] = True
+    try:
+        session.execute(stmt)
+        session.commit()
+    except Exception as e:
+        # The value is still served from L1; L2 catches up on the next compute
+        session.rollback()
+        logger.warning(f"Failed to persist stat {name}: {e}")
+    finally:
+        session.close()
+
+
+def get_or_compute(name: str, fn: Callable[[], Any], ttl: int = DEFAULT_TTL,
+                   depends_on: Iterable[str] = ()) -> Any:
+    """
+    Return the cached value of `name`, calling `fn()` only when it is missing,
+    past its TTL, or one of the `depends_on` tables has been written since.
+
+    `fn` must return a JSON-serializable value. Exceptions from `fn`
+    propagate and nothing is cached.
+    """
+    depends_on = tuple(sorted(set(depends_on)))
+
+    value = _lookup(name, depends_on)
+    if value is not _MISS:
+        return value
+
+    with _lock_for(name):
+        # Another caller may have finished computing while we waited
+        value = _lookup(name, depends_on)
+        if value is not _MISS:
+            return value
+
+        # Snapshot versions before computing so a concurrent write invalidates the result
+        checked_at = time.monotonic()
+        versions = get_table_versions(depends_on)
+        value = fn()
+        if versions is not None:
+            _store(name, value, ttl, versions, checked_at)
+        return value
+
+
+def invalidate(name: Optional[str] = None):
+    """Drop one stat (or all of them) from both tiers"""
+    with _l1_lock:
+        if name is None:
+            _l1.clear()
+        else:
+            _l1.pop(name, None)
+
+    session = get_session()
+    try:
+        query = session.query(StatisticsCache)
+        if name is not None:
+            query = query.filter(StatisticsCache.stat_name == name)
+        query.delete()
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Failed to invalidate stats cache: {e}")
+    finally:
+        session.close()
+
+
+def clear_local_cache():
+    """Forget the process-local tier only"""
+    with _l1_lock:
+        _l1.clear()
+
+
+# ---------------- Common statistics ----------------
+
+def get_global_average_score() -> float:
+    """Mean total_score across every attempt"""
+    def compute():
+        session = get_session()
+        try:
+            return float(session.query(func.avg(Score.total_score)).scalar() or 0)
+        finally:
+            session.close()
+
+    return get_or_compute("avg_score_global", compute, depends_on=["scores"])
+
+
+def get_active_user_count() -> int:
+    """Number of registered users"""
+    def compute():
+        session = get_session()
+        try:
+            return session.query(func.count(User.id)).scalar() or 0
+        finally:
+            session.close()
+
+    return get_or_compute("active_users", compute, depends_on=["users"])
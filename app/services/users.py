@@ -0,0 +1,151 @@
+"""
+Username -> users.id resolution for per-user queries.
+
+Rows in scores, responses, exam_sessions and journal_entries carry the
+integer user_id of registered users, and the composite (user_id, time)
+indexes are what per-user reads should hit. Callers resolve a username
+once per request with resolve_user_id() and filter with user_filter()
+(ORM) or user_where() (raw SQL):
+
+    rows = session.query(Score).filter(user_filter(Score, username))
+
+Ids are cached per engine (ids belong to one database file). Only hits are
+cached: a name that is not registered yet may be registered later, and
+register_user links that user's earlier rows via link_user_rows(), so
+names without an id keep being filtered on the username column. Rows
+written under the name before it was linked (user_id IS NULL, e.g. a
+database that skipped the backfill) still match once an id exists.
+"""
+
+import logging
+import threading
+import weakref
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import and_, or_, text
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# Tables with a (username, user_id) pair kept in sync
+USER_KEYED_TABLES = ("scores", "responses", "exam_sessions", "journal_entries", "user_score_stats")
+# Names per IN (...) lookup; below SQLite's historical 999-variable limit
+IN_CHUNK = 900
+
+_cache_lock = threading.Lock()
+_user_ids: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _engine_cache() -> Dict[str, int]:
+    with _cache_lock:
+        return _user_ids.setdefault(db.engine, {})
+
+
+def resolve_user_id(username: Optional[str]) -> Optional[int]:
+    """users.id for a username, or None if it is not a registered user"""
+    if not username:
+        return None
+    cache = _engine_cache()
+    user_id = cache.get(username)
+    if user_id is not None:
+        return user_id
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
+        row = cursor.fetchone()
+    except Exception as e:
+        logger.warning(f"Could not resolve user id for {username}: {e}")
+        return None
+    finally:
+        conn.close()
+
+    if row is None:
+        return None
+    with _cache_lock:
+        cache[username] = row[0]
+    return row[0]
+
+
+def resolve_user_ids(usernames: Iterable[Optional[str]]) -> Dict[str, Optional[int]]:
+    """
+    resolve_user_id() for many names at once (bulk ingest): cached ids are
+    reused and the rest are looked up with one IN query per chunk of names.
+    """
+    names = {name for name in usernames if name}
+    cache = _engine_cache()
+    with _cache_lock:
+        resolved: Dict[str, Optional[int]] = {name: cache.get(name) for name in names}
+    missing = sorted(name for name, user_id in resolved.items() if user_id is None)
+    if not missing:
+        return resolved
+
+    found = {}
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        for start in range(0, len(missing), IN_CHUNK):
+            chunk = missing[start:start + IN_CHUNK]
+            cursor.execute(
+                f"SELECT id, username FROM users WHERE username IN ({','.join('?' * len(chunk))})", chunk
+            )
+            found.update((username, user_id) for user_id, username in cursor.fetchall())
+    except Exception as e:
+        logger.warning(f"Could not resolve user ids for {len(missing)} names: {e}")
+    finally:
+        conn.close()
+
+    with _cache_lock:
+        cache.update(found)
+    resolved.update(found)
+    return resolved
+
+
+def user_key(username: Optional[str], user_id: Optional[int] = None) -> Dict:
+    """The column identifying a user's rows: {"user_id": id} when registered, else {"username": name}"""
+    if user_id is None:
+        user_id = resolve_user_id(username)
+    return {"user_id": user_id} if user_id is not None else {"username": username}
+
+
+def user_filter(model, username: Optional[str], user_id: Optional[int] = None):
+    """
+    filter() clause selecting one user's rows of `model`: by id when
+    registered, plus rows still stored under the name without an id
+    """
+    key = user_key(username, user_id)
+    if "user_id" not in key:
+        return model.username == username
+    return or_(model.user_id == key["user_id"],
+               and_(model.user_id.is_(None), model.username == username))
+
+
+def user_where(username: Optional[str], user_id: Optional[int] = None, alias: str = ""):
+    """(SQL predicate, params) equivalent of user_filter() for raw queries"""
+    prefix = f"{alias}." if alias else ""
+    key = user_key(username, user_id)
+    if "user_id" not in key:
+        return f"{prefix}username = ?", (username,)
+    return (f"({prefix}user_id = ? OR ({prefix}user_id IS NULL AND {prefix}username = ?))",
+            (key["user_id"], username))
+
+
+def link_user_rows(session, user_id: int, username: str) -> int:
+    """Stamp user_id on rows written under `username` before it was registered"""
+    linked = 0
+    for table in USER_KEYED_TABLES:
+        result = session.execute(
+            text(f"UPDATE {table} SET user_id = :user_id WHERE username = :username AND user_id IS NULL"),
+            {"user_id": user_id, "username": username}
+        )
+        linked += max(result.rowcount, 0)
+    return linked
+
+
+def forget_user(username: str):
+    """Drop a cached id (user deleted or renamed)"""
+    with _cache_lock:
+        for cache in _user_ids.values():
+            cache.pop(username, None)
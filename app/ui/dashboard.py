@@ -20,6 +20,11 @@ from app.i18n_manager import get_i18n
 from app.models import Score, JournalEntry
 from app.db import get_session, get_connection
 from app.analysis.time_based_analysis import time_analyzer
+from app.analysis.score_stats import get_user_score_stats
+from app.services.users import resolve_user_id, user_filter, user_where
+
+# Attempts drawn on the EQ trend chart; summary labels cover the full history
+TREND_CHART_MAX_POINTS = 50
 
 # Import emotional profile clustering
 try:
@@ -39,6 +44,8 @@ class AnalyticsDashboard:
     def __init__(self, parent_root, username, colors=None, theme="light"):
         self.parent_root = parent_root
         self.username = username
+        # Resolved once; per-user queries below filter on the integer key
+        self.user_id = resolve_user_id(username)
         self.benchmarks = self.load_benchmarks()
         self.i18n = get_i18n()
         self.theme = theme
@@ -173,20 +180,21 @@ class AnalyticsDashboard:
             columns = [col[1] for col in cursor.fetchall()]
             
             # Build query based on available columns
+            user_clause, user_params = user_where(self.username, self.user_id)
             if 'timestamp' in columns:
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT total_score, timestamp 
                     FROM scores 
-                    WHERE username = ? 
+                    WHERE {user_clause} 
                     ORDER BY timestamp
-                """, (self.username,))
+                """, user_params)
             else:
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT total_score, id 
                     FROM scores 
-                    WHERE username = ? 
+                    WHERE {user_clause} 
                     ORDER BY id
-                """, (self.username,))
+                """, user_params)
             
             data = cursor.fetchall()
             conn.close()
@@ -353,28 +361,36 @@ class AnalyticsDashboard:
         # Configure parent
         parent.configure(style="TFrame")
         
+        # Summary figures come from the materialized aggregates; only the
+        # most recent attempts are fetched row by row for the chart
+        stats = get_user_score_stats(self.username)
+        
         conn = get_connection()
         cursor = conn.cursor()
         try:
-            cursor.execute("""
+            user_clause, user_params = user_where(self.username, self.user_id)
+            cursor.execute(f"""
             SELECT total_score, timestamp, id, sentiment_score 
             FROM scores 
-            WHERE username = ? 
-            ORDER BY id
-            """, (self.username,))
-            data = cursor.fetchall()
+            WHERE {user_clause} 
+            ORDER BY id DESC
+            LIMIT ?
+            """, user_params + (TREND_CHART_MAX_POINTS,))
+            data = cursor.fetchall()[::-1]
         except Exception as e:
             print(f"Error fetching EQ trends: {e}")
             data = []
         finally:
             conn.close()
         
-        if not data:
+        if not data or not stats:
             tk.Label(parent, text="No EQ data available", font=("Arial", 14), bg=bg_color, fg=text_primary).pack(pady=50)
             return
         
         scores = [row[0] for row in data]
         sentiment_scores = [row[3] if len(row) > 3 else None for row in data]
+        # Attempt number of the first charted point
+        first_attempt = stats["count"] - len(scores) + 1
         
         tk.Label(parent, text="📈 EQ Score Progress Over Time", 
                 font=("Segoe UI", 16, "bold"), bg=bg_color, fg=text_primary).pack(pady=(15, 10))
@@ -391,21 +407,21 @@ class AnalyticsDashboard:
         right_col = tk.Frame(stats_frame, bg=surface_color)
         right_col.pack(side=tk.LEFT, padx=30, pady=15, expand=True)
         
-        tk.Label(left_col, text=f"Total Attempts: {len(scores)}", 
+        tk.Label(left_col, text=f"Total Attempts: {stats['count']}", 
                 font=("Segoe UI", 11, "bold"), bg=surface_color, fg=text_primary).pack(anchor="w", pady=2)
-        tk.Label(left_col, text=f"Latest Score: {scores[-1]}", 
+        tk.Label(left_col, text=f"Latest Score: {stats['last_score']}", 
                 font=("Segoe UI", 11), bg=surface_color, fg=text_primary).pack(anchor="w", pady=2)
-        tk.Label(left_col, text=f"Best Score: {max(scores)}", 
+        tk.Label(left_col, text=f"Best Score: {stats['max']}", 
                 font=("Segoe UI", 11), bg=surface_color, fg="#22C55E").pack(anchor="w", pady=2)
         
-        tk.Label(right_col, text=f"First Score: {scores[0]}", 
+        tk.Label(right_col, text=f"First Score: {stats['first_score']}", 
                 font=("Segoe UI", 11), bg=surface_color, fg=text_primary).pack(anchor="w", pady=2)
-        tk.Label(right_col, text=f"Average Score: {sum(scores)/len(scores):.1f}", 
+        tk.Label(right_col, text=f"Average Score: {stats['mean']:.1f}", 
                 font=("Segoe UI", 11), bg=surface_color, fg=text_primary).pack(anchor="w", pady=2)
         
-        if len(scores) > 1:
-            improvement = scores[-1] - scores[0]
-            improvement_pct = (improvement / scores[0]) * 100 if scores[0] != 0 else 0
+        if stats["count"] > 1:
+            improvement = stats["last_score"] - stats["first_score"]
+            improvement_pct = (improvement / stats["first_score"]) * 100 if stats["first_score"] != 0 else 0
             color = "#22C55E" if improvement > 0 else "#EF4444" if improvement < 0 else "#3B82F6"
             symbol = "↑" if improvement > 0 else "↓" if improvement < 0 else "→"
             tk.Label(right_col, text=f"Progress: {symbol} {improvement:+d} ({improvement_pct:+.1f}%)", 
@@ -429,7 +445,8 @@ class AnalyticsDashboard:
         ax1.set_facecolor(plot_bg)
         
         # Plot EQ Score
-        l1, = ax1.plot(range(1, len(scores) + 1), scores, 
+        attempts = list(range(first_attempt, first_attempt + len(scores)))
+        l1, = ax1.plot(attempts, scores, 
                marker='o', linestyle='-', linewidth=2, markersize=8,
                color='#22C55E', markerfacecolor='#22C55E', 
                markeredgewidth=2, markeredgecolor='white', label="EQ Score")
@@ -440,7 +457,7 @@ class AnalyticsDashboard:
         ax1.tick_params(axis='x', colors=text_color)
         ax1.set_title('EQ Score & Emotional Sentiment Trends', fontsize=12, fontweight='bold', pad=15, color=text_color)
         ax1.grid(True, alpha=0.3, linestyle='--', color=grid_color)
-        ax1.set_xticks(range(1, len(scores) + 1))
+        ax1.set_xticks(attempts)
         
         for spine in ax1.spines.values():
             spine.set_color(grid_color)
@@ -450,7 +467,7 @@ class AnalyticsDashboard:
             ax2 = ax1.twinx()
             # Filter out Nones for plotting
             valid_indices = [i for i, s in enumerate(sentiment_scores) if s is not None]
-            valid_x = [i + 1 for i in valid_indices]
+            valid_x = [attempts[i] for i in valid_indices]
             valid_y = [sentiment_scores[i] for i in valid_indices]
             
             l2, = ax2.plot(valid_x, valid_y, 
@@ -656,12 +673,13 @@ class AnalyticsDashboard:
             return
         
         # Get journal data
-        cursor.execute("""
+        user_clause, user_params = user_where(self.username, self.user_id)
+        cursor.execute(f"""
             SELECT sentiment_score, emotional_patterns 
             FROM journal_entries 
-            WHERE username = ? 
+            WHERE {user_clause} 
             ORDER BY id
-        """, (self.username,))
+        """, user_params)
         rows = cursor.fetchall()
         conn.close()
         
@@ -909,24 +927,26 @@ class AnalyticsDashboard:
         
         session = get_session()
         try:
-            # EQ and Sentiment insights from SCORES table
-            eq_rows = session.query(Score.total_score, Score.sentiment_score)\
-                .filter_by(username=self.username)\
-                .order_by(Score.id)\
-                .all()
-            scores = [r[0] for r in eq_rows]
-            test_sentiments = [r[1] for r in eq_rows if r[1] is not None]
+            # EQ and Sentiment insights from the per-user aggregates plus the latest row
+            stats = get_user_score_stats(self.username, session=session)
+            latest_sentiment = session.query(Score.sentiment_score)\
+                .filter(user_filter(Score, self.username, self.user_id))\
+                .filter(Score.sentiment_score.isnot(None))\
+                .order_by(Score.id.desc())\
+                .limit(1)\
+                .scalar()
             
             # Journal insights purely from Journal entries
             j_rows = session.query(JournalEntry.sentiment_score)\
-                .filter_by(username=self.username)\
+                .filter(user_filter(JournalEntry, self.username, self.user_id))\
                 .all()
             journal_sentiments = [r[0] for r in j_rows]
         finally:
             session.close()
         
-        if len(scores) > 1:
-            improvement = ((scores[-1] - scores[0]) / scores[0]) * 100 if scores[0] != 0 else 0
+        if stats and stats["count"] > 1:
+            first_score, last_score = stats["first_score"], stats["last_score"]
+            improvement = ((last_score - first_score) / first_score) * 100 if first_score != 0 else 0
             if improvement > 10:
                 insights.append(f"📈 Great progress! Your EQ improved by {improvement:.1f}%")
             elif improvement > 0:
@@ -944,9 +964,8 @@ class AnalyticsDashboard:
                 insights.append("⚖️ You maintain balanced emotional tone in your reflections")
                 
         # Correlation Insight
-        if scores and test_sentiments:
-            latest_score = scores[-1]
-            latest_sentiment = test_sentiments[-1]
+        if stats and latest_sentiment is not None:
+            latest_score = stats["last_score"]
             
             if latest_score > 35 and latest_sentiment < -20:
                 insights.append("🎭 You have high EQ skills but are feeling down. Use your skills to navigate this emotions.")
@@ -6,9 +6,8 @@ Premium UI with modern question cards and progress tracking
 import tkinter as tk
 from tkinter import ttk, messagebox
 import logging
-from datetime import datetime
-from app.db import get_connection
 from app.utils import compute_age_group
+from app.services.response_buffer import ExamSessionBuffer
 
 
 class ExamManager:
@@ -18,6 +17,7 @@ class ExamManager:
         self.app = app
         self.root = app.root
         self.answer_var = tk.IntVar()
+        self.session_buffer = None
 
     def start_test(self):
         """Initialize test state and start the exam"""
@@ -28,7 +28,11 @@ class ExamManager:
         self.app.sentiment_score = 0.0
         self.app.reflection_text = ""
         
+        # Answers are buffered and written together when the exam finishes
+        if self.session_buffer is not None and not self.session_buffer.flushed:
+            self.session_buffer.discard()
         # User info should already be set by AuthManager
+        self.session_buffer = ExamSessionBuffer(self.app.username, self.app.age, self.app.age_group)
         self.show_question()
 
     def show_question(self):
@@ -281,25 +285,9 @@ class ExamManager:
         else:
             self.app.responses.append(ans)
         
-        # Save to database
-        conn = get_connection()
-        cursor = conn.cursor()
-        
+        # Buffer the answer; it is persisted with the score in finish_test
         qid = self.app.current_question + 1
-        ts = datetime.utcnow().isoformat()
-        
-        try:
-            cursor.execute(
-                """
-                INSERT INTO responses
-                (username, question_id, response_value, age_group, timestamp)
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                (self.app.username, qid, ans, self.app.age_group, ts)
-            )
-            conn.commit()
-        except Exception:
-            logging.error("Failed to store response", exc_info=True)
+        self.session_buffer.record_answer(qid, ans)
         
         self.app.current_question += 1
         self.show_question()
@@ -446,16 +434,10 @@ class ExamManager:
         self.app.current_max_score = len(self.app.responses) * 4
         self.app.current_percentage = (self.app.current_score / self.app.current_max_score) * 100 if self.app.current_max_score > 0 else 0
         
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute(
-                "INSERT INTO scores (username, age, total_score, sentiment_score, reflection_text, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
-                (self.app.username, self.app.age, self.app.current_score, self.app.sentiment_score, self.app.reflection_text, datetime.utcnow().isoformat())
-            )
-            conn.commit()
-        except Exception:
-            logging.error("Failed to store final score", exc_info=True)
+        # One transaction for all responses plus the score row, linked by session id
+        if not self.session_buffer.commit(
+            self.app.current_score, self.app.sentiment_score, self.app.reflection_text
+        ):
+            logging.error("Failed to store exam session; it will be recovered on next start")
         
         self.app.results.show_visual_results()
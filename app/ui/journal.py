@@ -10,6 +10,7 @@ from app.i18n_manager import get_i18n
 from sqlalchemy import desc
 from app.models import JournalEntry
 from app.db import get_session
+from app.services.users import resolve_user_id, user_filter
 
 try:
     from app.ui.dashboard import AnalyticsDashboard
@@ -25,7 +26,7 @@ class JournalFeature:
         self.parent_root = parent_root
 
         self.i18n = get_i18n()
-        # Database setup is handled efficiently by app.db.check_db_state or migration
+        # Database setup is handled efficiently by app.db.init_db or migration
 
         
         # Initialize VADER
@@ -164,6 +165,7 @@ class JournalFeature:
             entry_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             entry = JournalEntry(
                 username=self.username,
+                user_id=resolve_user_id(self.username),
                 entry_date=entry_date,
                 content=content,
                 sentiment_score=sentiment_score,
@@ -237,8 +239,8 @@ class JournalFeature:
         session = get_session()
         try:
             entries = session.query(JournalEntry)\
-                .filter_by(username=self.username)\
-                .order_by(desc(JournalEntry.entry_date))\
+                .filter(user_filter(JournalEntry, self.username))\
+                .order_by(desc(JournalEntry.entry_date_ms))\
                 .all()
             
             if not entries:
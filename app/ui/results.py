@@ -714,13 +714,17 @@ class ResultsManager:
 
     def show_ml_analysis(self):
         """Show AI-powered analysis in a popup window"""
-        if not self.app.ml_predictor:
+        predictor = self.app.ml_predictor
+        if not predictor or predictor.failed():
             messagebox.showerror("Error", "AI Model not loaded.")
             return
+        if not predictor.ready():
+            messagebox.showinfo("AI Insights", "The AI model is still loading. Please try again in a moment.")
+            return
             
         try:
             # 1. Get Prediction
-            result = self.app.ml_predictor.predict_with_explanation(
+            result = predictor.predict_with_explanation(
                 self.app.responses,
                 self.app.age,
                 self.app.current_score,
@@ -970,6 +974,7 @@ class ResultsManager:
                 """
             )
             users = cursor.fetchall()
+            conn.close()
             
             if not users:
                 self.app.create_widget(
@@ -1014,6 +1019,7 @@ class ResultsManager:
             return
         
         # If username is set, show that user's history
+        conn.close()
         self.display_user_history(self.app.username)
 
     def view_user_history(self, username):
@@ -1039,6 +1045,7 @@ class ResultsManager:
             (username,)
         )
         history = cursor.fetchall()
+        conn.close()
         
         # Header with back button
         header_frame = self.app.create_widget(tk.Frame, self.app.root)
@@ -1205,6 +1212,7 @@ class ResultsManager:
             (self.app.username,)
         )
         all_tests = cursor.fetchall()
+        conn.close()
         
         if len(all_tests) < 2:
             messagebox.showinfo("No Comparison", "You need at least 2 tests to compare.")
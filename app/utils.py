@@ -2,6 +2,7 @@
 import json
 import os
 import logging
+from datetime import datetime, timezone
 from app.config import DATA_DIR
 
 SETTINGS_FILE = os.path.join(DATA_DIR, "settings.json")
@@ -36,6 +37,41 @@ def save_settings(settings):
         logging.error("Failed to save settings", exc_info=True)
         return False
 
+def to_epoch_ms(value):
+    """
+    Convert a datetime or a stored timestamp string to UTC epoch milliseconds.
+
+    Accepts both formats found in the database: ISO strings from
+    ``datetime.isoformat()`` and ``"%Y-%m-%d %H:%M:%S"`` journal dates.
+    Naive values are treated as UTC, matching ``datetime.utcnow()`` writers.
+
+    Returns:
+        int or None if the value cannot be parsed
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip())
+        except ValueError:
+            try:
+                value = datetime.strptime(value.strip(), "%Y-%m-%d %H:%M:%S")
+            except ValueError:
+                return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(round(value.timestamp() * 1000))
+
+
+def from_epoch_ms(ms):
+    """Convert UTC epoch milliseconds back to a naive UTC datetime"""
+    if ms is None:
+        return None
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).replace(tzinfo=None)
+
+
 def compute_age_group(age):
     """
     Compute age group category based on age.
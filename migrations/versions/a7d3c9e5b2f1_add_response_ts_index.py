@@ -0,0 +1,27 @@
+"""Index responses.timestamp_ms for archival range scans
+
+Revision ID: a7d3c9e5b2f1
+Revises: f1c8d4b6a7e2
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3c9e5b2f1'
+down_revision: Union[str, Sequence[str], None] = 'f1c8d4b6a7e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE INDEX IF NOT EXISTS idx_response_ts_ms ON responses (timestamp_ms)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS idx_response_ts_ms")
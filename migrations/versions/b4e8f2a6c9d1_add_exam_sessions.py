@@ -0,0 +1,57 @@
+"""Add packed exam_sessions storage and row-per-answer views
+
+Revision ID: b4e8f2a6c9d1
+Revises: a7d3c9e5b2f1
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8f2a6c9d1'
+down_revision: Union[str, Sequence[str], None] = 'a7d3c9e5b2f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # View and trigger DDL is shared with the ORM create_all path
+    from app.models import create_epoch_ms_trigger, create_data_version_triggers, create_response_views
+
+    bind = op.get_bind()
+    if 'exam_sessions' not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            'exam_sessions',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('username', sa.String(), nullable=False),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+            sa.Column('age_group', sa.String(), nullable=True),
+            sa.Column('detailed_age_group', sa.String(), nullable=True),
+            sa.Column('timestamp', sa.String(), nullable=True),
+            sa.Column('timestamp_ms', sa.Integer(), nullable=True),
+            sa.Column('answer_count', sa.Integer(), nullable=False),
+            sa.Column('question_ids', sa.LargeBinary(), nullable=False),
+            sa.Column('response_values', sa.LargeBinary(), nullable=False),
+        )
+        op.create_index('idx_exam_session_username_ts_ms', 'exam_sessions', ['username', 'timestamp_ms'])
+        op.create_index('idx_exam_session_ts_ms', 'exam_sessions', ['timestamp_ms'])
+
+    create_epoch_ms_trigger(bind, 'exam_sessions', 'timestamp', 'timestamp_ms')
+    if 'data_versions' in sa.inspect(bind).get_table_names():
+        create_data_version_triggers(bind, ('exam_sessions',))
+    create_response_views(bind)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP VIEW IF EXISTS all_responses")
+    op.execute("DROP VIEW IF EXISTS exam_responses")
+    for suffix in ('ai', 'au', 'ad'):
+        op.execute(f"DROP TRIGGER IF EXISTS exam_sessions_version_{suffix}")
+    op.execute("DELETE FROM data_versions WHERE table_name = 'exam_sessions'")
+    op.drop_table('exam_sessions')
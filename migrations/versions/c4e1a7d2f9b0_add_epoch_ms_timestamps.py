@@ -0,0 +1,93 @@
+"""Add epoch millisecond timestamp columns
+
+Revision ID: c4e1a7d2f9b0
+Revises: b33b18452387
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e1a7d2f9b0'
+down_revision: Union[str, Sequence[str], None] = 'b33b18452387'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows updated per backfill statement; keeps each write transaction short
+BACKFILL_CHUNK = 5000
+
+# Mirrors app.models.EPOCH_MS_SQL (julianday parses both ISO and "%Y-%m-%d %H:%M:%S")
+EPOCH_MS_SQL = "CAST(ROUND((julianday({column}) - 2440587.5) * 86400000.0) AS INTEGER)"
+
+# table -> (source text column, epoch column, [(index name, columns)])
+EPOCH_COLUMNS = {
+    'scores': ('timestamp', 'timestamp_ms', [
+        ('idx_score_username_ts_ms', ['username', 'timestamp_ms']),
+        ('idx_score_user_ts_ms', ['user_id', 'timestamp_ms']),
+    ]),
+    'responses': ('timestamp', 'timestamp_ms', [
+        ('idx_response_username_ts_ms', ['username', 'timestamp_ms']),
+        ('idx_response_user_ts_ms', ['user_id', 'timestamp_ms']),
+    ]),
+    'journal_entries': ('entry_date', 'entry_date_ms', [
+        ('idx_journal_username_date_ms', ['username', 'entry_date_ms']),
+    ]),
+}
+
+
+def _backfill(bind, table, source, target):
+    """Populate the epoch column in bounded id ranges"""
+    low, high = bind.execute(sa.text(f"SELECT MIN(id), MAX(id) FROM {table}")).one()
+    if low is None:
+        return
+    expr = EPOCH_MS_SQL.format(column=source)
+    for start in range(low, high + 1, BACKFILL_CHUNK):
+        bind.execute(sa.text(
+            f"UPDATE {table} SET {target} = {expr} "
+            f"WHERE id >= :start AND id < :stop AND {target} IS NULL AND {source} IS NOT NULL"
+        ), {"start": start, "stop": start + BACKFILL_CHUNK})
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+
+    for table, (source, target, indexes) in EPOCH_COLUMNS.items():
+        if table not in tables:
+            continue
+
+        columns = [c['name'] for c in inspector.get_columns(table)]
+        if target not in columns:
+            op.add_column(table, sa.Column(target, sa.Integer(), nullable=True))
+
+        _backfill(bind, table, source, target)
+
+        existing = {ix['name'] for ix in inspector.get_indexes(table)}
+        for name, cols in indexes:
+            if name not in existing and all(c in columns + [target] for c in cols):
+                op.create_index(name, table, cols)
+
+        # Raw sqlite3 writers do not set the column; derive it on insert
+        op.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_{target}_ai AFTER INSERT ON {table}
+            WHEN new.{target} IS NULL AND new.{source} IS NOT NULL BEGIN
+                UPDATE {table} SET {target} = {EPOCH_MS_SQL.format(column='new.' + source)}
+                WHERE id = new.id;
+            END;
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, (source, target, indexes) in EPOCH_COLUMNS.items():
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_{target}_ai")
+        for name, _ in indexes:
+            op.execute(f"DROP INDEX IF EXISTS {name}")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column(target)
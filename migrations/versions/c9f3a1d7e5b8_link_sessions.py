@@ -0,0 +1,127 @@
+"""Link scores and responses to their exam session
+
+Revision ID: c9f3a1d7e5b8
+Revises: b4e8f2a6c9d1
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9f3a1d7e5b8'
+down_revision: Union[str, Sequence[str], None] = 'b4e8f2a6c9d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Mirrors app.models.EPOCH_MS_SQL
+EPOCH_MS_SQL = "CAST(ROUND((julianday({column}) - 2440587.5) * 86400000.0) AS INTEGER)"
+
+SESSION_INDEXES = {
+    'scores': 'idx_score_session',
+    'responses': 'idx_response_session',
+}
+
+
+def _backfill(bind):
+    """
+    Give every unlinked score a header exam_sessions row (answers stay in
+    `responses`) and attach the user's unlinked responses answered after
+    their previous score and no later than this one. Set-based: a handful
+    of statements regardless of how many scores there are.
+    """
+    for table in SESSION_INDEXES:
+        bind.execute(sa.text(
+            f"UPDATE {table} SET timestamp_ms = {EPOCH_MS_SQL.format(column='timestamp')} "
+            f"WHERE timestamp_ms IS NULL AND timestamp IS NOT NULL"
+        ))
+
+    # Session ids are assigned up front so scores and responses can be
+    # linked with joins instead of one INSERT/UPDATE round per score
+    bind.execute(sa.text("DROP TABLE IF EXISTS temp.score_sessions"))
+    bind.execute(sa.text("""
+        CREATE TEMP TABLE score_sessions AS
+        SELECT id AS score_id,
+               (SELECT COALESCE(MAX(id), 0) FROM exam_sessions)
+                   + ROW_NUMBER() OVER (ORDER BY username, timestamp_ms, id) AS session_id,
+               username, user_id, detailed_age_group, timestamp, timestamp_ms
+        FROM scores
+        WHERE session_id IS NULL AND username IS NOT NULL
+    """))
+    bind.execute(sa.text("CREATE UNIQUE INDEX temp.score_sessions_score ON score_sessions (score_id)"))
+    bind.execute(sa.text(
+        "CREATE INDEX temp.score_sessions_user_ts ON score_sessions (username, timestamp_ms, score_id)"
+    ))
+
+    bind.execute(sa.text("""
+        INSERT INTO exam_sessions
+        (id, username, user_id, detailed_age_group, timestamp, timestamp_ms,
+         answer_count, question_ids, response_values)
+        SELECT session_id, username, user_id, detailed_age_group, timestamp, timestamp_ms, 0, x'', x''
+        FROM score_sessions ORDER BY session_id
+    """))
+    bind.execute(sa.text("""
+        UPDATE scores SET session_id = (
+            SELECT m.session_id FROM score_sessions m WHERE m.score_id = scores.id
+        )
+        WHERE id IN (SELECT score_id FROM score_sessions)
+    """))
+    # The first of the user's timed scores at or after the answer owns it
+    bind.execute(sa.text("""
+        UPDATE responses SET session_id = (
+            SELECT m.session_id FROM score_sessions m
+            WHERE m.username = responses.username AND m.timestamp_ms >= responses.timestamp_ms
+            ORDER BY m.timestamp_ms, m.score_id
+            LIMIT 1
+        )
+        WHERE session_id IS NULL AND timestamp_ms IS NOT NULL AND username IS NOT NULL
+    """))
+    bind.execute(sa.text("DROP TABLE temp.score_sessions"))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from app.models import create_response_views
+
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table, index in SESSION_INDEXES.items():
+        columns = [c['name'] for c in inspector.get_columns(table)]
+        if 'session_id' not in columns:
+            # Plain ADD COLUMN keeps the table (and its triggers) in place
+            op.execute(f"ALTER TABLE {table} ADD COLUMN session_id INTEGER REFERENCES exam_sessions (id)")
+        if index not in {ix['name'] for ix in sa.inspect(bind).get_indexes(table)}:
+            op.create_index(index, table, ['session_id'])
+
+    _backfill(bind)
+    # all_responses now carries the legacy rows' session_id
+    create_response_views(bind)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    from app.models import (
+        EPOCH_MS_COLUMNS, create_epoch_ms_trigger, create_user_score_stats_triggers,
+        create_data_version_triggers, create_response_views
+    )
+
+    bind = op.get_bind()
+    # Batch mode rebuilds the tables: drop the view over them first and
+    # reinstall their triggers afterwards
+    op.execute("DROP VIEW IF EXISTS all_responses")
+    for table, index in SESSION_INDEXES.items():
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('session_id')
+    for table, source, column in EPOCH_MS_COLUMNS:
+        if table in SESSION_INDEXES:
+            create_epoch_ms_trigger(bind, table, source, column)
+    create_user_score_stats_triggers(bind)
+    create_data_version_triggers(bind, tuple(SESSION_INDEXES))
+
+    # Header rows created by the backfill
+    op.execute("DELETE FROM exam_sessions WHERE answer_count = 0")
+    create_response_views(bind)
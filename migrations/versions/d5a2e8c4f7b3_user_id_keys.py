@@ -0,0 +1,67 @@
+"""Key per-user rows by users.id
+
+Revision ID: d5a2e8c4f7b3
+Revises: c9f3a1d7e5b8
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a2e8c4f7b3'
+down_revision: Union[str, Sequence[str], None] = 'c9f3a1d7e5b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Mirrors app.services.users.USER_KEYED_TABLES
+USER_KEYED_TABLES = ('scores', 'responses', 'exam_sessions', 'journal_entries', 'user_score_stats')
+
+USER_INDEXES = {
+    'idx_journal_user_date_ms': ('journal_entries', ['user_id', 'entry_date_ms']),
+    'idx_exam_session_user_ts_ms': ('exam_sessions', ['user_id', 'timestamp_ms']),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    columns = [c['name'] for c in inspector.get_columns('journal_entries')]
+    if 'user_id' not in columns:
+        # Plain ADD COLUMN keeps the table (and its triggers) in place
+        op.execute("ALTER TABLE journal_entries ADD COLUMN user_id INTEGER REFERENCES users (id)")
+
+    for index, (table, index_columns) in USER_INDEXES.items():
+        if index not in {ix['name'] for ix in sa.inspect(bind).get_indexes(table)}:
+            op.create_index(index, table, index_columns)
+
+    for table in USER_KEYED_TABLES:
+        if table not in existing_tables:
+            continue
+        op.execute(f"""
+            UPDATE {table}
+            SET user_id = (SELECT users.id FROM users WHERE users.username = {table}.username)
+            WHERE user_id IS NULL
+              AND username IN (SELECT username FROM users)
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    from app.models import create_epoch_ms_trigger, create_data_version_triggers
+
+    bind = op.get_bind()
+    for index in USER_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+    # Batch mode rebuilds journal_entries; reinstall its triggers afterwards.
+    # Backfilled user_id values elsewhere are left in place.
+    with op.batch_alter_table('journal_entries') as batch_op:
+        batch_op.drop_column('user_id')
+    create_epoch_ms_trigger(bind, 'journal_entries', 'entry_date', 'entry_date_ms')
+    create_data_version_triggers(bind, ('journal_entries',))
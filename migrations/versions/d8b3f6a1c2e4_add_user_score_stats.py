@@ -0,0 +1,58 @@
+"""Add materialized per-user score aggregates
+
+Revision ID: d8b3f6a1c2e4
+Revises: c4e1a7d2f9b0
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b3f6a1c2e4'
+down_revision: Union[str, Sequence[str], None] = 'c4e1a7d2f9b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGGERS = ('scores_stats_ai', 'scores_stats_ai_reorder', 'scores_stats_ad', 'scores_stats_au')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Trigger and rebuild SQL is shared with the ORM create_all path
+    from app.models import create_user_score_stats_triggers, rebuild_user_score_stats
+
+    bind = op.get_bind()
+    if 'user_score_stats' not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            'user_score_stats',
+            sa.Column('username', sa.String(), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+            sa.Column('attempt_count', sa.Integer(), nullable=False),
+            sa.Column('score_sum', sa.Float(), nullable=False),
+            sa.Column('score_sum_sq', sa.Float(), nullable=False),
+            sa.Column('min_score', sa.Integer()),
+            sa.Column('max_score', sa.Integer()),
+            sa.Column('first_score', sa.Integer()),
+            sa.Column('first_timestamp', sa.String()),
+            sa.Column('first_timestamp_ms', sa.Integer()),
+            sa.Column('last_score', sa.Integer()),
+            sa.Column('last_timestamp', sa.String()),
+            sa.Column('last_timestamp_ms', sa.Integer()),
+            sa.Column('abs_change_sum', sa.Float(), nullable=False),
+        )
+        op.create_index('ix_user_score_stats_user_id', 'user_score_stats', ['user_id'])
+        op.create_index('ix_user_score_stats_attempt_count', 'user_score_stats', ['attempt_count'])
+
+    create_user_score_stats_triggers(bind)
+    rebuild_user_score_stats(bind)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.drop_table('user_score_stats')
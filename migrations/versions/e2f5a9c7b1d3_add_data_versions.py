@@ -0,0 +1,48 @@
+"""Add per-table write counters for the statistics cache
+
+Revision ID: e2f5a9c7b1d3
+Revises: d8b3f6a1c2e4
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f5a9c7b1d3'
+down_revision: Union[str, Sequence[str], None] = 'd8b3f6a1c2e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSIONED_TABLES = ('users', 'scores', 'responses', 'question_bank', 'journal_entries')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Trigger DDL is shared with the ORM create_all path
+    from app.models import create_data_version_triggers
+
+    bind = op.get_bind()
+    tables = sa.inspect(bind).get_table_names()
+    if 'data_versions' not in tables:
+        op.create_table(
+            'data_versions',
+            sa.Column('table_name', sa.String(), primary_key=True),
+            sa.Column('version', sa.Integer(), nullable=False),
+        )
+
+    create_data_version_triggers(bind, VERSIONED_TABLES)
+    if 'statistics_cache' in tables:
+        # Entries cached before the counters existed cannot be validated
+        op.execute("DELETE FROM statistics_cache")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in VERSIONED_TABLES:
+        for suffix in ('ai', 'au', 'ad'):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_version_{suffix}")
+    op.drop_table('data_versions')
@@ -0,0 +1,34 @@
+"""Rebuild per-user score aggregates on out-of-order inserts
+
+Revision ID: e7c2b9d4a6f1
+Revises: d5a2e8c4f7b3
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c2b9d4a6f1'
+down_revision: Union[str, Sequence[str], None] = 'd5a2e8c4f7b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Trigger and rebuild SQL is shared with the ORM create_all path
+    from app.models import create_user_score_stats_triggers, rebuild_user_score_stats
+
+    bind = op.get_bind()
+    create_user_score_stats_triggers(bind)
+    # Backfilled rows may have folded in out of order before
+    rebuild_user_score_stats(bind)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The triggers work with the previous schema as they are; nothing to undo
+    pass
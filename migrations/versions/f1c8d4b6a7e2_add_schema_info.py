@@ -0,0 +1,34 @@
+"""Add schema_info bookkeeping table
+
+Revision ID: f1c8d4b6a7e2
+Revises: e2f5a9c7b1d3
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c8d4b6a7e2'
+down_revision: Union[str, Sequence[str], None] = 'e2f5a9c7b1d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # No fingerprint row: the next app start runs create_all once and records it
+    if 'schema_info' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'schema_info',
+            sa.Column('key', sa.String(), primary_key=True),
+            sa.Column('value', sa.String()),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('schema_info')
@@ -0,0 +1,48 @@
+"""Stop counting appends to scores/responses/exam_sessions in data_versions
+
+Revision ID: f3b8d1e6a9c2
+Revises: e7c2b9d4a6f1
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d1e6a9c2'
+down_revision: Union[str, Sequence[str], None] = 'e7c2b9d4a6f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Trigger SQL is shared with the ORM create_all path; reinstalling every
+    # table also picks up columns added since the triggers were created
+    from app.models import create_data_version_triggers
+
+    bind = op.get_bind()
+    if 'data_versions' in sa.inspect(bind).get_table_names():
+        create_data_version_triggers(bind)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    from app.models import APPEND_TABLES
+
+    bind = op.get_bind()
+    existing = set(sa.inspect(bind).get_table_names())
+    for table in APPEND_TABLES:
+        if table not in existing:
+            continue
+        for op_name in ('insert', 'update', 'delete'):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_version_a{op_name[0]}")
+            op.execute(f"""
+                CREATE TRIGGER {table}_version_a{op_name[0]} AFTER {op_name.upper()} ON {table}
+                BEGIN
+                    UPDATE data_versions SET version = version + 1 WHERE table_name = '{table}';
+                END;
+            """)
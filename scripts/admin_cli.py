@@ -10,6 +10,37 @@ import getpass
 from tabulate import tabulate
 import numpy as np
 from app.db import get_connection
+from app.analysis.score_stats import rebuild_all_user_score_stats
+from app.services import stats
+from app import query_metrics
+from app.services.ingest import ingest_file
+from app.services.archive import archive_old_rows
+from app.services.maintenance import run_maintenance
+from app.services.question_search import search_questions
+
+
+def _compute_sentiment_stats():
+    """Descriptive statistics over every recorded sentiment score"""
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT sentiment_score FROM scores WHERE sentiment_score IS NOT NULL")
+        scores = [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+    
+    if not scores:
+        return None
+    
+    scores_arr = np.array(scores)
+    return {
+        "count": len(scores),
+        "mean": float(np.mean(scores_arr)),
+        "median": float(np.median(scores_arr)),
+        "variance": float(np.var(scores_arr)),
+        "min": float(np.min(scores_arr)),
+        "max": float(np.max(scores_arr)),
+    }
 
 
 class AdminCLI:
@@ -37,7 +68,11 @@ class AdminCLI:
             return False
     
     def list_questions(self, category=None, include_inactive=False):
-        """List all questions"""
+        """
+        List all questions of the admin question file (QuestionDatabase).
+        That file is not the app's question_bank, so the search index
+        (app.services.question_search) cannot serve this view.
+        """
         questions = self.db.get_all_questions(include_inactive)
         
         if category and category != "all":
@@ -66,6 +101,34 @@ class AdminCLI:
         print(f"\n{tabulate(table_data, headers=headers, tablefmt='grid')}\n")
         print(f"Total: {len(questions)} question(s)\n")
     
+    def search_questions(self, query, category=None, age=None, include_inactive=False,
+                         after=None, limit=20):
+        """Ranked full-text search over the app's question bank, one page at a time"""
+        if category and category != "all":
+            category = int(category) if category.isdigit() else category
+        else:
+            category = None
+        cursor = None
+        if after:
+            score, _, question_id = after.rpartition(",")
+            cursor = (float(score), int(question_id))
+        
+        page = search_questions(query, category=category, age_band=(age, age) if age is not None else None,
+                                include_inactive=include_inactive, after=cursor, limit=limit)
+        if not page.hits:
+            print("\nNo matching questions.\n")
+            return
+        
+        table_data = [
+            [h.id, h.snippet, h.category_id, f"{h.min_age}-{h.max_age}", h.difficulty,
+             "✓" if h.is_active == 1 else "✗"]
+            for h in page.hits
+        ]
+        headers = ["ID", "Match", "Category", "Age Range", "Diff", "Active"]
+        print(f"\n{tabulate(table_data, headers=headers, tablefmt='grid')}\n")
+        if page.next_cursor:
+            print(f"More results: --after {page.next_cursor[0]!r},{page.next_cursor[1]}\n")
+    
     def add_question(self):
         """Add a new question interactively"""
         print("\n" + "="*50)
@@ -230,32 +293,22 @@ class AdminCLI:
         print("  Descriptive Statistics (Admin Only)")
         print("="*50 + "\n")
         
-        conn = get_connection()
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute("SELECT sentiment_score FROM scores WHERE sentiment_score IS NOT NULL")
-            scores = [row[0] for row in cursor.fetchall()]
+            summary = stats.get_or_compute(
+                "admin_sentiment_stats", _compute_sentiment_stats, depends_on=["scores"]
+            )
             
-            if not scores:
+            if not summary:
                 print("No sentiment scores available.\n")
                 return
 
-            scores_arr = np.array(scores)
-            
-            mean_val = np.mean(scores_arr)
-            median_val = np.median(scores_arr)
-            variance_val = np.var(scores_arr)
-            min_val = np.min(scores_arr)
-            max_val = np.max(scores_arr)
-
             data = [
-                ["Count", len(scores)],
-                ["Mean", f"{mean_val:.2f}"],
-                ["Median", f"{median_val:.2f}"],
-                ["Variance", f"{variance_val:.2f}"],
-                ["Min", f"{min_val:.2f}"],
-                ["Max", f"{max_val:.2f}"]
+                ["Count", summary["count"]],
+                ["Mean", f"{summary['mean']:.2f}"],
+                ["Median", f"{summary['median']:.2f}"],
+                ["Variance", f"{summary['variance']:.2f}"],
+                ["Min", f"{summary['min']:.2f}"],
+                ["Max", f"{summary['max']:.2f}"]
             ]
             
             print(tabulate(data, headers=["Metric", "Value"], tablefmt="grid"))
@@ -263,19 +316,108 @@ class AdminCLI:
             
         except Exception as e:
             print(f"✗ Error calculating statistics: {e}\n")
-        finally:
-            conn.close()
+
+    def show_query_stats(self, limit=20):
+        """Show the statements that dominate database time"""
+        print("\n" + "="*50)
+        print("  SQL Query Statistics")
+        print("="*50 + "\n")
+        
+        report = query_metrics.get_query_stats(include_saved=True)
+        if not report:
+            print("No query statistics recorded yet.\n")
+            return
+        
+        data = [
+            [
+                r["fingerprint"][:80] + ("..." if len(r["fingerprint"]) > 80 else ""),
+                r["calls"],
+                f"{r['total_ms']:.1f}",
+                f"{r['avg_ms']:.2f}",
+                f"<={r['p95_ms']:g}",
+                f"{r['max_ms']:.1f}",
+                r["rows"],
+            ]
+            for r in report[:limit]
+        ]
+        
+        print(tabulate(data, headers=["Statement", "Calls", "Total ms", "Avg ms", "p95 ms", "Max ms", "Rows"],
+                       tablefmt="grid"))
+        print(f"\nSlow queries (>= {query_metrics.DB_SLOW_QUERY_MS:g} ms) are logged to "
+              f"{query_metrics.SLOW_QUERY_LOG_FILE}\n")
+
+    def import_sessions(self, path):
+        """Bulk-import completed exams from a .jsonl or .csv export"""
+        try:
+            report = ingest_file(path)
+        except (OSError, ValueError) as e:
+            print(f"✗ Import failed: {e}\n")
+            return
+        
+        print(f"\n✓ Imported {report['sessions']} sessions ({report['responses']} responses)")
+        if report["rejected"]:
+            print(f"✗ Rejected {report['rejected']} sessions:")
+            for index, reason in report["rejections"]:
+                print(f"  #{index}: {reason}")
+        print()
+
+    def archive_responses(self, horizon_days=None):
+        """
+        Move responses older than the horizon into the per-period archives:
+        packed exam_sessions as well as legacy `responses` rows
+        """
+        rows = []
+        try:
+            for table in ("exam_sessions", "responses"):
+                moved = archive_old_rows(table, horizon_days=horizon_days)
+                rows.extend((table, label, count) for label, count in sorted(moved.items()))
+        except Exception as e:
+            print(f"✗ Archiving failed: {e}\n")
+            return
+        
+        if not rows:
+            print("\nNothing to archive.\n")
+            return
+        print(tabulate(rows, headers=["Table", "Period", "Rows moved"], tablefmt="grid"))
+        print(f"\n✓ Archived {sum(count for _, _, count in rows)} rows\n")
+
+    def run_db_maintenance(self):
+        """Checkpoint the WAL, refresh planner statistics and reclaim free pages now"""
+        results = run_maintenance(force_analyze=True)
+        if not results:
+            print("\nNo maintenance was due.\n")
+            return
+        data = [
+            [name, f"{r.pop('duration_ms'):.1f}", ", ".join(f"{k}={v}" for k, v in r.items())]
+            for name, r in results.items()
+        ]
+        print(tabulate(data, headers=["Task", "ms", "Details"], tablefmt="grid"))
+        print()
+
+    def rebuild_score_stats(self):
+        """Recompute the per-user score aggregates from the scores table"""
+        try:
+            count = rebuild_all_user_score_stats()
+            print(f"\n✓ Rebuilt score statistics for {count} users\n")
+        except Exception as e:
+            print(f"✗ Error rebuilding score statistics: {e}\n")
 
 
 def main():
     """Main CLI function"""
     parser = argparse.ArgumentParser(description="SoulSense Admin CLI")
-    parser.add_argument('command', choices=['list', 'add', 'view', 'update', 'delete', 'categories', 'create-admin','stats'],
+    parser.add_argument('command', choices=['list', 'add', 'view', 'update', 'delete', 'categories', 'create-admin','stats', 'rebuild-stats', 'query-stats', 'import-sessions', 'archive', 'maintenance', 'search'],
                        help='Command to execute')
     parser.add_argument('--id', type=int, help='Question ID (for view, update, delete)')
-    parser.add_argument('--category', help='Filter by category (for list)')
+    parser.add_argument('--category', help='Filter by category (for list, search)')
     parser.add_argument('--inactive', action='store_true', help='Include inactive questions (for list)')
     parser.add_argument('--no-auth', action='store_true', help='Skip authentication (for create-admin only)')
+    parser.add_argument('--file', help='Export to import (for import-sessions)')
+    parser.add_argument('--limit', type=int, default=20, help='Number of rows to show (for query-stats, search)')
+    parser.add_argument('--query', help='Search terms: word, prefix*, "a phrase" (for search)')
+    parser.add_argument('--age', type=int, help='Only questions for this age (for search)')
+    parser.add_argument('--after', help='Cursor printed by the previous page (for search)')
+    parser.add_argument('--horizon-days', type=int, help='Archive rows older than this many days (for archive)')
     
     args = parser.parse_args()
     
@@ -322,6 +464,30 @@ def main():
 
     elif args.command == 'stats':
         cli.show_stats()
+
+    elif args.command == 'rebuild-stats':
+        cli.rebuild_score_stats()
+
+    elif args.command == 'query-stats':
+        cli.show_query_stats(args.limit)
+
+    elif args.command == 'import-sessions':
+        if not args.file:
+            print("✗ --file is required for import-sessions command")
+            sys.exit(1)
+        cli.import_sessions(args.file)
+
+    elif args.command == 'archive':
+        cli.archive_responses(args.horizon_days)
+
+    elif args.command == 'maintenance':
+        cli.run_db_maintenance()
+
+    elif args.command == 'search':
+        if not args.query:
+            print("✗ --query is required for search command")
+            sys.exit(1)
+        cli.search_questions(args.query, args.category, args.age, args.inactive, args.after, args.limit)
         
 if __name__ == "__main__":
     main()
@@ -78,6 +78,7 @@ def analyze_emotional_trends():
         results = exporter.backfill_detailed_age_groups()
         print(f"   ✓ Updated {results['scores_updated']} score records")
         print(f"   ✓ Updated {results['responses_updated']} response records")
+        print(f"   ✓ Updated {results['sessions_updated']} exam session records")
         
         # Get aggregated statistics
         print("\n2. Computing aggregated metrics by age group...")
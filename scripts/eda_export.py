@@ -32,6 +32,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.utils import compute_age_group, compute_detailed_age_group
 from app.models import ensure_scores_schema, ensure_responses_schema
+from app.services.exam_sessions import read_responses
 
 # Configure logging
 logging.basicConfig(
@@ -127,6 +128,28 @@ class EDAExporter:
         results['responses_updated'] = len(responses_to_update)
         logger.info(f"Updated {len(responses_to_update)} response records")
         
+        # New exams are stored as packed exam_sessions rows; their age comes
+        # from the score row written with them
+        results['sessions_updated'] = 0
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'exam_sessions'")
+        has_sessions = self.cursor.fetchone() is not None
+        self.cursor.execute("PRAGMA table_info(scores)")
+        score_columns = {col['name'] for col in self.cursor.fetchall()}
+        if has_sessions and 'session_id' in score_columns:
+            self.cursor.execute("""
+                SELECT e.id, s.age
+                FROM exam_sessions e
+                LEFT JOIN scores s ON s.session_id = e.id
+                WHERE e.detailed_age_group IS NULL OR e.detailed_age_group = ''
+            """)
+            sessions_to_update = self.cursor.fetchall()
+            self.cursor.executemany(
+                "UPDATE exam_sessions SET detailed_age_group = ? WHERE id = ?",
+                [(compute_detailed_age_group(row['age']), row['id']) for row in sessions_to_update]
+            )
+            results['sessions_updated'] = len(sessions_to_update)
+            logger.info(f"Updated {len(sessions_to_update)} exam session records")
+        
         self.conn.commit()
         logger.info("Backfill completed successfully")
         
@@ -157,46 +180,58 @@ class EDAExporter:
         query = f"""
         SELECT 
             s.id as score_id,
+            s.session_id,
             s.username,
             s.age,
             s.detailed_age_group,
-            s.total_score,
             {normalized_field}
             {num_q_field}
-            r.question_id,
-            r.response_value,
-            r.age_group as legacy_age_group,
-            r.timestamp
+            s.total_score
         FROM scores s
-        LEFT JOIN responses r ON s.username = r.username
-        ORDER BY s.id, r.question_id
+        ORDER BY s.id
         """
         
         self.cursor.execute(query)
         rows = self.cursor.fetchall()
         
+        # Answers are decoded from the packed sessions in Python (much faster
+        # than the all_responses view), then matched to scores by session
+        responses_cursor = self.conn.cursor()
+        responses_cursor.row_factory = None
+        responses = read_responses(responses_cursor)
+        responses = responses[responses['session_id'].notna()]
+        responses = responses.sort_values(['session_id', 'question_id'], kind='stable')
+        answers_by_session = {}
+        for session_id, question_id, response_value, timestamp in zip(
+            responses['session_id'].astype(int).tolist(), responses['question_id'].astype(int).tolist(),
+            responses['response_value'].astype(int).tolist(), responses['timestamp'].tolist()
+        ):
+            answers_by_session.setdefault(session_id, []).append((question_id, response_value, timestamp))
+        no_answers = [(None, None, None)]
+        
         dataset = []
         for row in rows:
-            record = {
-                'score_id': row['score_id'],
-                'username': row['username'],
-                'age': row['age'],
-                'age_group_legacy': compute_age_group(row['age']),  # Backward compatible
-                'age_group_detailed': row['detailed_age_group'] or compute_detailed_age_group(row['age']),
-                'total_score': row['total_score'],
-                'question_id': row['question_id'],
-                'response_value': row['response_value'],
-                'timestamp': row['timestamp'],
-                'export_timestamp': datetime.now().isoformat()
-            }
-            
-            # Add optional fields if they exist
-            if has_normalized:
-                record['normalized_score'] = row['normalized_score']
-            if has_num_questions:
-                record['num_questions'] = row['num_questions']
-            
-            dataset.append(record)
+            for question_id, response_value, timestamp in answers_by_session.get(row['session_id'], no_answers):
+                record = {
+                    'score_id': row['score_id'],
+                    'username': row['username'],
+                    'age': row['age'],
+                    'age_group_legacy': compute_age_group(row['age']),  # Backward compatible
+                    'age_group_detailed': row['detailed_age_group'] or compute_detailed_age_group(row['age']),
+                    'total_score': row['total_score'],
+                    'question_id': question_id,
+                    'response_value': response_value,
+                    'timestamp': timestamp,
+                    'export_timestamp': datetime.now().isoformat()
+                }
+                
+                # Add optional fields if they exist
+                if has_normalized:
+                    record['normalized_score'] = row['normalized_score']
+                if has_num_questions:
+                    record['num_questions'] = row['num_questions']
+                
+                dataset.append(record)
         
         logger.info(f"Retrieved {len(dataset)} records for EDA")
         return dataset
@@ -362,7 +397,10 @@ class EDAExporter:
         self.cursor.execute("SELECT COUNT(*) as cnt FROM scores")
         scores_count = self.cursor.fetchone()['cnt']
         
-        self.cursor.execute("SELECT COUNT(*) as cnt FROM responses")
+        self.cursor.execute("""
+            SELECT (SELECT COUNT(*) FROM responses)
+                 + (SELECT COALESCE(SUM(answer_count), 0) FROM exam_sessions) as cnt
+        """)
         responses_count = self.cursor.fetchone()['cnt']
         
         print(f"\nData Counts:")
@@ -439,6 +477,7 @@ Examples:
                 print(f"\nBackfill Results:")
                 print(f"  Scores updated: {results['scores_updated']}")
                 print(f"  Responses updated: {results['responses_updated']}")
+                print(f"  Exam sessions updated: {results['sessions_updated']}")
             
             if args.format and args.output:
                 include_agg = not args.no_aggregates
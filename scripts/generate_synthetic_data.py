@@ -297,6 +297,7 @@ class SyntheticDataGenerator:
                     INSERT INTO users (username, total_score, age)
                     VALUES (?, ?, ?)
                 """, (username, total_score, demos['age']))
+                user_id = cursor.lastrowid
                 
                 # Generate test sessions
                 for session_num in range(self.num_responses_per_user):
@@ -312,9 +313,9 @@ class SyntheticDataGenerator:
                     for q_id, response_data in responses.items():
                         cursor.execute("""
                             INSERT INTO responses 
-                            (username, question_id, response_value, age_group, timestamp)
-                            VALUES (?, ?, ?, ?, ?)
-                        """, (username, q_id, response_data['score'], 
+                            (username, user_id, question_id, response_value, age_group, timestamp)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                        """, (username, user_id, q_id, response_data['score'], 
                               demos['age_group'], timestamp))
                         total_responses += 1
                 
@@ -29,3 +29,11 @@ def temp_db(monkeypatch):
     # Cleanup
     test_engine.dispose()
     os.remove(path)
+
+@pytest.fixture
+def predictor(tmp_path, monkeypatch):
+    # A predictor that trains and saves its model under tmp_path
+    from app.ml import predictor as predictor_module
+    monkeypatch.setattr(predictor_module, "MODELS_DIR", str(tmp_path))
+    monkeypatch.setattr(predictor_module, "DATA_DIR", str(tmp_path))
+    return predictor_module.SoulSenseMLPredictor(use_versioning=False)
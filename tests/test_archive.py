@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from app.db import get_connection
+from app.services import archive
+from app.utils import to_epoch_ms
+
+
+def _insert_responses(rows):
+    conn = get_connection()
+    try:
+        conn.executemany(
+            "INSERT INTO responses (username, question_id, response_value, timestamp, timestamp_ms) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(user, qid, value, ts, to_epoch_ms(ts)) for user, qid, value, ts in rows]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_archive_moves_old_rows_and_history_reads_them(temp_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path))
+    _insert_responses([
+        ("alice", 1, 2, "2023-03-01T10:00:00"),
+        ("alice", 1, 3, "2023-11-01T10:00:00"),
+        ("alice", 2, 1, "2024-02-01T10:00:00"),
+        ("alice", 1, 4, "2025-06-01T10:00:00"),
+        ("bob", 1, 0, "2025-06-02T10:00:00"),
+    ])
+
+    moved = archive.archive_old_rows(horizon_days=365, chunk_size=1, now=datetime(2025, 7, 1))
+
+    assert moved == {"2023": 2, "2024": 1}
+    assert [label for label, _ in archive.list_archives()] == ["2023", "2024"]
+
+    conn = get_connection()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 2
+    finally:
+        conn.close()
+
+    rows = archive.query_history(
+        "SELECT response_value FROM responses_all WHERE username = ? ORDER BY timestamp_ms", ("alice",)
+    )
+    assert [r.response_value for r in rows] == [2, 3, 1, 4]
+
+    # Only the 2024 archive overlaps this range
+    recent = archive.query_history(
+        "SELECT COUNT(*) AS n FROM responses_all",
+        start_ms=to_epoch_ms("2024-01-01T00:00:00")
+    )
+    assert recent[0].n == 3
+
+    # Nothing left past the horizon; re-running is a no-op
+    assert archive.archive_old_rows(horizon_days=365, now=datetime(2025, 7, 1)) == {}
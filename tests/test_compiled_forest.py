@@ -0,0 +1,92 @@
+import shutil
+
+import numpy as np
+import pytest
+import sklearn
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from app.ml.compiled_forest import CompiledForest, compile_forest, try_compile
+from app.ml.versioning import ModelRegistry
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    rng = np.random.default_rng(3)
+    X = rng.normal(size=(600, 5)) * [1, 10, 100, 0.1, 5]
+    y = (X[:, 0] + X[:, 1] / 10 + rng.normal(size=600) > 0).astype(int) + (X[:, 2] > 50)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=40, max_depth=6, random_state=0).fit(scaler.transform(X), y)
+    return model, scaler, rng.normal(size=(500, 5)) * [1, 10, 100, 0.1, 5]
+
+
+@pytest.mark.parametrize("rows", [1, 3, 500])
+def test_compiled_forest_is_bit_exact(fitted, rows):
+    model, scaler, X = fitted
+    compiled = compile_forest(model, scaler)
+    X_scaled = scaler.transform(X[:rows])
+
+    assert np.array_equal(compiled.transform(X[:rows]), X_scaled)
+    assert np.array_equal(compiled.predict_proba(X_scaled), model.predict_proba(X_scaled))
+    assert np.array_equal(compiled.predict(X_scaled), model.predict(X_scaled))
+
+    bias, contributions = compile_forest(model).contributions(X_scaled)
+    assert contributions.shape == (rows, 5, 3)
+    assert np.allclose(bias + contributions.sum(axis=1), model.predict_proba(X_scaled), rtol=0, atol=1e-12)
+
+
+@pytest.mark.skipif(tuple(map(int, sklearn.__version__.split(".")[:2])) < (1, 4),
+                    reason="forests learn NaN routing from scikit-learn 1.4")
+def test_compiled_forest_handles_deep_trees_and_missing_values():
+    rng = np.random.default_rng(5)
+    X = rng.normal(size=(800, 4))
+    X[rng.random(X.shape) < 0.1] = np.nan
+    y = rng.integers(0, 3, 800)
+    X_test = rng.normal(size=(300, 4))
+    X_test[rng.random(X_test.shape) < 0.1] = np.nan
+
+    # Unbounded depth; NaN routing learned by the trees
+    model = RandomForestClassifier(n_estimators=15, random_state=0).fit(X, y)
+    compiled = compile_forest(model)
+    assert compiled.has_missing
+    assert np.array_equal(compiled.predict_proba(X_test), model.predict_proba(X_test))
+    assert np.array_equal(compiled.predict_proba(X_test[:1]), model.predict_proba(X_test[:1]))
+
+    model = ExtraTreesClassifier(n_estimators=15, random_state=0).fit(np.nan_to_num(X), y)
+    compiled = compile_forest(model)
+    assert np.array_equal(compiled.predict_proba(np.nan_to_num(X_test)),
+                          model.predict_proba(np.nan_to_num(X_test)))
+
+    with pytest.raises(TypeError):
+        compile_forest(StandardScaler())
+
+
+def test_registry_stores_and_maps_compiled_models(fitted, tmp_path):
+    model, scaler, X = fitted
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    registry.register_model(model, "forest", scaler=scaler, feature_names=list("abcde"), class_names=["x", "y", "z"])
+
+    model_data, metadata = registry.get_model("forest", compiled=True)
+    engine = model_data["model"]
+    assert isinstance(engine, CompiledForest) and model_data["scaler"] is engine
+    assert model_data["feature_names"] == list("abcde")
+    assert engine.threshold.base is not None  # memory-mapped, not copied
+    assert np.array_equal(engine.predict_proba(engine.transform(X)), model.predict_proba(scaler.transform(X)))
+
+    # Versions registered before compilation are compiled on first load
+    shutil.rmtree(tmp_path / "registry" / "models" / "forest" / metadata.version / "compiled")
+    assert isinstance(registry.get_model("forest", compiled=True)[0]["model"], CompiledForest)
+    compiled_dir = tmp_path / "registry" / "models" / "forest" / metadata.version / "compiled" / metadata.file_hash[:16]
+    assert sorted(p.name for p in compiled_dir.parent.iterdir()) == [compiled_dir.name]
+    assert isinstance(registry.get_model("forest")[0]["model"], RandomForestClassifier)
+
+    # A forest compiled from another model is refused
+    with pytest.raises(ValueError):
+        CompiledForest.load(str(compiled_dir), model_hash="0" * 64)
+
+
+def test_only_standard_scaling_is_compiled(fitted):
+    model, _, X = fitted
+    assert try_compile(model, MinMaxScaler().fit(X)) is None
+    with pytest.raises(TypeError):
+        compile_forest(model, MinMaxScaler().fit(X))
@@ -1,3 +1,4 @@
+import pytest
 from app.db import get_session
 from sqlalchemy import text
 
@@ -6,3 +7,99 @@ def test_db_session(temp_db):
     result = session.execute(text("SELECT 1"))
     assert result.scalar() == 1
     session.close()
+
+def test_pooled_connections_apply_pragma_profile(tmp_path, monkeypatch):
+    from app.db import create_db_engine, get_connection, get_pool_stats
+
+    pooled = create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}",
+                              pragmas={"journal_mode": "WAL", "busy_timeout": 1234})
+    monkeypatch.setattr("app.db.engine", pooled)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    assert cursor.execute("PRAGMA busy_timeout").fetchone()[0] == 1234
+    assert cursor.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert get_pool_stats(pooled)["checked_out"] == 1
+    conn.close()
+
+    # close() hands the connection back to the pool instead of discarding it
+    stats = get_pool_stats(pooled)
+    assert stats["checked_out"] == 0
+    assert stats["checked_in"] == 1
+
+    with pooled.connect() as orm_conn:
+        assert orm_conn.execute(text("PRAGMA busy_timeout")).scalar() == 1234
+    pooled.dispose()
+
+def test_init_db_skips_create_all_when_fingerprint_matches(tmp_path, monkeypatch):
+    from app.db import create_db_engine, init_db, schema_fingerprint
+    from app.models import Base
+
+    target = create_db_engine(f"sqlite:///{tmp_path / 'boot.db'}")
+    calls = []
+    original = Base.metadata.create_all
+    monkeypatch.setattr(Base.metadata, "create_all",
+                        lambda *a, **kw: calls.append(1) or original(*a, **kw))
+
+    init_db(target)
+    init_db(target)  # once per process
+    assert len(calls) == 1
+
+    with target.connect() as conn:
+        stored = conn.execute(text("SELECT value FROM schema_info WHERE key = 'fingerprint'")).scalar()
+    assert stored == schema_fingerprint()
+
+    # A new process with a matching fingerprint does no DDL at all
+    fresh = create_db_engine(f"sqlite:///{tmp_path / 'boot.db'}")
+    init_db(fresh)
+    assert len(calls) == 1
+
+    # A stale fingerprint triggers one create/verify pass
+    with fresh.begin() as conn:
+        conn.execute(text("UPDATE schema_info SET value = 'stale'"))
+    init_db(fresh, force=False)
+    assert len(calls) == 1  # already bootstrapped in this process
+    newest = create_db_engine(f"sqlite:///{tmp_path / 'boot.db'}")
+    init_db(newest)
+    assert len(calls) == 2
+
+    for e in (target, fresh, newest):
+        e.dispose()
+
+
+def test_init_db_raises_and_retries_after_a_failed_bootstrap(tmp_path, monkeypatch):
+    from app.db import create_db_engine, init_db
+    from app.exceptions import DatabaseError
+    from app.models import Base
+
+    target = create_db_engine(f"sqlite:///{tmp_path / 'broken.db'}")
+    original = Base.metadata.create_all
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("disk on fire")
+
+    monkeypatch.setattr(Base.metadata, "create_all", broken)
+    with pytest.raises(DatabaseError):
+        init_db(target)
+
+    # Not remembered as bootstrapped: the next call runs create_all again
+    monkeypatch.setattr(Base.metadata, "create_all", original)
+    assert init_db(target)
+    with target.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM schema_info")).scalar() == 1
+    target.dispose()
+
+
+def test_init_db_refuses_tables_missing_model_columns(tmp_path):
+    from app.db import _stored_fingerprint, create_db_engine, init_db
+    from app.exceptions import DatabaseError
+
+    target = create_db_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with target.begin() as conn:
+        conn.execute(text("CREATE TABLE scores (id INTEGER PRIMARY KEY, username VARCHAR, total_score INTEGER)"))
+
+    with pytest.raises(DatabaseError, match="scores.timestamp_ms"):
+        init_db(target)
+    # No DDL ran and no fingerprint was stored, so the next process checks again
+    assert _stored_fingerprint(target) is None
+    target.dispose()
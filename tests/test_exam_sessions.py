@@ -0,0 +1,50 @@
+from app.db import get_connection
+from app.services.exam_sessions import INSERT_SESSION_SQL, load_responses, session_row, unpack_answers
+
+
+def _execute(sql, params=()):
+    conn = get_connection()
+    try:
+        rows = conn.execute(sql, params).fetchall()
+        conn.commit()
+        return rows
+    finally:
+        conn.close()
+
+
+def test_packed_sessions_round_trip_through_numpy_and_views(temp_db):
+    answers = [(3, 4), (1, 0), (300, 2), (2, -1)]
+    row = session_row("alice", "adult", "25-34", "2025-02-01T09:00:00", answers)
+    ids, values = unpack_answers(row[6], row[7])
+    assert list(zip(ids.tolist(), values.tolist())) == answers
+
+    _execute(INSERT_SESSION_SQL, row)
+    session_id = _execute("SELECT MAX(id) FROM exam_sessions")[0][0]
+    _execute("INSERT INTO responses (username, question_id, response_value, timestamp, session_id) "
+             "VALUES ('alice', 1, 1, '2024-12-01T09:00:00', ?)", (session_id,))
+
+    # The SQL view decodes the same bytes as np.frombuffer
+    view_rows = _execute("SELECT question_id, response_value FROM exam_responses ORDER BY position")
+    assert view_rows == answers
+
+    assert _execute("SELECT COUNT(*), SUM(response_value) FROM all_responses WHERE username = 'alice'") == [(5, 6)]
+
+    df = load_responses("alice")
+    assert df["question_id"].tolist() == [1, 3, 1, 300, 2]  # legacy row first, then answer order
+    assert df["session_id"].tolist() == [session_id] * 5  # legacy rows keep their link
+    assert df["id"].iloc[0] is not None and df["id"].iloc[1] is None
+
+
+def test_question_fairness_decodes_packed_answers(temp_db):
+    from app.ml.bias_checker import SimpleBiasChecker
+
+    for i, age in enumerate([20, 22, 24, 50, 55, 60]):
+        value = 1 if age < 35 else 4
+        _execute(INSERT_SESSION_SQL, session_row(f"u{i}", None, None, "2025-02-01T09:00:00", [(7, value), (8, 2)]))
+        _execute("INSERT INTO scores (username, age, total_score, session_id) VALUES (?, ?, ?, "
+                 "(SELECT MAX(id) FROM exam_sessions))", (f"u{i}", age, value + 2))
+
+    result = SimpleBiasChecker().check_question_fairness()
+    assert result["status"] == "ok" and result["total_questions_checked"] == 2
+    assert result["biased_questions"] == [
+        {"question_id": 7, "younger_avg": 1.0, "older_avg": 4.0, "difference": 3.0}]
@@ -0,0 +1,66 @@
+import json
+
+from app.db import get_connection
+from app.services.ingest import ingest_file, ingest_sessions
+
+
+def _rows(sql):
+    conn = get_connection()
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_ingest_sessions_batches_and_rejects(temp_db):
+    sessions = [
+        {"username": f"kiosk{i}", "age": 30 + i, "responses": {"1": 4, "2": 3, "3": "2"},
+         "timestamp": "2025-03-01T09:00:00"}
+        for i in range(5)
+    ] + [
+        {"username": "", "age": 20, "responses": {"1": 1}},
+        {"username": "blank", "age": 20, "responses": {"1": "x"}},
+        {"username": "clip", "age": 200, "responses": [[1, 9], {"question_id": 2, "value": 1}]},
+    ]
+
+    report = ingest_sessions(iter(sessions), batch_size=3, sentiment_workers=0)
+
+    assert report["sessions"] == 6
+    assert report["responses"] == 5 * 3 + 2
+    assert report["rejected"] == 2
+    assert dict(report["rejections"]) == {5: "missing username", 6: "no valid responses"}
+
+    scores = dict((u, (t, a, g)) for u, t, a, g in _rows(
+        "SELECT username, total_score, age, detailed_age_group FROM scores"))
+    assert scores["kiosk0"] == (9, 30, "25-34")
+    assert scores["clip"] == (5, 120, "65+")  # answer clipped to 4, age clipped to 120
+
+    assert _rows("SELECT timestamp_ms, answer_count FROM exam_sessions WHERE username = 'kiosk0'") == [
+        (1740819600000, 3)]
+    # Each score joins exactly its own session's answers
+    assert _rows("""
+        SELECT COUNT(*) FROM scores s JOIN all_responses r ON r.session_id = s.session_id
+        WHERE s.username = 'clip'
+    """) == [(2,)]
+
+
+def test_ingest_file_streams_csv_and_jsonl(temp_db, tmp_path):
+    csv_path = tmp_path / "paper.csv"
+    csv_path.write_text(
+        "username,age,reflection_text,q1,q2\n"
+        "ann,41,,3,4\n"
+        "ben,,felt fine,2,\n",
+        encoding="utf-8",
+    )
+    jsonl_path = tmp_path / "kiosk.jsonl"
+    jsonl_path.write_text(
+        json.dumps({"username": "cat", "age": 16, "responses": {"1": 1}}) + "\n\nnot json\n",
+        encoding="utf-8",
+    )
+
+    assert ingest_file(str(csv_path), sentiment_workers=0)["sessions"] == 2
+    assert ingest_file(str(jsonl_path), sentiment_workers=0)["sessions"] == 1
+
+    rows = dict((u, (t, g)) for u, t, g in _rows(
+        "SELECT username, total_score, detailed_age_group FROM scores"))
+    assert rows == {"ann": (7, "35-44"), "ben": (2, "unknown"), "cat": (1, "13-17")}
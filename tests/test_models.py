@@ -15,3 +15,57 @@ def test_schema_creation(temp_db):
     assert "responses" in tables
     assert "question_bank" in tables
     assert "journal_entries" in tables
+
+def test_user_score_stats_maintained_on_write(temp_db):
+    """Aggregates track inserts (ORM and raw SQL) and recompute on delete."""
+    from app.db import get_session, get_connection
+    from app.models import Score
+    from app.analysis.score_stats import get_user_score_stats
+
+    session = get_session()
+    session.add_all([
+        Score(username="alice", total_score=30, timestamp="2025-01-02T10:00:00"),
+        Score(username="alice", total_score=20, timestamp="2025-01-01T10:00:00"),
+    ])
+    session.commit()
+    session.close()
+
+    conn = get_connection()
+    conn.execute("INSERT INTO scores (username, total_score, timestamp) VALUES ('alice', 40, '2025-01-03 10:00:00')")
+    conn.commit()
+
+    stats = get_user_score_stats("alice")
+    assert stats["count"] == 3
+    assert stats["mean"] == 30.0
+    assert stats["min"] == 20 and stats["max"] == 40
+    assert stats["first_score"] == 20 and stats["last_score"] == 40
+    assert abs(stats["std_dev"] - (200 / 3) ** 0.5) < 1e-9
+
+    conn.execute("DELETE FROM scores WHERE total_score = 40")
+    conn.commit()
+    conn.close()
+
+    stats = get_user_score_stats("alice")
+    assert stats["count"] == 2
+    assert stats["last_score"] == 30
+    assert stats["average_change"] == 10.0
+    assert get_user_score_stats("nobody") is None
+
+def test_user_score_stats_follow_timestamp_order_on_backfill(temp_db):
+    """Out-of-order inserts give the same aggregates as a full rebuild."""
+    from sqlalchemy import text
+    from app.models import rebuild_user_score_stats
+
+    rows = [(10, "2025-01-01 10:00:00"), (50, "2025-01-05 10:00:00"),
+            (20, "2025-01-03 10:00:00"), (40, "2025-01-04 10:00:00"), (30, None), (60, "2025-01-06 10:00:00")]
+    engine = get_engine()
+    with engine.begin() as conn:
+        for score, timestamp in rows:
+            conn.execute(text("INSERT INTO scores (username, total_score, timestamp) VALUES ('bob', :s, :t)"),
+                         {"s": score, "t": timestamp})
+        maintained = conn.execute(text("SELECT * FROM user_score_stats")).fetchall()
+        rebuild_user_score_stats(conn)
+        rebuilt = conn.execute(text("SELECT * FROM user_score_stats")).fetchall()
+    assert maintained == rebuilt
+    # 10, 20, 40, 50, 60 by time, then the untimed 30
+    assert rebuilt[0].abs_change_sum == 10 + 20 + 10 + 10 + 30
@@ -0,0 +1,71 @@
+import pandas as pd
+
+from app.ml.prediction_cache import PredictionCache, quantize
+
+
+
+def test_quantize():
+    assert quantize(10.4, 1.0) == 10.0
+    assert quantize(0.3, 0.1) == 0.3
+    assert quantize(-12.6, 5) == -15.0
+    assert quantize(7.25, 0) == 7.25
+
+
+def test_predictions_are_cached_per_sentiment_bucket(predictor):
+    cache = predictor.prediction_cache
+    first = predictor.predict_with_explanation([4, 2, 3, 5, 1], 30, 15, 10.2)
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 0
+
+    # A returned result can be modified without touching the cached one
+    first["recommendations"].append("mine")
+    first["features"]["age"] = 99
+
+    # Same bucket: the prediction made for the bucket's first score
+    second = predictor.predict_with_explanation([4, 2, 3, 5, 1], 30, 15, 10.4)
+    assert cache.stats()["hits"] == 1
+    assert second["features"]["sentiment_score"] == 10.2 and second["features"]["age"] == 30
+    assert "mine" not in second["recommendations"]
+
+    predictor.predict_with_explanation([4, 2, 3, 5, 1], 30, 15, 11.0)
+    assert cache.stats()["misses"] == 2
+
+    # Loading a model starts over
+    predictor.load_default_model()
+    stats = cache.stats()
+    assert stats["size"] == 0 and stats["invalidations"] >= 1
+    predictor.predict_with_explanation([4, 2, 3, 5, 1], 30, 15, 10.2)
+    assert cache.stats()["misses"] == 3
+    assert predictor.get_model_info()["prediction_cache"]["size"] == 1
+
+
+def test_disabled_cache_leaves_sentiment_unrounded(predictor, monkeypatch):
+    predictor.prediction_cache = PredictionCache(0)
+    seen = []
+    prepare = predictor.prepare_features
+    monkeypatch.setattr(predictor, "prepare_features",
+                        lambda *args: seen.append(args[3]) or prepare(*args))
+
+    result = predictor.predict_with_explanation([4, 2, 3, 5, 1], 30, 15, 10.4)
+    assert seen == [10.4] and result["features"]["sentiment_score"] == 10.4
+    batch = predictor.predict_batch(pd.DataFrame({"age": [30], "total_score": [15], "sentiment_score": [10.4]}),
+                                    explain="full")
+    assert batch["sentiment_score"].tolist() == [10.4]
+
+
+def test_cache_evicts_least_recently_used_and_drops_stale_puts():
+    cache = PredictionCache(2)
+    a, b, c = cache.key("a"), cache.key("b"), cache.key("c")
+    cache.put(a, 1)
+    cache.put(b, 2)
+    assert cache.get(a) == 1
+    cache.put(c, 3)
+    assert cache.get(b) is None and cache.get(a) == 1 and cache.get(c) == 3
+    assert cache.stats()["evictions"] == 1
+
+    cache.invalidate()
+    cache.put(a, 1)
+    assert cache.get(cache.key("a")) is None
+
+    disabled = PredictionCache(0)
+    disabled.put(disabled.key("a"), 1)
+    assert not disabled.enabled and disabled.get(disabled.key("a")) is None
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml import predictor as predictor_module
+from app.ml.predictor import SoulSenseMLPredictor
+
+
+
+def test_predict_batch_matches_single_predictions(predictor):
+    rng = np.random.default_rng(7)
+    q_scores = rng.integers(1, 6, size=(40, 5))
+    frame = pd.DataFrame(q_scores, columns=predictor.feature_names[:5])
+    frame["age"] = rng.integers(10, 80, size=40)
+    frame["total_score"] = q_scores.sum(axis=1) * 5
+    frame["sentiment_score"] = rng.uniform(-60, 60, size=40).round(1)
+
+    result = predictor.predict_batch(frame, explain="full")
+    assert list(result.index) == list(frame.index)
+
+    for i, row in frame.iterrows():
+        single = predictor.predict_with_explanation(
+            q_scores[i].tolist(), row["age"], row["total_score"], row["sentiment_score"]
+        )
+        batch = result.loc[i]
+        assert batch["prediction"] == single["prediction"]
+        assert np.allclose(batch[["prob_low_risk", "prob_moderate_risk", "prob_high_risk"]].astype(float),
+                           single["probabilities"])
+        assert list(batch["recommendations"]) == single["recommendations"]
+        assert list(batch["feature_importance"]) == list(single["feature_importance"])
+        assert batch["top_feature_1"] == next(iter(single["feature_importance"]))
+        assert batch["feature_contributions"] == pytest.approx(single["feature_contributions"])
+        assert batch["explanation"] == single["explanation"]
+
+    # ndarray input; unanswered questions take the neutral 3
+    array = np.array([[5, np.nan, 4, np.nan, 2, 30, 14, -50, 5]])
+    single = predictor.predict_with_explanation([5, 3, 4, 3, 2], 30, 14, -50)
+    batch = predictor.predict_batch(array).iloc[0]
+    assert batch["prediction"] == single["prediction"]
+    assert "top_feature_1" not in batch
+
+    with pytest.raises(ValueError):
+        predictor.predict_batch(array, explain="verbose")
+
+    report = predictor.explain_cohort(frame)
+    assert sorted(report.index) == sorted(predictor.feature_names)
+    assert report["mean_importance"].sum() == pytest.approx(1.0)
+    assert report["mean_importance"].is_monotonic_decreasing
+
+
+def test_predictor_handle_loads_bundled_model_without_training(tmp_path, monkeypatch):
+    from app.ml.loader import load_predictor
+    import pickle
+
+    monkeypatch.setattr(predictor_module, "MODELS_DIR", str(tmp_path))
+    monkeypatch.setattr(SoulSenseMLPredictor, "train_sample_model",
+                        lambda self, *a, **k: pytest.fail("trained on load"))
+    # A saved model without sentiment support is skipped, not retrained
+    with open(tmp_path / "soulsense_ml_model.pkl", "wb") as f:
+        pickle.dump({"model": None, "scaler": None, "feature_names": ["total_score"],
+                     "class_names": [], "version": "0.1.0"}, f)
+
+    handle = load_predictor(use_versioning=False)
+    predictor = handle.get(timeout=60)
+    assert handle.ready() and not handle.failed()
+    assert predictor.current_version == "default"
+    assert handle.predict_with_explanation([4, 4, 4, 4, 4], 30, 20)["prediction_label"] in predictor.class_names
@@ -0,0 +1,75 @@
+import logging
+import sqlite3
+
+from app import query_metrics
+from app.query_metrics import InstrumentedConnection, fingerprint
+
+
+def test_fingerprint_normalizes_literals():
+    a = fingerprint("SELECT * FROM scores WHERE username = 'bob' AND id IN (1, 2, 3)")
+    b = fingerprint("SELECT *  FROM scores\n WHERE username = 'alice' AND id IN (?, ?)")
+    assert a == b == "SELECT * FROM scores WHERE username = ? AND id IN (?...)"
+    assert fingerprint("SELECT * FROM t WHERE x = :name") == "SELECT * FROM t WHERE x = ?"
+
+
+def test_instrumented_connection_records_calls_rows_and_slow_plans(monkeypatch):
+    query_metrics.reset_query_stats()
+    records = []
+
+    class Capture(logging.Handler):
+        def emit(self, record):
+            records.append(record.getMessage())
+
+    handler = Capture()
+    query_metrics.slow_query_logger.addHandler(handler)
+    monkeypatch.setattr(query_metrics, "_slow_log_ready", True)
+    monkeypatch.setattr(query_metrics, "DB_SLOW_QUERY_MS", 0.0)
+
+    conn = sqlite3.connect(":memory:", factory=InstrumentedConnection)
+    try:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v INTEGER)")
+        conn.executemany("INSERT INTO t (v) VALUES (?)", [(i,) for i in range(10)])
+        for limit in (3, 4):
+            rows = conn.execute("SELECT v FROM t WHERE v < ?", (limit,)).fetchall()
+            assert len(rows) == limit
+        assert sum(1 for _ in conn.execute("SELECT v FROM t")) == 10
+    finally:
+        conn.close()
+        query_metrics.slow_query_logger.removeHandler(handler)
+
+    stats = {r["fingerprint"]: r for r in query_metrics.get_query_stats()}
+    select = stats["SELECT v FROM t WHERE v < ?"]
+    assert select["calls"] == 2
+    assert select["rows"] == 7
+    assert sum(select["histogram"]) == 2
+    assert stats["SELECT v FROM t"]["rows"] == 10
+    assert stats["INSERT INTO t (v) VALUES (?)"]["rows"] == 10
+
+    assert any("QUERY PLAN" in message and "SELECT v FROM t WHERE" in message for message in records)
+    query_metrics.reset_query_stats()
+
+
+def test_select_latency_includes_fetching_rows():
+    import time
+
+    query_metrics.reset_query_stats()
+    conn = sqlite3.connect(":memory:", factory=InstrumentedConnection)
+    try:
+        # Each row costs 5 ms, but execute() only steps to the first one
+        conn.create_function("slow", 1, lambda v: time.sleep(0.005) or v)
+        conn.execute("CREATE TABLE t (v INTEGER)")
+        conn.executemany("INSERT INTO t (v) VALUES (?)", [(i,) for i in range(10)])
+        assert len(conn.execute("SELECT slow(v) FROM t").fetchall()) == 10
+
+        # A partly read cursor is recorded when it is reused
+        cursor = conn.cursor()
+        assert cursor.execute("SELECT v FROM t").fetchone() == (0,)
+        assert not any(r["fingerprint"] == "SELECT v FROM t" for r in query_metrics.get_query_stats())
+        cursor.execute("SELECT ?", (1,))
+    finally:
+        conn.close()
+
+    stats = {r["fingerprint"]: r for r in query_metrics.get_query_stats()}
+    assert stats["SELECT slow(v) FROM t"]["total_ms"] >= 45
+    assert (stats["SELECT v FROM t"]["calls"], stats["SELECT v FROM t"]["rows"]) == (1, 1)
+    query_metrics.reset_query_stats()
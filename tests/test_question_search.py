@@ -0,0 +1,67 @@
+from app.db import get_connection, get_session
+from app.models import Question
+from app.services.question_search import _search_like, fts_available, parse_query, search_questions
+
+
+def _add_questions():
+    session = get_session()
+    session.add_all([
+        Question(question_text="I feel calm at work", category_id=1, is_active=1, min_age=18, max_age=120),
+        Question(question_text="Feeling calm, calm and rested", category_id=1, is_active=1, min_age=18, max_age=120),
+        Question(question_text="My family and work feel close", category_id=2, is_active=1, min_age=13, max_age=17),
+        Question(question_text="I feel calm (retired)", category_id=1, is_active=0, min_age=18, max_age=120),
+    ])
+    session.commit()
+    session.close()
+
+
+def test_search_ranks_filters_and_pages(temp_db):
+    _add_questions()
+    conn = get_connection()
+    try:
+        assert fts_available(conn)  # served by the question_search FTS5 table
+    finally:
+        conn.close()
+
+    assert [h.id for h in search_questions("calm").hits] == [2, 1]
+    assert [h.id for h in search_questions("feel*", age_band=(15, 15)).hits] == [3]
+    assert [h.id for h in search_questions('"calm at work"').hits] == [1]
+    assert search_questions("feel", category=2).hits[0].snippet == "My family and work [feel] close"
+    assert [h.id for h in search_questions("calm", include_inactive=True).hits] == [2, 4, 1]
+
+    first = search_questions("feel*", limit=2)
+    rest = search_questions("feel*", limit=2, after=first.next_cursor)
+    assert len(first.hits) == 2 and rest.next_cursor is None
+    assert {h.id for h in first.hits + rest.hits} == {1, 2, 3}
+
+    # Edits bump the question_bank version, so cached pages are not served
+    session = get_session()
+    session.query(Question).filter_by(id=2).update({"is_active": 0})
+    session.commit()
+    session.close()
+    assert [h.id for h in search_questions("calm").hits] == [1]
+
+    # Text edits reach the index through the triggers
+    session = get_session()
+    session.query(Question).filter_by(id=1).update({"question_text": "I feel rested at work"})
+    session.commit()
+    session.close()
+    assert search_questions("calm").hits == []
+    assert [h.id for h in search_questions("rest*").hits] == [1]
+
+    assert parse_query('"" ***') == []
+
+
+def test_like_fallback_matches_without_ranking(temp_db):
+    _add_questions()
+    conn = get_connection()
+    try:
+        hits = _search_like(conn, parse_query('calm "at work"'), None, None, False, None, 10)
+        assert [(h.id, h.score) for h in hits] == [(1, 0.0)]
+        assert hits[0].snippet == "I feel [calm] [at] [work]"
+        hits = _search_like(conn, parse_query("feel*"), None, None, False, (0.0, 1), 10)
+        assert [h.id for h in hits] == [2, 3]
+        # "_" is literal, not the LIKE wildcard
+        assert _search_like(conn, parse_query("i_feel"), None, None, True, None, 10) == []
+    finally:
+        conn.close()
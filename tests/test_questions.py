@@ -1,3 +1,7 @@
+import os
+
+import pytest
+
 from app.questions import load_questions
 from app.db import get_session
 from app.models import Question
@@ -31,3 +35,217 @@ def test_load_questions_age_filter(temp_db):
     adult_qs = load_questions(age=30)
     assert len(adult_qs) == 1
     assert adult_qs[0][1] == "Adult question"
+
+def test_question_edits_invalidate_every_cache_layer(temp_db):
+    session = get_session()
+    q = Question(question_text="Original?", is_active=1, min_age=0, max_age=120)
+    session.add(q)
+    session.commit()
+
+    assert load_questions()[0][1] == "Original?"
+    assert load_questions()[0][1] == "Original?"  # served from cache
+
+    # A raw write (as admin_cli or another process would make) moves the version
+    session.execute(Question.__table__.update().values(question_text="Edited?"))
+    session.commit()
+    session.close()
+
+    assert load_questions()[0][1] == "Edited?"
+
+def test_question_set_resolves_any_age_from_one_copy():
+    from app.questions import QuestionSet
+    rows = [(1, "All ages", None, 0, 120), (2, "Teens", None, 13, 19),
+            (3, "Adults", "tip", 18, 120), (4, "No bounds", None, None, None)]
+    question_set = QuestionSet(rows)
+    assert [q[0] for q in question_set.for_age(18)] == [1, 2, 3]
+    assert [q[0] for q in question_set.for_age(40)] == [1, 3]
+    assert question_set.for_age(None) == rows
+    assert question_set.for_age(18) is question_set.for_age(18)
+
+def test_pinned_snapshot_rows_are_served_without_decoding(tmp_path, monkeypatch):
+    from app import questions
+    from app.services.question_snapshot import read_snapshot, write_snapshot
+    rows = [(i, f"Q{i}", None, 0, 120) for i in range(1, 6)]
+    path = str(tmp_path / "questions.snapshot")
+    write_snapshot(path, rows, "/db/path.db", 1)
+    question_set = questions.QuestionSet.from_snapshot(read_snapshot(path))
+    assert question_set.pin([2, 4]) == 2
+
+    decoded = []
+    snapshot_rows = question_set.rows
+    decode = snapshot_rows._row
+    monkeypatch.setattr(snapshot_rows, "_row", lambda *fields: decoded.append(fields[0]) or decode(*fields))
+    assert question_set.for_age(30) == rows
+    assert decoded == [1, 3, 5]
+    assert question_set.for_age(30)[1] is snapshot_rows[1]
+
+    # Only the most recently used age selections are kept
+    monkeypatch.setattr(questions, "AGE_SELECTIONS_KEPT", 2)
+    question_set.for_age(40)
+    question_set.for_age(50)
+    assert list(question_set._by_age) == [40, 50]
+
+def test_question_snapshot_round_trip_and_corruption(tmp_path):
+    from app.services.question_snapshot import SnapshotError, read_snapshot, write_snapshot
+    rows = [(1, "Héllo?", None, 0, 120), (7, "Second", "a tip", None, 30)]
+    path = str(tmp_path / "questions.snapshot")
+    write_snapshot(path, rows, "/db/path.db", 42)
+
+    snapshot = read_snapshot(path)
+    assert (snapshot.database, snapshot.version) == ("/db/path.db", 42)
+    assert list(snapshot.rows) == rows
+    assert os.listdir(tmp_path) == ["questions.snapshot"]
+
+    # Closing keeps the rows and unmaps the file, so it can be replaced
+    snapshot.close()
+    assert list(snapshot.rows) == rows and snapshot.rows.take([1, 0]) == rows[::-1]
+    write_snapshot(path, rows[:1], "/db/path.db", 43)
+    assert read_snapshot(path).version == 43
+
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b"X")
+    # Loads only check the header and size; the CRC is checked on request
+    assert read_snapshot(path).version == 43
+    with pytest.raises(SnapshotError):
+        read_snapshot(path, verify=True)
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 1)
+    with pytest.raises(SnapshotError):
+        read_snapshot(path)
+
+def test_question_sampler_weights_quotas_and_seeds():
+    from app.services.question_sampler import QuestionSampler
+
+    n = 40
+    ids = list(range(1, n + 1))
+    # Question 40 has almost no weight; categories alternate 1/2
+    weights = [1.0] * (n - 1) + [1e-12]
+    sampler = QuestionSampler(ids, weights, [i % 3 for i in ids], [1 + i % 2 for i in ids],
+                              [10] * n, [80] * n)
+
+    form = sampler.sample(30, 12, seed=7)
+    assert len(set(form.tolist())) == 12
+    assert form.tolist() == sampler.sample(30, 12, seed=7).tolist()
+
+    quotas = {1: 5, 2: 3}
+    forms = sampler.generate_forms(30, 8, n_forms=200, seed=1, quotas=quotas, stratify_by="category")
+    assert forms.shape == (200, 8)
+    assert (forms == sampler.generate_forms(30, 8, n_forms=200, seed=1, quotas=quotas,
+                                            stratify_by="category")).all()
+    for row in forms.tolist():
+        assert len(set(row)) == 8
+        assert sum(1 + q % 2 == 1 for q in row) == 5
+    assert 40 not in forms
+
+    with pytest.raises(ValueError):
+        sampler.sample(5, 3)
+
+def test_random_questions_use_the_given_rows_and_weights():
+    from app.questions import get_random_questions_by_age
+
+    rows = [(i, f"Q{i}", None, 0, 120) for i in range(1, 5)] + [(9, "Kids", None, 5, 10)]
+    form = get_random_questions_by_age(rows, 30, 4, seed=1)
+    assert sorted(q[0] for q in form) == [1, 2, 3, 4]
+    assert form == get_random_questions_by_age(rows, 30, 4, seed=1)
+
+    # A sixth field weights the row; weight 0 is never drawn
+    weighted = [q + (0.0 if q[0] == 1 else 1.0,) for q in rows]
+    for seed in range(20):
+        assert 1 not in [q[0] for q in get_random_questions_by_age(weighted, 30, 3, seed=seed)]
+    with pytest.raises(ValueError):
+        get_random_questions_by_age(weighted, 30, 4)
+
+def test_bank_sampling_never_draws_zero_weight_questions(temp_db):
+    from app.questions import sample_questions_by_age
+
+    session = get_session()
+    session.add_all([Question(question_text=f"Q{i}", is_active=1, min_age=0, max_age=120,
+                              weight=0.0 if i == 0 else 1.0) for i in range(4)])
+    session.commit()
+    zero_id = session.query(Question.id).filter(Question.weight == 0).scalar()
+    session.close()
+
+    for seed in range(20):
+        form = sample_questions_by_age(30, 3, seed=seed)
+        assert len(form) == 3 and zero_id not in [q[0] for q in form]
+    with pytest.raises(ValueError):
+        sample_questions_by_age(30, 4)
+
+def test_access_counts_are_batched_and_survive_cache_rebuilds(temp_db):
+    import threading
+    from app.models import QuestionCache, get_active_questions_optimized, preload_frequent_data
+    from app.services.access_counts import (
+        discard_pending_access_counts, flush_access_counts, hot_question_ids, pending_access_counts,
+        record_access
+    )
+
+    session = get_session()
+    session.add_all([Question(question_text=f"Q{i}", is_active=1, min_age=0, max_age=120) for i in range(3)])
+    session.commit()
+    preload_frequent_data(session)
+    discard_pending_access_counts()
+
+    def stored():
+        return dict(session.query(QuestionCache.question_id, QuestionCache.access_count).all())
+
+    record_access([1, 2, 2])
+    worker = threading.Thread(target=record_access, args=([2, 3],))
+    worker.start()
+    worker.join()
+    assert len(get_active_questions_optimized(session)) == 3
+    # Reads only count in memory
+    session.expire_all()
+    assert stored() == {1: 0, 2: 0, 3: 0}
+    assert hot_question_ids(2) == [2, 1]
+
+    assert flush_access_counts() == {"questions": 3, "accesses": 8}
+    assert flush_access_counts() is None
+    session.expire_all()
+    assert stored() == {1: 2, 2: 4, 3: 2}
+
+    preload_frequent_data(session)
+    session.expire_all()
+    assert stored() == {1: 2, 2: 4, 3: 2}
+
+    # A question without a cache row keeps its counts until the next rebuild
+    session.add(Question(question_text="Q3", is_active=1, min_age=0, max_age=120))
+    session.commit()
+    record_access([1, 4, 4])
+    assert flush_access_counts() == {"questions": 1, "accesses": 1}
+    assert pending_access_counts() == {4: 2}
+    preload_frequent_data(session)
+    assert flush_access_counts() == {"questions": 1, "accesses": 2}
+    session.expire_all()
+    assert stored() == {1: 3, 2: 4, 3: 2, 4: 2}
+    session.close()
+
+def test_shared_memory_question_set_is_published_once(tmp_path):
+    from app.services import question_shm
+    if not question_shm.available():
+        pytest.skip("shared memory cache needs fcntl")
+
+    database = str(tmp_path / "shared.db")
+    rows = [(1, "Shared?", None, 0, 120), (2, "Tip", "a tip", 10, 20)]
+    loads = []
+
+    def load():
+        loads.append(1)
+        return rows
+
+    try:
+        first = question_shm.shared_snapshot((database, 1), load, str(tmp_path))
+        # A second instance attaches what the first published
+        question_shm.detach_all()
+        second = question_shm.shared_snapshot((database, 1), load, str(tmp_path))
+        assert list(first.rows) == list(second.rows) == rows
+        assert len(loads) == 1
+        assert not second.records.flags.writeable
+
+        # A new bank version gets a new segment; the old one is unlinked
+        question_shm.shared_snapshot((database, 2), load, str(tmp_path))
+        assert len(loads) == 2
+        question_shm.detach_all()
+        assert question_shm.attach((database, 1)) is None
+    finally:
+        question_shm.unlink(question_shm.segment_name((database, 2)))
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from app.db import get_session
+from app.models import Score, ExamSession
+from app.services.exam_sessions import load_responses
+from app.services import response_buffer
+from app.services.response_buffer import ExamSessionBuffer, recover_pending_sessions
+
+
+def test_commit_writes_responses_and_score_together(temp_db, tmp_path):
+    buffer = ExamSessionBuffer("alice", 30, "adult", pending_dir=str(tmp_path))
+    buffer.record_answer(1, 3)
+    buffer.record_answer(2, 4)
+    buffer.record_answer(1, 2)  # revisited question replaces the earlier answer
+
+    # Nothing reaches the database before the exam finishes
+    session = get_session()
+    assert session.query(ExamSession).count() == 0
+    session.close()
+
+    assert buffer.commit(6, 12.5, "felt fine")
+    assert not os.listdir(tmp_path)  # journal removed after a successful flush
+
+    responses = load_responses("alice")
+    assert list(zip(responses["question_id"], responses["response_value"])) == [(1, 2), (2, 4)]
+
+    session = get_session()
+    assert session.query(ExamSession).one().answer_count == 2
+    score = session.query(Score).one()
+    assert (score.username, score.total_score, score.reflection_text) == ("alice", 6, "felt fine")
+    assert score.session_id == buffer.session_id is not None
+    session.close()
+
+
+def test_recover_pending_sessions_replays_journal(temp_db, tmp_path):
+    finished = ExamSessionBuffer("bob", 40, "adult", pending_dir=str(tmp_path))
+    finished.record_answer(1, 4)
+    # Simulate a crash after finish was journaled but before the flush
+    finished._write_journal({"type": "finish", "total_score": 4, "sentiment_score": 0.0,
+                             "reflection_text": "", "timestamp": "2026-01-01T00:00:00"})
+    finished._close_journal(remove=False)
+
+    partial = ExamSessionBuffer("carol", 20, "adult", pending_dir=str(tmp_path))
+    partial.record_answer(1, 1)
+    partial._close_journal(remove=False)
+    with open(partial.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"type": "answer", "question_')  # torn write
+
+    assert recover_pending_sessions(str(tmp_path)) == 2
+    assert not os.listdir(tmp_path)
+
+    session = get_session()
+    assert session.query(Score).filter_by(username="bob").count() == 1
+    assert session.query(Score).filter_by(username="carol").count() == 0
+    session.close()
+    assert len(load_responses("carol")) == 1
+
+
+@pytest.mark.skipif(response_buffer.fcntl is None, reason="journal locks need fcntl")
+def test_recovery_skips_journals_of_running_sessions(temp_db, tmp_path):
+    # Another instance's exam in progress: its journal is open and locked
+    running = ExamSessionBuffer("dave", 30, "adult", pending_dir=str(tmp_path))
+    running.record_answer(1, 2)
+    assert os.path.basename(running.journal_path).startswith(f"{os.getpid()}-")
+
+    assert recover_pending_sessions(str(tmp_path)) == 0
+    assert os.path.exists(running.journal_path)
+
+    assert running.commit(2)
+    assert recover_pending_sessions(str(tmp_path)) == 0
+    session = get_session()
+    assert session.query(ExamSession).filter_by(username="dave").count() == 1
+    session.close()
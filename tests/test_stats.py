@@ -0,0 +1,143 @@
+import threading
+import time
+
+import pytest
+
+from app.db import get_connection, get_session
+from app.models import Score, StatisticsCache
+from app.services import stats
+
+
+@pytest.fixture(autouse=True)
+def fresh_l1():
+    stats.clear_local_cache()
+    yield
+    stats.clear_local_cache()
+
+
+def _add_score(total):
+    session = get_session()
+    session.add(Score(username="u", total_score=total, timestamp="2025-01-01T10:00:00"))
+    session.commit()
+    session.close()
+
+
+def test_get_or_compute_caches_until_dependency_written(temp_db, monkeypatch):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        conn = get_connection()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        finally:
+            conn.close()
+
+    assert stats.get_or_compute("score_rows", compute, depends_on=["scores"]) == 0
+    assert stats.get_or_compute("score_rows", compute, depends_on=["scores"]) == 0
+    assert len(calls) == 1
+
+    # L2 serves a new process (empty L1)
+    stats.clear_local_cache()
+    assert stats.get_or_compute("score_rows", compute, depends_on=["scores"]) == 0
+    assert len(calls) == 1
+
+    # A raw sqlite3 write changes the table version and invalidates the entry
+    # once L1 re-checks versions
+    monkeypatch.setattr(stats, "VERSION_CHECK_INTERVAL", 0)
+    conn = get_connection()
+    conn.execute("INSERT INTO scores (username, total_score, timestamp) VALUES ('u', 10, '2025-01-01')")
+    conn.commit()
+    conn.close()
+    assert stats.get_or_compute("score_rows", compute, depends_on=["scores"]) == 1
+    assert len(calls) == 2
+
+    # Numeric results are mirrored into stat_value for existing readers
+    session = get_session()
+    row = session.query(StatisticsCache).filter_by(stat_name="score_rows").one()
+    assert row.stat_value == 1.0
+    session.close()
+
+
+def test_get_or_compute_honors_ttl(temp_db):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert stats.get_or_compute("ttl_stat", compute, ttl=0) == 1
+    assert stats.get_or_compute("ttl_stat", compute, ttl=0) == 2
+
+
+def test_concurrent_callers_compute_once(temp_db):
+    calls = []
+
+    def slow_compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return 42
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(
+            stats.get_or_compute("slow_stat", slow_compute, depends_on=["scores"])))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [42] * 5
+    assert len(calls) == 1
+
+
+def test_global_average_tracks_new_scores(temp_db):
+    _add_score(10)
+    assert stats.get_global_average_score() == 10.0
+    _add_score(30)
+    assert stats.get_global_average_score() == 20.0
+
+
+def test_l1_hit_skips_the_database_until_recheck(temp_db, monkeypatch):
+    calls = []
+    assert stats.get_or_compute("hit_stat", lambda: calls.append(1) or 7, depends_on=["scores"]) == 7
+    assert stats.get_or_compute("hit_stat", lambda: calls.append(1) or 7, depends_on=["scores"]) == 7
+
+    def no_session():
+        raise AssertionError("L1 hit opened a session")
+
+    monkeypatch.setattr(stats, "get_session", no_session)
+    assert stats.get_or_compute("hit_stat", lambda: calls.append(1) or 7, depends_on=["scores"]) == 7
+    assert len(calls) == 1
+
+
+def test_appends_do_not_bump_counters_but_change_versions(temp_db):
+    def counter():
+        conn = get_connection()
+        try:
+            return conn.execute("SELECT version FROM data_versions WHERE table_name = 'scores'").fetchone()[0]
+        finally:
+            conn.close()
+
+    before, versions = counter(), stats.get_table_versions(["scores"])
+    conn = get_connection()
+    conn.executemany(
+        "INSERT INTO scores (username, total_score, timestamp) VALUES (?, ?, ?)",
+        [("u", i, "2025-01-01T10:00:00") for i in range(50)]
+    )
+    conn.commit()
+    conn.close()
+    assert counter() == before
+    appended = stats.get_table_versions(["scores"])
+    assert appended != versions
+
+    # Inserts below MAX(rowid) and deletes are still counted
+    conn = get_connection()
+    conn.execute("DELETE FROM scores WHERE id = 3")
+    conn.execute("INSERT INTO scores (id, username, total_score, timestamp) VALUES (3, 'u', 1, '2025-01-01')")
+    conn.commit()
+    conn.close()
+    assert counter() == before + 2
+    assert stats.get_table_versions(["scores"]) != appended
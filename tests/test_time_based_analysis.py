@@ -6,10 +6,12 @@ over time for returning users.
 """
 
 import pytest
+import pandas as pd
 from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
 from app.analysis.time_based_analysis import TimeBasedAnalyzer
-from app.models import User, Score, Response, JournalEntry
+from app.models import User, Score, JournalEntry
+from app.db import get_session
 
 
 class TestTimeBasedAnalyzer:
@@ -25,8 +27,9 @@ class TestTimeBasedAnalyzer:
         assert analyzer is not None
         assert analyzer.logger is not None
 
+    @patch('app.analysis.time_based_analysis.load_responses')
     @patch('app.analysis.time_based_analysis.safe_db_context')
-    def test_get_user_timeline_with_data(self, mock_db, analyzer):
+    def test_get_user_timeline_with_data(self, mock_db, mock_load_responses, analyzer):
         """Test getting user timeline with available data."""
         # Create mock objects
         mock_score = Mock(spec=Score)
@@ -36,11 +39,9 @@ class TestTimeBasedAnalyzer:
         mock_score.detailed_age_group = "25-34"
         mock_score.timestamp = "2025-01-01T10:00:00"
         
-        mock_response = Mock(spec=Response)
-        mock_response.id = 1
-        mock_response.question_id = 1
-        mock_response.response_value = 4
-        mock_response.timestamp = "2025-01-01T10:00:00"
+        mock_load_responses.return_value = pd.DataFrame([
+            {"id": 1, "question_id": 1, "response_value": 4, "timestamp": "2025-01-01T10:00:00"}
+        ])
         
         mock_journal = Mock(spec=JournalEntry)
         mock_journal.id = 1
@@ -50,9 +51,8 @@ class TestTimeBasedAnalyzer:
         
         # Setup mock context manager
         mock_session = MagicMock()
-        mock_session.query.return_value.filter_by.return_value.order_by.return_value.all.side_effect = [
+        mock_session.query.return_value.filter.return_value.order_by.return_value.all.side_effect = [
             [mock_score],
-            [mock_response],
             [mock_journal],
         ]
         
@@ -73,7 +73,7 @@ class TestTimeBasedAnalyzer:
     def test_get_user_timeline_no_data(self, mock_db, analyzer):
         """Test getting user timeline with no data."""
         mock_session = MagicMock()
-        mock_session.query.return_value.filter_by.return_value.order_by.return_value.all.return_value = []
+        mock_session.query.return_value.filter.return_value.order_by.return_value.all.return_value = []
         
         mock_db.return_value.__enter__.return_value = mock_session
         mock_db.return_value.__exit__.return_value = None
@@ -95,7 +95,7 @@ class TestTimeBasedAnalyzer:
             mock_scores.append(mock_score)
         
         mock_session = MagicMock()
-        mock_session.query.return_value.filter_by.return_value.order_by.return_value.all.return_value = mock_scores
+        mock_session.query.return_value.filter.return_value.order_by.return_value.all.return_value = mock_scores
         
         mock_db.return_value.__enter__.return_value = mock_session
         mock_db.return_value.__exit__.return_value = None
@@ -122,7 +122,7 @@ class TestTimeBasedAnalyzer:
             mock_scores.append(mock_score)
         
         mock_session = MagicMock()
-        mock_session.query.return_value.filter_by.return_value.order_by.return_value.all.return_value = mock_scores
+        mock_session.query.return_value.filter.return_value.order_by.return_value.all.return_value = mock_scores
         
         mock_db.return_value.__enter__.return_value = mock_session
         mock_db.return_value.__exit__.return_value = None
@@ -136,7 +136,7 @@ class TestTimeBasedAnalyzer:
     def test_analyze_score_trends_no_data(self, mock_db, analyzer):
         """Test score trend analysis with no data."""
         mock_session = MagicMock()
-        mock_session.query.return_value.filter_by.return_value.order_by.return_value.all.return_value = []
+        mock_session.query.return_value.filter.return_value.order_by.return_value.all.return_value = []
         
         mock_db.return_value.__enter__.return_value = mock_session
         mock_db.return_value.__exit__.return_value = None
@@ -145,31 +145,21 @@ class TestTimeBasedAnalyzer:
         
         assert "error" in result
 
-    @patch('app.analysis.time_based_analysis.safe_db_context')
-    def test_analyze_response_patterns_over_time(self, mock_db, analyzer):
+    @patch('app.analysis.time_based_analysis.load_responses')
+    def test_analyze_response_patterns_over_time(self, mock_load_responses, analyzer):
         """Test response pattern analysis over time."""
         mock_responses = []
         # Question 1: responses changing over time (3, 4, 5)
         for i, value in enumerate([3, 4, 5]):
-            mock_resp = Mock(spec=Response)
-            mock_resp.question_id = 1
-            mock_resp.response_value = value
-            mock_resp.timestamp = f"2025-01-0{i+1}T10:00:00"
-            mock_responses.append(mock_resp)
+            mock_responses.append({"question_id": 1, "response_value": value,
+                                   "timestamp": f"2025-01-0{i+1}T10:00:00"})
         
         # Question 2: responses staying consistent (4, 4, 4)
         for i, value in enumerate([4, 4, 4]):
-            mock_resp = Mock(spec=Response)
-            mock_resp.question_id = 2
-            mock_resp.response_value = value
-            mock_resp.timestamp = f"2025-01-0{i+4}T10:00:00"
-            mock_responses.append(mock_resp)
-        
-        mock_session = MagicMock()
-        mock_session.query.return_value.filter_by.return_value.order_by.return_value.all.return_value = mock_responses
+            mock_responses.append({"question_id": 2, "response_value": value,
+                                   "timestamp": f"2025-01-0{i+4}T10:00:00"})
         
-        mock_db.return_value.__enter__.return_value = mock_session
-        mock_db.return_value.__exit__.return_value = None
+        mock_load_responses.return_value = pd.DataFrame(mock_responses)
         
         result = analyzer.analyze_response_patterns_over_time("testuser")
         
@@ -183,103 +173,80 @@ class TestTimeBasedAnalyzer:
         assert result.get("question_patterns", {}).get(1, {}).get("response_change") == 2  # 5 - 3
         assert result.get("question_patterns", {}).get(2, {}).get("response_change") == 0   # 4 - 4
 
-    @patch('app.analysis.time_based_analysis.safe_db_context')
-    def test_get_time_period_stats_daily(self, mock_db, analyzer):
+    @staticmethod
+    def _add_scores(rows, username="testuser"):
+        """Insert (total_score, timestamp) rows for a user into the temp DB."""
+        session = get_session()
+        for total, ts in rows:
+            session.add(Score(username=username, total_score=total, timestamp=ts))
+        session.commit()
+        session.close()
+
+    def test_get_time_period_stats_daily(self, temp_db, analyzer):
         """Test getting daily statistics."""
-        mock_scores = []
-        for i in range(3):
-            mock_score = Mock(spec=Score)
-            mock_score.total_score = 35 + i
-            mock_score.timestamp = f"2025-01-01T{10+i}:00:00"
-            mock_scores.append(mock_score)
-        
-        mock_session = MagicMock()
-        mock_session.query.return_value.filter_by.return_value.order_by.return_value.all.return_value = mock_scores
-        
-        mock_db.return_value.__enter__.return_value = mock_session
-        mock_db.return_value.__exit__.return_value = None
+        self._add_scores([(35 + i, f"2025-01-01T{10+i}:00:00") for i in range(3)])
         
         result = analyzer.get_time_period_stats("testuser", period="daily")
         
         assert result["period"] == "daily"
         assert "2025-01-01" in result["period_statistics"]
         assert result["period_statistics"]["2025-01-01"]["attempts_count"] == 3
+        assert result["period_statistics"]["2025-01-01"]["average_score"] == 36
 
-    @patch('app.analysis.time_based_analysis.safe_db_context')
-    def test_get_time_period_stats_weekly(self, mock_db, analyzer):
+    def test_get_time_period_stats_weekly(self, temp_db, analyzer):
         """Test getting weekly statistics."""
-        mock_scores = []
-        # Create scores across different weeks
-        dates = ["2025-01-01", "2025-01-08", "2025-01-15"]
-        for date in dates:
-            mock_score = Mock(spec=Score)
-            mock_score.total_score = 35
-            mock_score.timestamp = f"{date}T10:00:00"
-            mock_scores.append(mock_score)
-        
-        mock_session = MagicMock()
-        mock_session.query.return_value.filter_by.return_value.order_by.return_value.all.return_value = mock_scores
-        
-        mock_db.return_value.__enter__.return_value = mock_session
-        mock_db.return_value.__exit__.return_value = None
+        # Create scores across different weeks; mixed legacy timestamp formats
+        self._add_scores([
+            (35, "2025-01-01T10:00:00"),
+            (35, "2025-01-08 10:00:00"),
+            (35, "2025-01-15T10:00:00"),
+            (35, "2024-12-30T00:00:00"),  # Monday of ISO week 2025-W1
+        ])
         
         result = analyzer.get_time_period_stats("testuser", period="weekly")
         
         assert result["period"] == "weekly"
-        assert len(result["period_statistics"]) >= 1
+        assert list(result["period_statistics"]) == ["2025-W1", "2025-W2", "2025-W3"]
+        assert result["period_statistics"]["2025-W1"]["attempts_count"] == 2
 
-    @patch('app.analysis.time_based_analysis.safe_db_context')
-    def test_identify_returning_users(self, mock_db, analyzer):
-        """Test identifying returning users (users with multiple attempts)."""
-        mock_user_data = [
-            ("user1", 5, "2025-01-01T10:00:00", "2025-01-05T10:00:00", 35.0),
-            ("user2", 2, "2025-01-01T10:00:00", "2025-01-03T10:00:00", 32.0),
-        ]
+    def test_get_time_period_stats_monthly(self, temp_db, analyzer):
+        """Test getting monthly statistics."""
+        self._add_scores([(30, "2025-01-31T23:59:59"), (40, "2025-02-01T00:00:00")])
         
-        mock_session = MagicMock()
-        mock_session.query.return_value.group_by.return_value.filter.return_value.all.return_value = mock_user_data
+        result = analyzer.get_time_period_stats("testuser", period="monthly")
         
-        mock_db.return_value.__enter__.return_value = mock_session
-        mock_db.return_value.__exit__.return_value = None
+        assert result["period_statistics"]["2025-01"]["max_score"] == 30
+        assert result["period_statistics"]["2025-02"]["min_score"] == 40
+
+    def test_identify_returning_users(self, temp_db, analyzer):
+        """Test identifying returning users (users with multiple attempts)."""
+        self._add_scores([(30 + i, f"2025-01-0{i + 1}T10:00:00") for i in range(5)], username="user1")
+        self._add_scores([(32, "2025-01-03T10:00:00"), (30, "2025-01-01T10:00:00")], username="user2")
+        self._add_scores([(40, "2025-01-02T10:00:00")], username="user3")
         
         result = analyzer.identify_returning_users(min_attempts=2)
         
         assert len(result) == 2
         assert result[0]["total_attempts"] == 5  # Sorted by attempts, descending
         assert result[0]["username"] == "user1"
+        assert result[0]["average_score"] == 32.0
+        # First/last follow the timestamps, not insertion order
+        assert result[1]["first_attempt_date"] == "2025-01-01T10:00:00"
+        assert result[1]["last_attempt_date"] == "2025-01-03T10:00:00"
 
-    @patch('app.analysis.time_based_analysis.safe_db_context')
-    def test_get_comparative_analysis_improved(self, mock_db, analyzer):
+    def test_get_comparative_analysis_improved(self, temp_db, analyzer):
         """Test comparative analysis showing performance improvement."""
-        # Create scores: old ones (before cutoff) and recent ones (after cutoff)
-        mock_scores = []
-        # Historical scores (low)
-        for i in range(3):
-            mock_score = Mock(spec=Score)
-            mock_score.total_score = 30
-            old_date = (datetime.utcnow() - timedelta(days=60)).isoformat()
-            mock_score.timestamp = old_date
-            mock_scores.append(mock_score)
-        
-        # Recent scores (higher)
-        for i in range(2):
-            mock_score = Mock(spec=Score)
-            mock_score.total_score = 38
-            recent_date = (datetime.utcnow() - timedelta(days=10)).isoformat()
-            mock_score.timestamp = recent_date
-            mock_scores.append(mock_score)
-        
-        mock_session = MagicMock()
-        mock_session.query.return_value.filter_by.return_value.order_by.return_value.all.return_value = mock_scores
-        
-        mock_db.return_value.__enter__.return_value = mock_session
-        mock_db.return_value.__exit__.return_value = None
+        # Historical scores (low) before the cutoff, recent scores (higher) after it
+        old_date = (datetime.utcnow() - timedelta(days=60)).isoformat()
+        recent_date = (datetime.utcnow() - timedelta(days=10)).isoformat()
+        self._add_scores([(30, old_date)] * 3 + [(38, recent_date)] * 2)
         
         result = analyzer.get_comparative_analysis("testuser", lookback_days=30)
         
         assert "historical" in result
         assert "recent" in result
         assert result["historical"]["average_score"] == 30.0
+        assert result["historical"]["attempts"] == 3
         assert result["recent"]["average_score"] == 38.0
         assert result["performance_change"] > 0
 
@@ -298,16 +265,20 @@ class TestTimeBasedAnalyzer:
         
         # Setup scalar queries for counts
         score_count_query = MagicMock()
-        score_count_query.filter_by.return_value.scalar.return_value = 5
+        score_count_query.filter.return_value.scalar.return_value = 5
         
         response_count_query = MagicMock()
-        response_count_query.filter_by.return_value.scalar.return_value = 50
+        response_count_query.filter.return_value.scalar.return_value = 40
+        
+        # Answers stored packed in exam_sessions
+        packed_count_query = MagicMock()
+        packed_count_query.filter.return_value.scalar.return_value = 10
         
         journal_count_query = MagicMock()
-        journal_count_query.filter_by.return_value.scalar.return_value = 3
+        journal_count_query.filter.return_value.scalar.return_value = 3
         
         # Map the query calls
-        query_returns = [user_query, score_count_query, response_count_query, journal_count_query]
+        query_returns = [user_query, score_count_query, response_count_query, packed_count_query, journal_count_query]
         mock_session.query.side_effect = query_returns
         
         mock_db.return_value.__enter__.return_value = mock_session
@@ -338,15 +309,19 @@ class TestTimeBasedAnalyzer:
         user_query.filter_by.return_value.first.return_value = mock_user
         
         score_count_query = MagicMock()
-        score_count_query.filter_by.return_value.scalar.return_value = 1
+        score_count_query.filter.return_value.scalar.return_value = 1
         
         response_count_query = MagicMock()
-        response_count_query.filter_by.return_value.scalar.return_value = 10
+        response_count_query.filter.return_value.scalar.return_value = 4
+        
+        # Answers stored packed in exam_sessions
+        packed_count_query = MagicMock()
+        packed_count_query.filter.return_value.scalar.return_value = 6
         
         journal_count_query = MagicMock()
-        journal_count_query.filter_by.return_value.scalar.return_value = 0
+        journal_count_query.filter.return_value.scalar.return_value = 0
         
-        query_returns = [user_query, score_count_query, response_count_query, journal_count_query]
+        query_returns = [user_query, score_count_query, response_count_query, packed_count_query, journal_count_query]
         mock_session.query.side_effect = query_returns
         
         mock_db.return_value.__enter__.return_value = mock_session
@@ -369,7 +344,7 @@ class TestTimeBasedAnalyzer:
         mock_score.timestamp = "2025-01-01T10:00:00"
         
         mock_session = MagicMock()
-        mock_session.query.return_value.filter_by.return_value.order_by.return_value.all.return_value = [mock_score]
+        mock_session.query.return_value.filter.return_value.order_by.return_value.all.return_value = [mock_score]
         
         mock_db.return_value.__enter__.return_value = mock_session
         mock_db.return_value.__exit__.return_value = None
@@ -0,0 +1,74 @@
+from app.analysis.time_based_analysis import time_analyzer
+from app.auth import AuthManager
+from app.db import get_connection, get_session
+from app.models import Score
+from app.services.exam_sessions import load_responses
+from app.services.response_buffer import ExamSessionBuffer
+from app.services import users
+from app.services.users import resolve_user_id, resolve_user_ids, user_filter, user_key, user_where
+
+
+def _rows(sql, params=()):
+    conn = get_connection()
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def test_registration_links_earlier_rows_and_queries_use_the_id(temp_db, tmp_path):
+    # An exam taken before the name was registered is stored without an id
+    buffer = ExamSessionBuffer("carol", 30, "adult", pending_dir=str(tmp_path))
+    buffer.record_answer(1, 3)
+    assert buffer.commit(total_score=3)
+    assert resolve_user_id("carol") is None
+    assert user_key("carol") == {"username": "carol"}
+
+    assert AuthManager().register_user("carol", "secret1")[0]
+    user_id = resolve_user_id("carol")
+    assert user_id is not None
+    assert user_key("carol") == {"user_id": user_id}
+    assert _rows("SELECT user_id FROM scores") == [(user_id,)]
+    assert _rows("SELECT user_id FROM exam_sessions") == [(user_id,)]
+
+    # New writes carry the id directly
+    buffer = ExamSessionBuffer("carol", 30, "adult", pending_dir=str(tmp_path))
+    buffer.record_answer(2, 4)
+    assert buffer.commit(total_score=4)
+    assert _rows("SELECT COUNT(*) FROM scores WHERE user_id = ?", (user_id,)) == [(2,)]
+    assert load_responses("carol")["question_id"].tolist() == [1, 2]
+
+
+def test_resolve_user_ids_looks_up_names_in_chunks(temp_db, monkeypatch):
+    for name in ("ann", "ben", "cat"):
+        assert AuthManager().register_user(name, "secret1")[0]
+    ann = resolve_user_id("ann")  # cached
+    monkeypatch.setattr(users, "IN_CHUNK", 2)
+
+    resolved = resolve_user_ids(["ann", "ben", "cat", "ghost", "ben", None])
+    assert resolved == {"ann": ann, "ben": resolve_user_id("ben"), "cat": resolve_user_id("cat"), "ghost": None}
+    assert len(set(resolved.values())) == 4
+
+
+def test_rows_never_linked_to_the_id_still_match(temp_db):
+    assert AuthManager().register_user("dana", "secret1")[0]
+    user_id = resolve_user_id("dana")
+    conn = get_connection()
+    # Written under the name only, as before the backfill ran
+    conn.execute("INSERT INTO scores (username, total_score, timestamp) VALUES ('dana', 10, '2025-01-01T10:00:00')")
+    conn.execute("INSERT INTO scores (username, total_score, timestamp, user_id) VALUES ('dana', 20, '2025-01-02T10:00:00', ?)", (user_id,))
+    conn.execute("INSERT INTO scores (username, total_score, timestamp) VALUES ('eve', 30, '2025-01-02T10:00:00')")
+    conn.commit()
+    conn.close()
+
+    predicate, params = user_where("dana")
+    assert _rows(f"SELECT total_score FROM scores WHERE {predicate} ORDER BY id", params) == [(10,), (20,)]
+
+    session = get_session()
+    try:
+        scores = session.query(Score.total_score).filter(user_filter(Score, "dana")).order_by(Score.id).all()
+        assert [s for s, in scores] == [10, 20]
+    finally:
+        session.close()
+
+    assert time_analyzer.get_user_activity_summary("dana")["total_assessments"] == 2